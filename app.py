@@ -0,0 +1,9 @@
+# Streamlit app: Entrega de resultados de laboratorio - ASTROMEDIC
+#
+#   streamlit run app.py
+#
+# La app vive en astromedic/app.py; este archivo solo la ejecuta en cada rerun.
+
+from astromedic.app import main
+
+main()
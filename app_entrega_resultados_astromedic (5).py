@@ -3,6 +3,8 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
+from astromedic.almacen import almacen
+from astromedic.referencias import lookup_many
 import json
 
 st.set_page_config(page_title="Entrega de Hemograma", layout="centered")
@@ -17,57 +19,6 @@ sexo = col1.selectbox("Sexo", ["Masculino", "Femenino"])
 medico = col2.text_input("Médico tratante")
 fecha = col3.date_input("Fecha", value=date.today())
 
-# Valores referenciales según edad y sexo
-def get_referencia(nombre, edad, sexo):
-    ref_map = {
-        "Glóbulos blancos": ("mm³", 4000, 10000),
-        "Abastonados": ("%", 0, 4),
-        "Segmentados": ("%", 45, 65),
-        "Eosinófilos": ("%", 0, 4),
-        "Basófilos": ("%", 0, 1),
-        "Linfocitos": ("%", 20, 45),
-        "Monocitos": ("%", 0, 4),
-        "Eritrocitos": {
-            "Masculino": ("mill/mm³", 4000000, 5500000),
-            "Femenino": ("mill/mm³", 3500000, 5000000),
-            "Niño": ("mill/mm³", 4100000, 5100000),
-            "RN": ("mill/mm³", 5000000, 6000000)
-        },
-        "Hemoglobina": {
-            "Masculino": ("g/dL", 14, 17),
-            "Femenino": ("g/dL", 12, 16),
-            "Niño": ("g/dL", 11.2, 16),
-            "RN": ("g/dL", 16, 23),
-            "2-11m": ("g/dL", 9, 14)
-        },
-        "Hematocrito": {
-            "Masculino": ("%", 42, 52),
-            "Femenino": ("%", 36, 46),
-            "Niño": ("%", 35, 49),
-            "RN": ("%", 50, 62)
-        },
-        "MCV": ("fL", 80, 99),
-        "MCH": ("pg", 26, 32),
-        "MCHC": ("g/dL", 32, 36),
-        "RDW – SD": ("fL", 37, 54),
-        "RDW – CV": ("%", 11.5, 14.5),
-        "Plaquetas": ("mil/mm³", 150000, 450000)
-    }
-
-    if nombre in ["Eritrocitos", "Hemoglobina", "Hematocrito"]:
-        if edad < 1:
-            key = "RN"
-        elif edad < 2:
-            key = "2-11m"
-        elif edad <= 12:
-            key = "Niño"
-        else:
-            key = sexo
-        unidad, min_val, max_val = ref_map[nombre][key]
-    else:
-        unidad, min_val, max_val = ref_map[nombre]
-    return unidad, min_val, max_val
-
 # Hemograma
 st.subheader("Hemograma")
 analitos = [
@@ -77,8 +28,7 @@ analitos = [
 ]
 
 resultados = []
-for analito in analitos:
-    unidad, ref_min, ref_max = get_referencia(analito, edad, sexo)
+for analito, (unidad, ref_min, ref_max) in zip(analitos, lookup_many(analitos, edad, sexo)):
     col1, col2, col3, col4 = st.columns([2, 2, 1, 3])
     col1.markdown(f"**{analito}**")
     input_val = col2.text_input("", key=analito)
@@ -100,26 +50,28 @@ for analito in analitos:
 # Botón alternativo para imprimir
 st.info("Para imprimir, usa Ctrl + P en tu navegador o clic derecho > Imprimir")
 
-# Guardar historial (local JSON)
-historial = st.session_state.get("historial", [])
+# Guardar historial (base SQLite local)
 if st.button("💾 Guardar historial del paciente"):
-    entrada = {
-        "nombre": nombre,
-        "dni": dni,
-        "edad": edad,
-        "sexo": sexo,
-        "medico": medico,
-        "fecha": str(fecha),
-        "resultados": resultados
-    }
-    historial.append(entrada)
-    st.session_state["historial"] = historial
-    st.success("Historial guardado en sesión")
+    if not dni:
+        st.warning("Ingrese el DNI del paciente para guardar el historial")
+    else:
+        entrada = {
+            "nombre": nombre,
+            "dni": dni,
+            "edad": edad,
+            "sexo": sexo,
+            "medico": medico,
+            "fecha": str(fecha),
+            "resultados": resultados
+        }
+        almacen().guardar(entrada)
+        st.success("Historial guardado")
 
-# Mostrar historial si hay
-if "historial" in st.session_state:
+# Mostrar historial del paciente (búsqueda por DNI)
+historial = almacen().por_dni(dni) if dni else []
+if historial:
     st.subheader("Historial del paciente")
-    for i, item in enumerate(st.session_state["historial"]):
+    for item in historial:
         with st.expander(f"{item['fecha']} - {item['nombre']}"):
             st.write(f"DNI: {item['dni']} | Edad: {item['edad']} | Sexo: {item['sexo']} | Médico: {item['medico']}")
             df = pd.DataFrame(item["resultados"], columns=["Análisis", "Resultado", "Unidad", "Rango"])
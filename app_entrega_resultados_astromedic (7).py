@@ -3,99 +3,74 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
+from astromedic.almacen import almacen
+from astromedic.referencias import lookup_many
+from astromedic.grilla import editor_panel
+from astromedic.impresion import vista_impresion
+from astromedic.banderas import COLORES, SIMBOLOS, SIN_DATO, a_numeros, marcar_analitos
 import json
 
 st.set_page_config(page_title="Entrega de Hemograma", layout="centered")
 
-# Datos del paciente
-st.subheader("Datos del paciente")
-col1, col2, col3 = st.columns(3)
-nombre = col1.text_input("Nombres y Apellidos")
-dni = col2.text_input("DNI")
-edad = col3.number_input("Edad", min_value=0, max_value=120, step=1)
-sexo = col1.selectbox("Sexo", ["Masculino", "Femenino"])
-medico = col2.text_input("Médico tratante")
-fecha = col3.date_input("Fecha", value=date.today())
-
-# Valores referenciales según edad y sexo
-def get_referencia(nombre, edad, sexo):
-    ref_map = {
-        "Glóbulos blancos": ("mm³", 4000, 10000),
-        "Abastonados": ("%", 0, 4),
-        "Segmentados": ("%", 45, 65),
-        "Eosinófilos": ("%", 0, 4),
-        "Basófilos": ("%", 0, 1),
-        "Linfocitos": ("%", 20, 45),
-        "Monocitos": ("%", 0, 4),
-        "Eritrocitos": {
-            "Masculino": ("mill/mm³", 4000000, 5500000),
-            "Femenino": ("mill/mm³", 3500000, 5000000),
-            "Niño": ("mill/mm³", 4100000, 5100000),
-            "RN": ("mill/mm³", 5000000, 6000000)
-        },
-        "Hemoglobina": {
-            "Masculino": ("g/dL", 14, 17),
-            "Femenino": ("g/dL", 12, 16),
-            "Niño": ("g/dL", 11.2, 16),
-            "RN": ("g/dL", 16, 23),
-            "2-11m": ("g/dL", 9, 14)
-        },
-        "Hematocrito": {
-            "Masculino": ("%", 42, 52),
-            "Femenino": ("%", 36, 46),
-            "Niño": ("%", 35, 49),
-            "RN": ("%", 50, 62)
-        },
-        "MCV": ("fL", 80, 99),
-        "MCH": ("pg", 26, 32),
-        "MCHC": ("g/dL", 32, 36),
-        "RDW – SD": ("fL", 37, 54),
-        "RDW – CV": ("%", 11.5, 14.5),
-        "Plaquetas": ("mil/mm³", 150000, 450000)
-    }
-
-    if nombre in ["Eritrocitos", "Hemoglobina", "Hematocrito"]:
-        if edad < 1:
-            key = "RN"
-        elif edad < 2:
-            key = "2-11m"
-        elif edad <= 12:
-            key = "Niño"
-        else:
-            key = sexo
-        unidad, min_val, max_val = ref_map[nombre][key]
+# Tabla: todo el panel en un solo editor; Formulario: un campo por analito
+modo = st.radio("Modo de ingreso", ["Formulario", "Tabla"], horizontal=True)
+
+# Cabecera y resultados se envían juntos: escribir en el formulario no
+# provoca reruns, la página se recalcula una vez al registrar
+with st.form("informe"):
+    # Datos del paciente
+    st.subheader("Datos del paciente")
+    col1, col2, col3 = st.columns(3)
+    nombre = col1.text_input("Nombres y Apellidos")
+    dni = col2.text_input("DNI")
+    edad = col3.number_input("Edad", min_value=0, max_value=120, step=1)
+    sexo = col1.selectbox("Sexo", ["Masculino", "Femenino"])
+    medico = col2.text_input("Médico tratante")
+    fecha = col3.date_input("Fecha", value=date.today())
+
+    # Hemograma
+    st.subheader("Hemograma")
+    analitos = [
+        "Glóbulos blancos", "Abastonados", "Segmentados", "Eosinófilos", "Basófilos",
+        "Linfocitos", "Monocitos", "Eritrocitos", "Hemoglobina", "Hematocrito",
+        "MCV", "MCH", "MCHC", "RDW – SD", "RDW – CV", "Plaquetas"
+    ]
+
+    resultados = []
+    celdas = []
+    referencias = lookup_many(analitos, edad, sexo)
+    if modo == "Tabla":
+        tabla, codigos = editor_panel(
+            "grilla_hemograma",
+            analitos,
+            [r[0] for r in referencias],
+            [r[1] for r in referencias],
+            [r[2] for r in referencias],
+        )
+        resultados = list(tabla[["Análisis", "Resultado", "Unidad", "Rango"]].itertuples(index=False, name=None))
     else:
-        unidad, min_val, max_val = ref_map[nombre]
-    return unidad, min_val, max_val
-
-# Hemograma
-st.subheader("Hemograma")
-analitos = [
-    "Glóbulos blancos", "Abastonados", "Segmentados", "Eosinófilos", "Basófilos",
-    "Linfocitos", "Monocitos", "Eritrocitos", "Hemoglobina", "Hematocrito",
-    "MCV", "MCH", "MCHC", "RDW – SD", "RDW – CV", "Plaquetas"
-]
-
-resultados = []
-for analito in analitos:
-    unidad, ref_min, ref_max = get_referencia(analito, edad, sexo)
-    col1, col2, col3, col4 = st.columns([2, 2, 1, 3])
-    col1.markdown(f"**{analito}**")
-    input_val = col2.text_input("", key=analito)
-
-    # Validación de rangos numéricos y sombreado
-    try:
-        val_float = float(input_val)
-        if val_float < ref_min or val_float > ref_max:
-            col2.markdown(f"<div style='background-color:#ffcc33;padding:4px'>{input_val}</div>", unsafe_allow_html=True)
-        else:
-            col2.markdown(f"<div style='background-color:#d6f7d6;padding:4px'>{input_val}</div>", unsafe_allow_html=True)
-    except:
-        pass
-
-    col3.markdown(unidad)
-    col4.markdown(f"{ref_min} - {ref_max}")
-    resultados.append((analito, input_val, unidad, f"{ref_min} - {ref_max}"))
+        for analito, (unidad, ref_min, ref_max) in zip(analitos, referencias):
+            col1, col2, col3, col4 = st.columns([2, 2, 1, 3])
+            col1.markdown(f"**{analito}**")
+            input_val = col2.text_input("", key=analito)
+            celdas.append(col2.empty())
+            col3.markdown(unidad)
+            col4.markdown(f"{ref_min} - {ref_max}")
+            resultados.append((analito, input_val, unidad, f"{ref_min} - {ref_max}"))
+
+    st.form_submit_button("✅ Registrar resultados")
+
+# Validación de rangos numéricos y sombreado, en una sola pasada
+if modo != "Tabla":
+    codigos = marcar_analitos(
+        analitos,
+        a_numeros([r[1] for r in resultados]),
+        [r[1] for r in referencias],
+        [r[2] for r in referencias],
+    )
+    for celda, (analito, input_val, unidad, rango), codigo in zip(celdas, resultados, codigos):
+        if codigo != SIN_DATO:
+            celda.markdown(f"<div style='background-color:{COLORES[codigo]};padding:4px'>{input_val}</div>", unsafe_allow_html=True)
 
 # Generar sección imprimible en una sola hoja
 st.subheader("Generar vista lista para impresión")
@@ -106,35 +81,51 @@ if st.button("🖨️ Vista para imprimir o guardar"):
         </script>
     """, unsafe_allow_html=True)
 
-    st.markdown("## Resultado de Laboratorio Clínico - ASTROMEDIC")
-    st.write(f"**Paciente:** {nombre} | **DNI:** {dni} | **Edad:** {edad} | **Sexo:** {sexo} | **Fecha:** {fecha} | **Médico:** {medico}")
-    df_result = pd.DataFrame(resultados, columns=["Análisis", "Resultado", "Unidad", "Rango"])
-    df_result["Resultado"] = df_result.apply(lambda row: f"🔶 {row['Resultado']}" if (row['Resultado'].replace('.','',1).isdigit() and (float(row['Resultado']) < float(row['Rango'].split(' - ')[0]) or float(row['Resultado']) > float(row['Rango'].split(' - ')[1]))) else row['Resultado'], axis=1)
-    st.markdown(df_result.to_html(index=False, escape=False), unsafe_allow_html=True)
+    entradas = [(*r, SIMBOLOS[c]) for r, c in zip(resultados, codigos)]
+    st.markdown(vista_impresion(nombre, dni, edad, sexo, medico, fecha, entradas), unsafe_allow_html=True)
 
-# Guardar historial (local JSON)
-historial = st.session_state.get("historial", [])
+# Guardar historial (base SQLite local)
 if st.button("💾 Guardar historial del paciente"):
-    entrada = {
-        "nombre": nombre,
-        "dni": dni,
-        "edad": edad,
-        "sexo": sexo,
-        "medico": medico,
-        "fecha": str(fecha),
-        "resultados": resultados
-    }
-    historial.append(entrada)
-    st.session_state["historial"] = historial
-    st.success("Historial guardado en sesión")
-
-# Mostrar historial si hay
-if "historial" in st.session_state:
-    st.subheader("Historial del paciente")
-    for i, item in enumerate(st.session_state["historial"]):
-        with st.expander(f"{item['fecha']} - {item['nombre']}"):
+    if not dni:
+        st.warning("Ingrese el DNI del paciente para guardar el historial")
+    else:
+        entrada = {
+            "nombre": nombre,
+            "dni": dni,
+            "edad": edad,
+            "sexo": sexo,
+            "medico": medico,
+            "fecha": str(fecha),
+            "resultados": resultados
+        }
+        almacen().guardar(entrada)
+        st.success("Historial guardado")
+
+# Historial paginado: el filtrado se hace en la base y solo la página
+# visible se dibuja; los resultados de una entrada se cargan al abrirla
+POR_PAGINA = 10
+
+st.subheader("Historial del paciente")
+f1, f2, f3, f4 = st.columns(4)
+filtro_dni = f1.text_input("Buscar DNI", value=dni)
+filtro_nombre = f2.text_input("Buscar nombre")
+desde = f3.date_input("Desde", value=None)
+hasta = f4.date_input("Hasta", value=None)
+
+total = almacen().contar(filtro_dni, filtro_nombre, desde, hasta)
+paginas = max(1, -(-total // POR_PAGINA))
+pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1) if paginas > 1 else 1
+historial = almacen().buscar(filtro_dni, filtro_nombre, desde, hasta, limite=POR_PAGINA, desplazamiento=(pagina - 1) * POR_PAGINA)
+
+st.caption(f"{total} informes encontrados")
+for item in historial:
+    detalle = st.expander(f"{item['fecha']} - {item['nombre']}", key=f"historial_{item['id']}", on_change="rerun")
+    if detalle.open:
+        with detalle:
             st.write(f"DNI: {item['dni']} | Edad: {item['edad']} | Sexo: {item['sexo']} | Médico: {item['medico']}")
-            df = pd.DataFrame(item["resultados"], columns=["Análisis", "Resultado", "Unidad", "Rango"])
+            filas = almacen().resultados_de(item["id"])
+            df = pd.DataFrame(filas, columns=["Análisis", "Resultado", "Unidad", "Rango"])
+            df["✔"] = [r.simbolo for r in filas]
             st.dataframe(df)
 
 # Pie de página
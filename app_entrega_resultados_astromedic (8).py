@@ -1,8 +1,11 @@
 # Streamlit app: Entrega de resultados de laboratorio - Multi análisis
 
 import streamlit as st
-import pandas as pd
 from datetime import date
+from astromedic.referencias import catalogo
+from astromedic.impresion import vista_impresion
+
+PIE = "Ubicación: Av. Siempre Viva 123, Lima | Tel: 987-654-321 | contacto@astromedic.pe | Redes: Facebook / Instagram / TikTok"
 
 st.set_page_config(page_title="Resultados de Laboratorio ASTROMEDIC", layout="centered")
 
@@ -18,38 +21,18 @@ with st.expander("🧾 Datos del paciente"):
     medico = col2.text_input("Médico")
     fecha = col3.date_input("Fecha de entrega", value=date.today())
 
-# Base de datos de análisis
-analisis_db = {
-    "Hemograma": [
-        ("GLOB. BLANCOS", "mm3", "4000", "10000"),
-        ("ABASTONADOS", "%", "0", "4"),
-        ("SEGMENTADOS", "%", "45", "65"),
-        ("EOSINOFILOS", "%", "0", "4"),
-        ("BASOFILOS", "%", "0", "1"),
-        ("LINFOCITOS", "%", "20", "45"),
-        ("MONOCITOS", "%", "0", "4"),
-        ("MCV", "fL", "80", "99"),
-        ("MCH", "pg", "26", "32"),
-        ("MCHC", "g/dL", "32", "36"),
-        ("RDW – SD", "fL", "37", "54"),
-        ("RDW – CV", "%", "11.5", "14.5"),
-        ("PLAQUETAS", "mm3", "150000", "450000")
-    ],
-    "Glucosa": [
-        ("Glucosa en ayunas", "mg/dL", "70", "110"),
-        ("Glucosa postprandial", "mg/dL", "<140", "")
-    ]
-}
+# Análisis y rangos del catálogo (astromedic/catalogo.json)
+analisis_db = catalogo().analisis_db
 
 # Selección del análisis
 opcion = st.selectbox("Selecciona el tipo de análisis", list(analisis_db.keys()))
 entradas = []
 st.subheader(f"Resultados - {opcion}")
 
-for nombre, unidad, ref_min, ref_max in analisis_db[opcion]:
+for analito, unidad, ref_min, ref_max in analisis_db[opcion]:
     c1, c2, c3, c4 = st.columns([3, 2, 2, 3])
-    c1.markdown(f"**{nombre}**")
-    valor = c2.text_input("", key=nombre)
+    c1.markdown(f"**{analito}**")
+    valor = c2.text_input("", key=analito)
     c3.markdown(unidad)
     rango = f"{ref_min} - {ref_max}" if ref_max else f"< {ref_min}"
     c4.markdown(rango)
@@ -63,7 +46,7 @@ for nombre, unidad, ref_min, ref_max in analisis_db[opcion]:
             estado = "🔶"
     except:
         estado = ""
-    entradas.append((nombre, valor, unidad, rango, estado))
+    entradas.append((analito, valor, unidad, rango, estado))
 
 # Estilo de impresión
 st.markdown("""
@@ -83,11 +66,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 if st.button("🖨️ Vista previa para imprimir"):
-    st.markdown("## Resultado de Laboratorio Clínico - ASTROMEDIC")
-    st.markdown(f"**Paciente:** {nombre} | **DNI:** {dni} | **Edad:** {edad} | **Sexo:** {sexo} | **Fecha:** {fecha} | **Médico:** {medico}")
-    df = pd.DataFrame(entradas, columns=["Análisis", "Resultado", "Unidad", "Rango", "✔"])
-    st.markdown(df.to_html(index=False, escape=False), unsafe_allow_html=True)
+    st.markdown(vista_impresion(nombre, dni, edad, sexo, medico, fecha, entradas, PIE), unsafe_allow_html=True)
 
 # Pie de página
 st.markdown("---")
-st.markdown("Ubicación: Av. Siempre Viva 123, Lima | Tel: 987-654-321 | contacto@astromedic.pe | Redes: Facebook / Instagram / TikTok")
+st.markdown(PIE)
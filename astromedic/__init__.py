@@ -0,0 +1 @@
+# Lógica compartida de las apps de entrega de resultados - ASTROMEDIC
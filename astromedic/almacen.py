@@ -0,0 +1,429 @@
+# Historial de resultados persistente en SQLite.
+#
+# Reemplaza la lista de st.session_state["historial"]: los informes
+# sobreviven al cierre de la pestaña y al reinicio del servidor, y buscar a
+# un paciente por DNI, fecha o médico usa un índice en vez de recorrer
+# todas las entradas.
+#
+# Cada resultado se guarda ya evaluado (valor numérico, bandera y el id de
+# su unidad y límites en la tabla referencias) y se lee como
+# registros.Resultado: mostrar el historial no vuelve a parsear rangos ni a
+# marcar nada.
+#
+# Los totales del tablero (informes por médico; resultados, suma de valores
+# y banderas por analito) se acumulan al guardar, por día, semana ISO y mes:
+# "hoy", "esta semana" o "este mes" es leer las filas de un solo período,
+# sin recorrer el historial.
+
+import os
+import sqlite3
+import threading
+from datetime import date
+from functools import lru_cache
+
+from astromedic import compartido
+from astromedic.registros import Resultado, desde_filas, limites_compartidos
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS informes (
+    id INTEGER PRIMARY KEY,
+    dni TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    edad INTEGER,
+    sexo TEXT,
+    medico TEXT,
+    fecha TEXT NOT NULL,
+    creado TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    catalogo TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_informes_dni ON informes (dni, fecha);
+CREATE INDEX IF NOT EXISTS ix_informes_fecha ON informes (fecha);
+CREATE INDEX IF NOT EXISTS ix_informes_medico ON informes (medico, fecha);
+
+-- Unidad y límites de referencia, una fila por combinación distinta (son
+-- pocas); rango solo si no es el que sale de minimo/maximo
+CREATE TABLE IF NOT EXISTS referencias (
+    id INTEGER PRIMARY KEY,
+    unidad TEXT NOT NULL,
+    minimo REAL,
+    maximo REAL,
+    rango TEXT
+);
+-- Una sola fila por combinación aunque dos réplicas la inserten a la vez
+-- (los NULL cuentan como iguales)
+CREATE UNIQUE INDEX IF NOT EXISTS ux_referencias
+    ON referencias (unidad, IFNULL(minimo, ''), IFNULL(maximo, ''), IFNULL(rango, ''));
+
+CREATE TABLE IF NOT EXISTS resultados (
+    informe_id INTEGER NOT NULL REFERENCES informes (id) ON DELETE CASCADE,
+    orden INTEGER NOT NULL,
+    analito TEXT NOT NULL,
+    resultado TEXT,
+    valor REAL,
+    referencia_id INTEGER REFERENCES referencias (id),
+    codigo INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (informe_id, orden)
+) WITHOUT ROWID;
+
+-- Último resultado de cada analito por paciente (delta check): una
+-- búsqueda por clave primaria sin importar cuántos informes tenga el DNI
+CREATE TABLE IF NOT EXISTS ultimos_resultados (
+    dni TEXT NOT NULL,
+    analito TEXT NOT NULL,
+    resultado TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    informe_id INTEGER NOT NULL,
+    PRIMARY KEY (dni, analito)
+) WITHOUT ROWID;
+
+-- Totales del tablero; periodo es "2026-10-18" (día), "2026-W42" (semana
+-- ISO) o "2026-10" (mes) según la fecha del informe
+CREATE TABLE IF NOT EXISTS resumen_medicos (
+    periodo TEXT NOT NULL,
+    medico TEXT NOT NULL,
+    informes INTEGER NOT NULL,
+    PRIMARY KEY (periodo, medico)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS resumen_analitos (
+    periodo TEXT NOT NULL,
+    analito TEXT NOT NULL,
+    resultados INTEGER NOT NULL,
+    valores INTEGER NOT NULL,
+    suma REAL NOT NULL,
+    sin_dato INTEGER NOT NULL,
+    normales INTEGER NOT NULL,
+    bajos INTEGER NOT NULL,
+    altos INTEGER NOT NULL,
+    criticos INTEGER NOT NULL,
+    PRIMARY KEY (periodo, analito)
+) WITHOUT ROWID;
+"""
+
+_ACTUALIZAR_ULTIMO = """
+INSERT INTO ultimos_resultados (dni, analito, resultado, fecha, informe_id) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (dni, analito) DO UPDATE SET
+    resultado = excluded.resultado, fecha = excluded.fecha, informe_id = excluded.informe_id
+WHERE (excluded.fecha, excluded.informe_id) > (ultimos_resultados.fecha, ultimos_resultados.informe_id)
+"""
+
+_SUMAR_MEDICO = """
+INSERT INTO resumen_medicos (periodo, medico, informes) VALUES (?, ?, ?)
+ON CONFLICT (periodo, medico) DO UPDATE SET informes = informes + excluded.informes
+"""
+
+# Contadores de resumen_analitos, en el orden de las columnas; las banderas
+# siguen los códigos de astromedic.banderas (SIN_DATO=0 ... CRITICO=4)
+_CONTADORES = ("resultados", "valores", "suma", "sin_dato", "normales", "bajos", "altos", "criticos")
+_SUMAR_ANALITO = f"""
+INSERT INTO resumen_analitos (periodo, analito, {", ".join(_CONTADORES)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (periodo, analito) DO UPDATE SET
+    {", ".join(f"{c} = {c} + excluded.{c}" for c in _CONTADORES)}
+"""
+
+_COLUMNAS_INFORME = ("id", "dni", "nombre", "edad", "sexo", "medico", "fecha", "catalogo")
+_COLUMNAS_RESULTADO = "analito, resultado, valor, referencia_id, codigo"
+
+
+class AlmacenResultados:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        # Ids de la tabla referencias ya vistos por este proceso (guardar y
+        # leer corren en varios hilos de Streamlit a la vez)
+        self._lock = threading.Lock()
+        self._referencias = {}
+        self._ids_referencia = {}
+        self._conexion().executescript(ESQUEMA)
+
+    @staticmethod
+    def _sumar_resumen(con, medicos, analitos):
+        con.executemany(_SUMAR_MEDICO, [(*clave, *cuentas) for clave, cuentas in medicos.items()])
+        con.executemany(_SUMAR_ANALITO, [(*clave, *cuentas) for clave, cuentas in analitos.items()])
+
+    def _registrar_referencias(self, resultados):
+        """{(unidad, límites, rango): id en la tabla referencias} de esos resultados."""
+        # En su propia transacción, antes de guardar: si el lote falla, los
+        # ids que quedaron en memoria siguen existiendo en la base
+        claves = {(r.unidad, r.limites, r._rango) for r in resultados}
+        with self._lock:
+            ids = {clave: self._ids_referencia[clave] for clave in claves if clave in self._ids_referencia}
+        nuevas = claves - ids.keys()
+        if not nuevas:
+            return ids
+        with self._conexion() as con:
+            ids.update(self._insertar_referencias(con, nuevas))
+        return ids
+
+    def _insertar_referencias(self, con, claves):
+        # Otra réplica (u otro hilo) puede haber insertado la misma fila: el
+        # índice único la deja una sola vez y el SELECT trae su id
+        ids = {}
+        for clave in claves:
+            unidad, (minimo, maximo), rango = clave
+            fila = (unidad, minimo, maximo, rango)
+            con.execute(
+                "INSERT INTO referencias (unidad, minimo, maximo, rango) VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING", fila
+            )
+            ids[clave] = con.execute(
+                "SELECT id FROM referencias WHERE unidad = ? AND minimo IS ? AND maximo IS ? AND rango IS ?", fila
+            ).fetchone()[0]
+        with self._lock:
+            self._ids_referencia.update(ids)
+            self._referencias.update((i, clave) for clave, i in ids.items())
+        return ids
+
+    def _referencia(self, referencia_id):
+        """(unidad, límites, rango) de una fila de la tabla referencias."""
+        with self._lock:
+            clave = self._referencias.get(referencia_id)
+        if clave is None:
+            unidad, minimo, maximo, rango = self._conexion().execute(
+                "SELECT unidad, minimo, maximo, rango FROM referencias WHERE id = ?", (referencia_id,)
+            ).fetchone()
+            clave = (unidad, limites_compartidos(minimo, maximo), rango)
+            with self._lock:
+                self._ids_referencia.setdefault(clave, referencia_id)
+                self._referencias[referencia_id] = clave
+        return clave
+
+    @staticmethod
+    def _fila(r, ids):
+        return (r.analito, r.texto, r.valor, ids[(r.unidad, r.limites, r._rango)], r.codigo)
+
+    def _resultados(self, filas):
+        """[Resultado] para filas (analito, resultado, valor, referencia_id, codigo)."""
+        referencias = {}
+        resultados = []
+        for analito, texto, valor, referencia_id, codigo in filas:
+            clave = referencias.get(referencia_id)
+            if clave is None:
+                clave = referencias[referencia_id] = self._referencia(referencia_id)
+            unidad, limites, rango = clave
+            resultados.append(Resultado(analito, texto, valor, limites, unidad, codigo, rango))
+        return resultados
+
+    def _conexion(self):
+        # Una conexión por hilo: Streamlit atiende cada sesión en su propio hilo
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=10)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            self._local.con = con
+        return con
+
+    def guardar(self, entrada):
+        return self.guardar_lote([entrada])[0]
+
+    def guardar_lote(self, entradas):
+        """Guarda varios informes en una sola transacción; devuelve sus ids.
+
+        Los resultados pueden ser registros.Resultado o filas de texto
+        (analito, resultado, unidad, rango); estas se evalúan al guardar.
+
+        Cada informe registra la versión del catálogo de referencias con que
+        se evaluó (`catalogo` en la entrada; si falta, la vigente).
+        """
+        from astromedic.referencias import catalogo
+
+        vigente = catalogo().etiqueta
+        entradas = [(e, desde_filas(e["resultados"])) for e in entradas]
+        ids_referencia = self._registrar_referencias([r for _, resultados in entradas for r in resultados])
+        ids = []
+        filas = []
+        ultimos = []
+        medicos, analitos = {}, {}
+        with self._conexion() as con:
+            for e, resultados in entradas:
+                dni, fecha = str(e["dni"]), str(e["fecha"])
+                cursor = con.execute(
+                    "INSERT INTO informes (dni, nombre, edad, sexo, medico, fecha, catalogo) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (dni, e["nombre"], e.get("edad"), e.get("sexo"), e.get("medico"), fecha, e.get("catalogo") or vigente),
+                )
+                informe_id = cursor.lastrowid
+                ids.append(informe_id)
+                filas.extend((informe_id, orden, *self._fila(r, ids_referencia)) for orden, r in enumerate(resultados))
+                ultimos.extend(
+                    (dni, r.analito, r.texto, fecha, informe_id)
+                    for r in resultados if r.texto.strip()
+                )
+                _acumular(medicos, fecha, e.get("medico") or "", (1,))
+                for r in resultados:
+                    if r.texto.strip():
+                        bandera = [0] * 5
+                        bandera[r.codigo] = 1
+                        _acumular(analitos, fecha, r.analito, (1, r.valor is not None, r.valor or 0.0, *bandera))
+            con.executemany(
+                f"INSERT INTO resultados (informe_id, orden, {_COLUMNAS_RESULTADO}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                filas,
+            )
+            con.executemany(_ACTUALIZAR_ULTIMO, ultimos)
+            self._sumar_resumen(con, medicos, analitos)
+        return ids
+
+    def resumen(self, periodo):
+        """Totales de un período (ver `periodos`): informes, por médico y por analito.
+
+        Lee solo las filas ya acumuladas de ese período, así que cuesta lo
+        mismo con cien informes que con un millón.
+        """
+        con = self._conexion()
+        periodo = str(periodo)
+        medicos = dict(con.execute(
+            "SELECT medico, informes FROM resumen_medicos WHERE periodo = ? ORDER BY informes DESC, medico", (periodo,)
+        ))
+        analitos = {
+            analito: dict(zip(_CONTADORES, contadores))
+            for analito, *contadores in con.execute(
+                f"SELECT analito, {', '.join(_CONTADORES)} FROM resumen_analitos WHERE periodo = ? ORDER BY analito",
+                (periodo,),
+            )
+        }
+        return {"periodo": periodo, "informes": sum(medicos.values()), "medicos": medicos, "analitos": analitos}
+
+    def ultimos_resultados(self, dni, analitos, antes_de=None):
+        """{analito: (resultado, fecha, informe_id)} del último informe guardado de cada analito.
+
+        Con `antes_de` solo cuentan informes de fechas anteriores (el informe
+        del día ya guardado no es "el anterior").
+        """
+        analitos = tuple(analitos)
+        if not dni or not analitos:
+            return {}
+        dni = str(dni)
+        marcas = ", ".join("?" * len(analitos))
+        con = self._conexion()
+        ultimos = {
+            analito: tuple(resto)
+            for analito, *resto in con.execute(
+                f"SELECT analito, resultado, fecha, informe_id FROM ultimos_resultados "
+                f"WHERE dni = ? AND analito IN ({marcas})",
+                (dni, *analitos),
+            )
+        }
+        if antes_de is None:
+            return ultimos
+        antes_de = str(antes_de)
+        faltan = [a for a, (_, fecha, _) in ultimos.items() if fecha >= antes_de]
+        for analito in faltan:
+            del ultimos[analito]
+        if faltan:
+            # Caso poco común: se recorre hacia atrás el historial de ese DNI
+            marcas = ", ".join("?" * len(faltan))
+            for analito, *resto in con.execute(
+                f"SELECT r.analito, r.resultado, i.fecha, i.id FROM informes i "
+                f"JOIN resultados r ON r.informe_id = i.id "
+                f"WHERE i.dni = ? AND i.fecha < ? AND r.analito IN ({marcas}) AND r.resultado <> '' "
+                f"ORDER BY i.fecha DESC, i.id DESC",
+                (dni, antes_de, *faltan),
+            ):
+                ultimos.setdefault(analito, tuple(resto))
+        return ultimos
+
+    def resultados_de(self, informe_id):
+        """[Resultado] de un informe, en el orden en que se cargaron."""
+        cursor = self._conexion().execute(
+            f"SELECT {_COLUMNAS_RESULTADO} FROM resultados WHERE informe_id = ? ORDER BY orden",
+            (informe_id,),
+        )
+        return self._resultados(cursor)
+
+    def _informes(self, where, parametros, limite=None, desplazamiento=0):
+        sql = f"SELECT {', '.join(_COLUMNAS_INFORME)} FROM informes {where} ORDER BY fecha DESC, id DESC"
+        if limite is not None:
+            sql += " LIMIT ? OFFSET ?"
+            parametros = (*parametros, limite, desplazamiento)
+        return [dict(zip(_COLUMNAS_INFORME, fila)) for fila in self._conexion().execute(sql, parametros)]
+
+    def por_dni(self, dni, limite=None, con_resultados=True):
+        """Informes de un paciente, del más reciente al más antiguo."""
+        informes = self._informes("WHERE dni = ?", (str(dni),), limite)
+        if con_resultados:
+            self._adjuntar_resultados(informes)
+        return informes
+
+    def _adjuntar_resultados(self, informes):
+        # Una sola consulta para los resultados de todos los informes
+        por_id = {informe["id"]: informe for informe in informes}
+        for informe in informes:
+            informe["resultados"] = []
+        if not por_id:
+            return
+        marcas = ", ".join("?" * len(por_id))
+        cursor = self._conexion().execute(
+            f"SELECT informe_id, {_COLUMNAS_RESULTADO} FROM resultados "
+            f"WHERE informe_id IN ({marcas}) ORDER BY informe_id, orden",
+            tuple(por_id),
+        )
+        filas = cursor.fetchall()
+        for informe_id, resultado in zip((f[0] for f in filas), self._resultados(f[1:] for f in filas)):
+            por_id[informe_id]["resultados"].append(resultado)
+
+    @staticmethod
+    def _filtros(dni=None, nombre=None, desde=None, hasta=None):
+        condiciones, parametros = [], []
+        if dni:
+            condiciones.append("dni = ?")
+            parametros.append(str(dni))
+        if nombre:
+            condiciones.append("nombre LIKE ?")
+            parametros.append(f"%{nombre}%")
+        if desde:
+            condiciones.append("fecha >= ?")
+            parametros.append(str(desde))
+        if hasta:
+            condiciones.append("fecha <= ?")
+            parametros.append(str(hasta))
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        return where, tuple(parametros)
+
+    def contar(self, dni=None, nombre=None, desde=None, hasta=None):
+        where, parametros = self._filtros(dni, nombre, desde, hasta)
+        return self._conexion().execute(f"SELECT COUNT(*) FROM informes {where}", parametros).fetchone()[0]
+
+    def buscar(self, dni=None, nombre=None, desde=None, hasta=None, limite=20, desplazamiento=0):
+        """Una página de cabeceras de informe, sin resultados (ver resultados_de)."""
+        where, parametros = self._filtros(dni, nombre, desde, hasta)
+        return self._informes(where, parametros, limite, desplazamiento)
+
+    def por_fecha(self, desde, hasta, limite=None):
+        return self._informes("WHERE fecha BETWEEN ? AND ?", (str(desde), str(hasta)), limite)
+
+    def por_medico(self, medico, limite=None):
+        return self._informes("WHERE medico = ?", (medico,), limite)
+
+    def cerrar(self):
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+
+def periodos(fecha):
+    """Claves (día, semana ISO, mes) de una fecha "AAAA-MM-DD" o date."""
+    try:
+        dia = fecha if isinstance(fecha, date) else date.fromisoformat(str(fecha)[:10])
+    except ValueError:
+        # Fecha con otro formato: solo cuenta para su propio "día"
+        return (str(fecha),)
+    anio, semana, _ = dia.isocalendar()
+    return dia.isoformat(), f"{anio}-W{semana:02d}", dia.isoformat()[:7]
+
+
+def _acumular(totales, fecha, clave, cuentas):
+    for periodo in periodos(fecha):
+        previas = totales.get((periodo, clave))
+        totales[(periodo, clave)] = cuentas if previas is None else tuple(a + b for a, b in zip(previas, cuentas))
+
+
+@lru_cache(maxsize=None)
+def almacen(ruta=None):
+    """Almacén compartido por todas las sesiones (el del backend de estado, sin `ruta`)."""
+    if ruta is None:
+        return compartido.componente("almacen")
+    return AlmacenResultados(ruta)
@@ -0,0 +1,173 @@
+# API HTTP (ASGI) para enviar resultados y obtener banderas e informes PDF
+# sin pasar por la interfaz de Streamlit.
+#
+#   python -m astromedic.api --port 8600
+#
+#   GET  /salud      -> {"estado": "ok", "catalogo": versión del catálogo de referencias}
+#   GET  /paneles    -> paneles registrados y sus analitos
+#   POST /evaluar    -> unidad, rango y bandera de cada resultado
+#   POST /informe    -> el informe en PDF
+#   GET  /metricas   -> métricas en texto de Prometheus
+#
+# Cuerpo de /evaluar y /informe:
+#   {"nombre": "...", "dni": "...", "edad": 34, "sexo": "Femenino",
+#    "medico": "...", "fecha": "2024-06-01",
+#    "resultados": {"Hemoglobina": "13.5", "Plaquetas": "250000"}}
+#
+# Las peticiones se atienden de forma asíncrona; el render del PDF (CPU)
+# pasa antes por la caché de PDF y, si falta, va a la cola de trabajos
+# (astromedic.trabajos). Con la cola llena se responde 503 y Retry-After;
+# si el render falla, 500 con el motivo.
+
+import argparse
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from astromedic import metricas
+from astromedic.evaluacion import evaluar, normalizar_paciente
+
+log = logging.getLogger(__name__)
+
+NOMBRES_BANDERA = ("sin_dato", "normal", "bajo", "alto", "critico")
+
+
+class ErrorPeticion(Exception):
+    pass
+
+
+async def _leer(request):
+    try:
+        datos = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise ErrorPeticion("El cuerpo debe ser JSON")
+    if not isinstance(datos, dict):
+        raise ErrorPeticion("El cuerpo debe ser un objeto JSON")
+    resultados = datos.get("resultados")
+    if not isinstance(resultados, dict) or not all(
+        v is None or (isinstance(v, (str, int, float)) and not isinstance(v, bool)) for v in resultados.values()
+    ):
+        raise ErrorPeticion('"resultados" debe ser un objeto {analito: valor} con valores texto o número')
+    try:
+        edad, sexo = normalizar_paciente(datos)
+        filas = evaluar(resultados, edad, sexo)
+    except (KeyError, ValueError, TypeError) as e:
+        raise ErrorPeticion(str(e).strip("'\""))
+    return datos, edad, sexo, filas
+
+
+def _manejar_errores(endpoint):
+    async def envoltura(request):
+        try:
+            return await endpoint(request)
+        except ErrorPeticion as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+    return envoltura
+
+
+async def salud(request):
+    from astromedic.referencias import catalogo
+
+    return JSONResponse({"estado": "ok", "catalogo": catalogo().etiqueta})
+
+
+async def listar_paneles(request):
+    from astromedic.paneles import cargar_paneles
+
+    return JSONResponse({nombre: list(p.analitos) for nombre, p in cargar_paneles().items()})
+
+
+@_manejar_errores
+async def evaluar_resultados(request):
+    with metricas.seccion("api_evaluar"):
+        _, edad, sexo, filas = await _leer(request)
+        return JSONResponse({
+            "edad": edad,
+            "sexo": sexo,
+            "resultados": [
+                {
+                    "analito": r.analito, "resultado": r.texto, "unidad": r.unidad, "rango": r.rango,
+                    "bandera": NOMBRES_BANDERA[r.codigo], "codigo": r.codigo, "simbolo": r.simbolo,
+                }
+                for r in filas
+            ],
+        })
+
+
+@_manejar_errores
+async def informe(request):
+    from astromedic.cache_pdf import cache, clave_informe
+    from astromedic.informe import VERSION_PLANTILLA
+    from astromedic.trabajos import ColaLlena, cola
+
+    datos, edad, sexo, filas = await _leer(request)
+    cabecera = (
+        datos.get("nombre", ""), datos.get("dni", ""), edad, sexo,
+        datos.get("medico", ""), datos.get("fecha", ""),
+    )
+    entradas = [(*r, r.simbolo) for r in filas]
+    clave = clave_informe(cabecera, entradas, VERSION_PLANTILLA)
+    with metricas.seccion("api_informe"):
+        # Lectura de disco: fuera del bucle de eventos
+        pdf_bytes = await asyncio.to_thread(cache.obtener, clave)
+        if pdf_bytes is None:
+            try:
+                futuro = cola.encolar(clave, "pdf", clave, cabecera, entradas)
+            except ColaLlena:
+                return JSONResponse({"error": "Cola de PDF llena"}, status_code=503, headers={"Retry-After": "2"})
+            try:
+                pdf_bytes = await asyncio.wrap_future(futuro)
+            except Exception as e:
+                log.exception("Falló el render del informe %s", clave)
+                return JSONResponse({"error": f"No se pudo generar el PDF: {str(e) or type(e).__name__}"}, status_code=500)
+    nombre_archivo = f"resultado_{datos.get('dni') or 'paciente'}.pdf"
+    return Response(
+        pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{nombre_archivo}"'},
+    )
+
+
+async def exportar_metricas(request):
+    return PlainTextResponse(metricas.texto_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(app):
+    from astromedic.trabajos import cola
+
+    try:
+        yield
+    finally:
+        cola.cerrar()
+
+
+app = Starlette(
+    routes=[
+        Route("/salud", salud),
+        Route("/paneles", listar_paneles),
+        Route("/evaluar", evaluar_resultados, methods=["POST"]),
+        Route("/informe", informe, methods=["POST"]),
+        Route("/metricas", exportar_metricas),
+    ],
+    lifespan=_ciclo_de_vida,
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="API HTTP de resultados ASTROMEDIC")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args(argv)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
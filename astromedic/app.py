@@ -0,0 +1,276 @@
+# Streamlit app unificada: Entrega de resultados de laboratorio - ASTROMEDIC
+#
+#   streamlit run app.py
+#
+# Reúne el hemograma por edad y sexo y los paneles multi análisis en una
+# sola app. Los análisis disponibles salen del registro de astromedic.paneles;
+# pandas, FPDF y PIL no se importan al arrancar sino cuando se usa la
+# función que los necesita (tabla editable, historial, PDF).
+
+from datetime import date
+
+import streamlit as st
+
+from astromedic import metricas
+from astromedic.banderas import COLORES, SIN_DATO, a_numeros, marcar_analitos
+from astromedic.derivados import Calculadora, formulas_de
+from astromedic.paneles import cargar_paneles
+from astromedic.referencias import catalogo
+from astromedic.registros import registros
+
+POR_PAGINA = 10
+PIE = "Ubicación: Av. Siempre Viva 123, Lima | Tel: 987-654-321 | contacto@astromedic.pe | Redes: Facebook / Instagram / TikTok"
+
+
+def encabezado():
+    from astromedic.recursos import logo_png
+
+    top_col1, top_col2, top_col3 = st.columns([1, 2, 1])
+    with top_col2:
+        st.image(logo_png(), width=200)
+        st.markdown("<h3 style='text-align: center; color: #004080;'>RESULTADO DE LABORATORIO CLÍNICO</h3>", unsafe_allow_html=True)
+
+
+def datos_paciente():
+    st.subheader("Datos del paciente")
+    col1, col2, col3 = st.columns(3)
+    return {
+        "nombre": col1.text_input("Nombres y Apellidos"),
+        "dni": col2.text_input("DNI"),
+        "edad": col3.number_input("Edad", min_value=0, max_value=120, step=1),
+        "sexo": col1.selectbox("Sexo", ["Masculino", "Femenino"]),
+        "medico": col2.text_input("Médico tratante"),
+        "fecha": col3.date_input("Fecha", value=date.today()),
+    }
+
+
+def ingreso_campos(panel, referencias):
+    # Un campo por analito; el sombreado se completa después de marcar. Los
+    # calculados se completan solo si el campo quedó vacío
+    derivados = {f.salida for f in formulas_de(panel.analitos)}
+    valores, celdas = [], []
+    for analito, (unidad, _, _, rango) in zip(panel.analitos, referencias):
+        col1, col2, col3, col4 = st.columns([2, 2, 1, 3])
+        col1.markdown(f"**{analito}**")
+        valores.append(col2.text_input(
+            analito, key=f"{panel.nombre}:{analito}", label_visibility="collapsed",
+            placeholder="calculado" if analito in derivados else "",
+        ))
+        celdas.append(col2.empty())
+        col3.markdown(unidad)
+        col4.markdown(rango)
+    return valores, celdas
+
+
+def ingreso_tabla(panel, referencias):
+    from astromedic.grilla import editor_panel
+
+    importados = st.session_state.get(f"importado:{panel.nombre}", {})
+    tabla, codigos = editor_panel(
+        f"grilla:{panel.nombre}",
+        panel.analitos,
+        [r[0] for r in referencias],
+        [r[1] for r in referencias],
+        [r[2] for r in referencias],
+        [r[3] for r in referencias],
+        valores=[importados.get(a, "") for a in panel.analitos],
+    )
+    return list(tabla["Resultado"]), codigos
+
+
+def importar_analizador(panel):
+    # Va antes del formulario: los valores de una muestra se escriben en el
+    # estado de los campos antes de que se dibujen en este rerun
+    from astromedic.importador import buscar_muestra, leer_muestras
+
+    with st.expander("📥 Importar del analizador"):
+        archivo = st.file_uploader("Exportación del equipo (CSV o ASTM)", type=["csv", "txt", "astm"])
+        if archivo is None:
+            return
+        ids = st.session_state.get("importacion_ids")
+        if ids is None or ids[0] != archivo.file_id:
+            archivo.seek(0)
+            ids = st.session_state["importacion_ids"] = (archivo.file_id, [m["muestra"] for m in leer_muestras(archivo)])
+        if not ids[1]:
+            st.warning("No se encontraron muestras en el archivo")
+            return
+        c1, c2 = st.columns([3, 1])
+        id_muestra = c1.selectbox("Muestra", ids[1])
+        if not c2.button("Cargar", width="stretch"):
+            return
+        archivo.seek(0)
+        muestra = buscar_muestra(archivo, id_muestra)
+        valores = {a: v for a, v in muestra["resultados"].items() if a in panel.analitos}
+        for analito, valor in valores.items():
+            st.session_state[f"{panel.nombre}:{analito}"] = valor
+        st.session_state[f"importado:{panel.nombre}"] = valores
+        st.session_state.pop(f"grilla:{panel.nombre}", None)
+        st.success(f"{len(valores)} resultados cargados de la muestra {id_muestra}"
+                   + (f" (paciente {muestra['dni']})" if muestra["dni"] else ""))
+        if muestra["sin_mapear"]:
+            st.caption(f"Parámetros sin equivalente: {', '.join(muestra['sin_mapear'])}")
+
+
+def calcular_derivados(panel, valores):
+    # Una calculadora por panel en la sesión: en cada rerun solo se vuelven
+    # a evaluar las fórmulas cuyas entradas cambiaron. Lo ingresado a mano
+    # (p. ej. el MCV del equipo) no se reemplaza
+    clave = f"derivados:{panel.nombre}"
+    calculadora = st.session_state.get(clave)
+    if calculadora is None or calculadora.analitos != panel.analitos:
+        calculadora = st.session_state[clave] = Calculadora(panel.analitos)
+    return calculadora.textos(["" if v is None else str(v) for v in valores], sobrescribir=False)
+
+
+def revisar_deltas(panel, paciente, valores):
+    # Último resultado anterior de cada analito para este DNI (índice por
+    # DNI y analito: no depende del largo del historial)
+    from astromedic.almacen import almacen
+    from astromedic.delta import delta_check
+
+    if not paciente["dni"] or not any(str(v).strip() for v in valores):
+        return [None] * len(valores)
+    anteriores = almacen().ultimos_resultados(paciente["dni"], panel.analitos, antes_de=paciente["fecha"])
+    return delta_check(panel.analitos, valores, anteriores) if anteriores else [None] * len(valores)
+
+
+def aviso_deltas(analitos, deltas):
+    lineas = [
+        f"- **{analito}**: {anterior} el {fecha} → cambio {diferencia:+.4g} ({cambio:+.0f} %)"
+        for analito, (anterior, fecha, diferencia, cambio, sospechoso) in
+        ((a, d) for a, d in zip(analitos, deltas) if d is not None and d[4])
+    ]
+    if lineas:
+        st.warning("Δ Cambios grandes respecto del resultado anterior del paciente (revisar la muestra):\n" + "\n".join(lineas))
+
+
+def vista_previa(paciente, entradas):
+    from astromedic.impresion import vista_impresion
+
+    st.markdown(vista_impresion(
+        paciente["nombre"], paciente["dni"], paciente["edad"], paciente["sexo"],
+        paciente["medico"], paciente["fecha"], entradas, PIE,
+    ), unsafe_allow_html=True)
+    st.info("Presione Ctrl+P o clic derecho → Imprimir para generar PDF")
+
+
+def guardar_historial(paciente, resultados, version_catalogo):
+    from astromedic.almacen import almacen
+
+    if not paciente["dni"]:
+        st.warning("Ingrese el DNI del paciente para guardar el historial")
+        return
+    almacen().guardar({**paciente, "fecha": str(paciente["fecha"]), "resultados": resultados, "catalogo": version_catalogo})
+    st.success("Historial guardado")
+
+
+def historial(dni):
+    from astromedic.almacen import almacen
+
+    st.subheader("Historial del paciente")
+    f1, f2, f3, f4 = st.columns(4)
+    filtro_dni = f1.text_input("Buscar DNI", value=dni)
+    filtro_nombre = f2.text_input("Buscar nombre")
+    desde = f3.date_input("Desde", value=None)
+    hasta = f4.date_input("Hasta", value=None)
+
+    total = almacen().contar(filtro_dni, filtro_nombre, desde, hasta)
+    paginas = max(1, -(-total // POR_PAGINA))
+    pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1) if paginas > 1 else 1
+    informes = almacen().buscar(filtro_dni, filtro_nombre, desde, hasta, limite=POR_PAGINA, desplazamiento=(pagina - 1) * POR_PAGINA)
+
+    st.caption(f"{total} informes encontrados")
+    for item in informes:
+        detalle = st.expander(f"{item['fecha']} - {item['nombre']}", key=f"historial_{item['id']}", on_change="rerun")
+        if detalle.open:
+            import pandas as pd
+
+            with detalle:
+                st.write(f"DNI: {item['dni']} | Edad: {item['edad']} | Sexo: {item['sexo']} | Médico: {item['medico']}")
+                if item["catalogo"]:
+                    st.caption(f"Valores referenciales: catálogo {item['catalogo']}")
+                filas = almacen().resultados_de(item["id"])
+                df = pd.DataFrame(filas, columns=["Análisis", "Resultado", "Unidad", "Rango"])
+                df["✔"] = [r.simbolo for r in filas]
+                st.dataframe(df)
+
+
+def main():
+    st.set_page_config(page_title="Resultados de Laboratorio ASTROMEDIC", layout="centered")
+    metricas.inicio_rerun()
+    with metricas.seccion("encabezado"):
+        encabezado()
+
+    if st.sidebar.radio("Vista", ["Informe", "Tablero"]) == "Tablero":
+        from astromedic.tablero import tablero
+
+        with metricas.seccion("tablero"):
+            tablero()
+        metricas.fin_rerun()
+        return
+
+    registro = cargar_paneles()
+    c1, c2 = st.columns(2)
+    panel = registro[c1.selectbox("Selecciona el tipo de análisis", list(registro))]
+    modo = c2.radio("Modo de ingreso", ["Formulario", "Tabla"], horizontal=True)
+    importar_analizador(panel)
+
+    # Cabecera y resultados se envían juntos: escribir en el formulario no
+    # provoca reruns, la página se recalcula una vez al registrar
+    with st.form("informe"):
+        paciente = datos_paciente()
+        st.subheader(panel.nombre)
+        with metricas.seccion("analitos"):
+            version_catalogo = catalogo().etiqueta
+            referencias = panel.referencias(paciente["edad"], paciente["sexo"])
+            if modo == "Tabla":
+                valores, _ = ingreso_tabla(panel, referencias)
+                celdas = []
+            else:
+                valores, celdas = ingreso_campos(panel, referencias)
+        st.form_submit_button("✅ Registrar resultados")
+
+    with metricas.seccion("derivados"):
+        valores, calculados = calcular_derivados(panel, valores)
+        codigos = marcar_analitos(panel.analitos, a_numeros(valores), [r[1] for r in referencias], [r[2] for r in referencias])
+    if not celdas and calculados.any():
+        st.caption("Calculados: " + ", ".join(f"{a} {v}" for a, v, c in zip(panel.analitos, valores, calculados) if c))
+
+    with metricas.seccion("delta"):
+        deltas = revisar_deltas(panel, paciente, valores)
+    for celda, valor, codigo, delta, calculado in zip(celdas, valores, codigos, deltas, calculados):
+        if codigo != SIN_DATO:
+            marca = f" <b title='Anterior: {delta[0]} ({delta[1]})'>Δ</b>" if delta and delta[4] else ""
+            marca += " <i title='Calculado'>ƒ</i>" if calculado else ""
+            celda.markdown(f"<div style='background-color:{COLORES[codigo]};padding:4px'>{valor}{marca}</div>", unsafe_allow_html=True)
+    aviso_deltas(panel.analitos, deltas)
+
+    resultados = registros(
+        panel.analitos, valores, [r[1] for r in referencias], [r[2] for r in referencias],
+        [r[0] for r in referencias], codigos, [r[3] for r in referencias],
+    )
+    entradas = [(*r, r.simbolo) for r in resultados]
+
+    b1, b2, b3 = st.columns(3)
+    mostrar_vista = b1.button("🖨️ Vista previa para imprimir")
+    # Mide encolar y consultar el trabajo; el render corre fuera del rerun
+    with b2, metricas.seccion("pdf_encolar"):
+        from astromedic.descarga import boton_pdf
+
+        boton_pdf(
+            "informe", paciente["nombre"], paciente["dni"], paciente["edad"], paciente["sexo"],
+            paciente["medico"], paciente["fecha"], entradas, f"resultado_{paciente['nombre']}.pdf",
+        )
+    if b3.button("💾 Guardar historial del paciente"):
+        guardar_historial(paciente, resultados, version_catalogo)
+    if mostrar_vista:
+        with metricas.seccion("vista_previa"):
+            vista_previa(paciente, entradas)
+
+    with metricas.seccion("historial"):
+        historial(paciente["dni"])
+
+    st.markdown("---")
+    st.markdown(PIE)
+    metricas.fin_rerun()
+
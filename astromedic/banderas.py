@@ -0,0 +1,115 @@
+# Marcado de resultados fuera de rango.
+#
+# Todo el marcado pasa por `marcar`, que trabaja sobre arreglos de NumPy:
+# la misma llamada sirve para la tabla de un paciente (16 valores) o para
+# 10 000 pacientes a la vez, sin parsear rangos fila por fila.
+
+from functools import lru_cache
+
+import numpy as np
+
+from astromedic.referencias import catalogo
+
+# Códigos de bandera (int8)
+SIN_DATO = 0
+NORMAL = 1
+BAJO = 2
+ALTO = 3
+CRITICO = 4
+
+SIMBOLOS = ("", "✅", "🔶", "🔶", "⛔")
+COLORES = ("", "#d6f7d6", "#ffcc33", "#ffcc33", "#ff9999")
+
+_NAN = float("nan")
+
+
+def _a_float(valor):
+    if valor is None:
+        return _NAN
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    try:
+        return float(str(valor).strip().replace(",", "."))
+    except ValueError:
+        return _NAN
+
+
+def a_numeros(valores):
+    """Convierte los textos ingresados a float; lo no numérico queda en NaN."""
+    return np.fromiter((_a_float(v) for v in valores), dtype=float, count=len(valores))
+
+
+def limites(ref_min, ref_max=""):
+    # Acepta ("4000", "10000"), ("<140", "") o un rango ya formateado
+    # "4000 - 10000" / "< 140". Un límite ausente queda en NaN.
+    if not ref_max and " - " in str(ref_min):
+        ref_min, ref_max = str(ref_min).split(" - ", 1)
+    texto = str(ref_min).strip()
+    if texto.startswith("<"):
+        return _NAN, _a_float(texto[1:])
+    if texto.startswith(">"):
+        return _a_float(texto[1:]), _NAN
+    return _a_float(texto), _a_float(ref_max)
+
+
+@lru_cache(maxsize=64)
+def limites_panel(rangos):
+    """Límites (mínimos, máximos) de un panel; `rangos` es una tupla de pares de texto."""
+    pares = [limites(ref_min, ref_max) for ref_min, ref_max in rangos]
+    minimos = np.array([p[0] for p in pares], dtype=float)
+    maximos = np.array([p[1] for p in pares], dtype=float)
+    minimos.setflags(write=False)
+    maximos.setflags(write=False)
+    return minimos, maximos
+
+
+def limites_criticos(analitos):
+    return _limites_criticos(analitos, catalogo())
+
+
+@lru_cache(maxsize=64)
+def _limites_criticos(analitos, catalogo):
+    # Por versión del catálogo: una recarga no reutiliza límites viejos
+    criticos = catalogo.criticos
+    bajos = np.array([criticos.get(a, (_NAN, _NAN))[0] for a in analitos], dtype=float)
+    altos = np.array([criticos.get(a, (_NAN, _NAN))[1] for a in analitos], dtype=float)
+    bajos.setflags(write=False)
+    altos.setflags(write=False)
+    return bajos, altos
+
+
+def marcar(valores, minimos, maximos, critico_bajo=None, critico_alto=None):
+    """Devuelve un arreglo int8 con SIN_DATO/NORMAL/BAJO/ALTO/CRITICO por valor.
+
+    Los argumentos se combinan con broadcasting, así que `valores` puede ser
+    de forma (n_analitos,) o (n_pacientes, n_analitos). Los límites en NaN
+    no se evalúan.
+    """
+    valores = np.asarray(valores, dtype=float)
+    hay = ~np.isnan(valores)
+    codigos = np.where(hay, NORMAL, SIN_DATO).astype(np.int8)
+    with np.errstate(invalid="ignore"):
+        codigos[hay & (valores < minimos)] = BAJO
+        codigos[hay & (valores > maximos)] = ALTO
+        if critico_bajo is not None:
+            codigos[hay & (valores < critico_bajo)] = CRITICO
+        if critico_alto is not None:
+            codigos[hay & (valores > critico_alto)] = CRITICO
+    return codigos
+
+
+def marcar_analitos(analitos, valores, minimos, maximos):
+    # Igual que `marcar`, con los valores de pánico del catálogo
+    bajos, altos = limites_criticos(tuple(analitos))
+    return marcar(valores, minimos, maximos, bajos, altos)
+
+
+def marcar_filas(filas):
+    """Marca filas (analito, resultado, unidad, rango, ...) como las guarda el historial."""
+    analitos = tuple(f[0] for f in filas)
+    minimos, maximos = limites_panel(tuple((f[3], "") for f in filas))
+    return marcar_analitos(analitos, a_numeros([f[1] for f in filas]), minimos, maximos)
+
+
+def simbolos(codigos):
+    return [SIMBOLOS[c] for c in codigos]
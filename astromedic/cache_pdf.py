@@ -0,0 +1,213 @@
+# Caché de PDF renderizados, direccionada por contenido.
+#
+# La clave es el SHA-256 de la cabecera del paciente, las filas de resultados
+# y la versión de la plantilla; si cualquiera cambia, la clave cambia y no
+# hace falta invalidar nada. Hay dos niveles: memoria (LRU acotada en bytes,
+# por proceso) y disco (LRU por fecha de acceso, compartida entre procesos).
+#
+# El total en disco se lleva en un contador: por proceso o, con
+# `entre_procesos`, en una fila de tamano.db dentro del mismo directorio
+# (SQLite, BEGIN IMMEDIATE), que suman todas las réplicas. La carpeta solo
+# se recorre al pasar el límite, para expulsar.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from astromedic import compartido
+
+MB = 1024 * 1024
+
+
+def clave_informe(cabecera, filas, version_plantilla):
+    contenido = json.dumps([version_plantilla, list(cabecera), [list(f) for f in filas]],
+                           ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class CachePDF:
+    """Caché de dos niveles; con `entre_procesos`, otras réplicas escriben en el mismo directorio."""
+
+    def __init__(self, directorio, max_memoria=32 * MB, max_disco=512 * MB, entre_procesos=False):
+        self.directorio = directorio
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+        self.entre_procesos = entre_procesos
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._bytes_disco = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave[:2], clave + ".pdf")
+
+    def obtener(self, clave):
+        with self._lock:
+            datos = self._memoria.get(clave)
+            if datos is not None:
+                self._memoria.move_to_end(clave)
+                self.aciertos_memoria += 1
+                return datos
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            os.utime(ruta)
+        except FileNotFoundError:
+            with self._lock:
+                self.fallos += 1
+            return None
+        with self._lock:
+            self.aciertos_disco += 1
+            self._guardar_en_memoria(clave, datos)
+        return datos
+
+    def guardar(self, clave, datos):
+        with self._lock:
+            self._guardar_en_memoria(clave, datos)
+        self._guardar_en_disco(clave, datos)
+
+    def obtener_o_generar(self, clave, generar):
+        datos = self.obtener(clave)
+        if datos is None:
+            datos = generar()
+            self.guardar(clave, datos)
+        return datos
+
+    def _guardar_en_memoria(self, clave, datos):
+        if len(datos) > self.max_memoria:
+            return
+        anterior = self._memoria.pop(clave, None)
+        if anterior is not None:
+            self._bytes_memoria -= len(anterior)
+        self._memoria[clave] = datos
+        self._bytes_memoria += len(datos)
+        while self._bytes_memoria > self.max_memoria:
+            _, expulsado = self._memoria.popitem(last=False)
+            self._bytes_memoria -= len(expulsado)
+
+    def _guardar_en_disco(self, clave, datos):
+        ruta = self._ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        try:
+            anterior = os.path.getsize(ruta)
+        except FileNotFoundError:
+            anterior = 0
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(datos)
+        os.replace(temporal, ruta)
+        if self.entre_procesos:
+            self._sumar_compartido(len(datos) - anterior)
+            return
+        with self._lock:
+            if self._bytes_disco is None:
+                self._bytes_disco = self._medir_disco()
+            else:
+                self._bytes_disco += len(datos) - anterior
+            if self._bytes_disco > self.max_disco:
+                self._bytes_disco = self._expulsar_disco()
+
+    def _conexion(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            con = sqlite3.connect(os.path.join(self.directorio, "tamano.db"), timeout=30, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("CREATE TABLE IF NOT EXISTS tamano (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL)")
+            self._local.con = con
+        return con
+
+    def _sumar_compartido(self, diferencia):
+        # Se expulsa dentro de la transacción: mientras tanto las demás
+        # réplicas esperan para sumar, así ningún aporte se pierde al fijar
+        # el total medido
+        con = self._conexion()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            fila = con.execute("SELECT bytes FROM tamano WHERE id = 1").fetchone()
+            total = self._medir_disco() if fila is None else fila[0] + diferencia
+            if total > self.max_disco:
+                total = self._expulsar_disco()
+            con.execute("INSERT INTO tamano VALUES (1, ?) ON CONFLICT (id) DO UPDATE SET bytes = excluded.bytes", (total,))
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        self._bytes_disco = total
+
+    def _archivos_disco(self):
+        # Solo las carpetas de reparto (clave[:2]) tienen PDF
+        try:
+            carpetas = os.scandir(self.directorio)
+        except FileNotFoundError:
+            return
+        with carpetas:
+            for carpeta in carpetas:
+                if not carpeta.is_dir():
+                    continue
+                with os.scandir(carpeta.path) as archivos:
+                    for archivo in archivos:
+                        if not archivo.name.endswith(".pdf"):
+                            continue
+                        try:
+                            estado = archivo.stat()
+                        except FileNotFoundError:
+                            continue
+                        yield archivo.path, estado.st_mtime, estado.st_size
+
+    def _medir_disco(self):
+        return sum(tamano for _, _, tamano in self._archivos_disco())
+
+    def _expulsar_disco(self):
+        # Se borra lo menos usado hasta quedar en el 90 % del límite;
+        # devuelve el total que queda
+        objetivo = self.max_disco * 0.9
+        archivos = sorted(self._archivos_disco(), key=lambda a: a[1])
+        total = sum(tamano for _, _, tamano in archivos)
+        for ruta, _, tamano in archivos:
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamano
+        return total
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos_memoria + self.aciertos_disco + self.fallos
+            return {
+                "aciertos_memoria": self.aciertos_memoria,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "tasa_aciertos": (consultas - self.fallos) / consultas if consultas else 0.0,
+                "entradas_memoria": len(self._memoria),
+                "bytes_memoria": self._bytes_memoria,
+            }
+
+
+# La del backend de estado configurado (astromedic.compartido)
+cache = compartido.componente("cache_pdf")
+
+
+def cabecera_pdf(nombre, dni, edad, sexo, medico, fecha, pie=""):
+    # Sin pie la cabecera (y la clave) es la de siempre
+    return (nombre, dni, edad, sexo, medico, fecha) + ((pie,) if pie else ())
+
+
+def pdf_en_cache(nombre, dni, edad, sexo, medico, fecha, resultados, pie=""):
+    from astromedic.informe import VERSION_PLANTILLA, generar_pdf
+
+    clave = clave_informe(cabecera_pdf(nombre, dni, edad, sexo, medico, fecha, pie), resultados, VERSION_PLANTILLA)
+    return cache.obtener_o_generar(
+        clave, lambda: generar_pdf(nombre, dni, edad, sexo, medico, fecha, resultados, pie)
+    )
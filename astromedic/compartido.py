@@ -0,0 +1,88 @@
+# Estado compartido: historial de informes, caché de PDF y cola de trabajos.
+#
+# Cada backend registra una fábrica por componente ("almacen", "cache_pdf",
+# "cola") y config.ESTADO elige cuál se usa. Los módulos piden su componente
+# con `componente(nombre)`; se crea la primera vez y se reutiliza en todo el
+# proceso.
+#
+#   - "proceso" (por defecto): la cola vive en la memoria de este servidor.
+#     Sirve con una sola réplica de Streamlit/API.
+#   - "archivos": todo en DIRECTORIO_DATOS (SQLite en modo WAL y archivos
+#     escritos con reemplazo atómico), seguro entre procesos. Varias
+#     réplicas que apunten a la misma carpeta ven el mismo historial, se
+#     reparten los PDF de una sola cola y no hace falta afinidad de sesión
+#     en el balanceador. La carpeta tiene que ser un disco local (SQLite no
+#     bloquea bien sobre NFS/SMB).
+#
+# Un backend nuevo (p. ej. un servidor de base de datos) se agrega con
+# registrar_backend("nombre", almacen=..., cache_pdf=..., cola=...).
+
+import os
+import threading
+
+from astromedic import config
+
+_BACKENDS = {}
+_componentes = {}
+_lock = threading.RLock()
+
+
+def registrar_backend(nombre, **fabricas):
+    if nombre in _BACKENDS:
+        raise ValueError(f"Backend ya registrado: {nombre}")
+    _BACKENDS[nombre] = fabricas
+
+
+def componente(nombre):
+    """El componente `nombre` del backend configurado (uno por proceso)."""
+    with _lock:
+        try:
+            return _componentes[nombre]
+        except KeyError:
+            pass
+        try:
+            fabricas = _BACKENDS[config.ESTADO]
+        except KeyError:
+            raise ValueError(f"Backend de estado desconocido: {config.ESTADO!r} (hay {', '.join(_BACKENDS)})") from None
+        creado = _componentes[nombre] = fabricas[nombre]()
+        return creado
+
+
+def _almacen():
+    from astromedic.almacen import AlmacenResultados
+
+    return AlmacenResultados(os.path.join(config.DIRECTORIO_DATOS, "resultados.db"))
+
+
+def _cache_pdf(entre_procesos=False):
+    from astromedic.cache_pdf import MB, CachePDF
+
+    return CachePDF(
+        os.path.join(config.DIRECTORIO_DATOS, "cache_pdf"),
+        max_memoria=config.CACHE_PDF_MEMORIA_MB * MB,
+        max_disco=config.CACHE_PDF_DISCO_MB * MB,
+        entre_procesos=entre_procesos,
+    )
+
+
+def _cache_pdf_compartida():
+    return _cache_pdf(entre_procesos=True)
+
+
+def _cola_en_memoria():
+    from astromedic.trabajos import ColaTrabajos
+
+    return ColaTrabajos(config.TRABAJOS_PROCESOS, config.TRABAJOS_MAX_PENDIENTES)
+
+
+def _cola_en_archivo():
+    from astromedic.trabajos import ColaCompartida
+
+    return ColaCompartida(
+        os.path.join(config.DIRECTORIO_DATOS, "trabajos.db"),
+        config.TRABAJOS_PROCESOS, config.TRABAJOS_MAX_PENDIENTES, plazo_s=config.TRABAJOS_PLAZO_S,
+    )
+
+
+registrar_backend("proceso", almacen=_almacen, cache_pdf=_cache_pdf, cola=_cola_en_memoria)
+registrar_backend("archivos", almacen=_almacen, cache_pdf=_cache_pdf_compartida, cola=_cola_en_archivo)
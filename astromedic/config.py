@@ -0,0 +1,39 @@
+# Configuración común, tomada de variables de entorno
+
+import os
+
+# Carpeta donde la app guarda sus datos locales (caché de PDF, historial...)
+DIRECTORIO_DATOS = os.environ.get("ASTROMEDIC_DATOS", "datos")
+
+CACHE_PDF_MEMORIA_MB = int(os.environ.get("ASTROMEDIC_CACHE_PDF_MEMORIA_MB", "32"))
+CACHE_PDF_DISCO_MB = int(os.environ.get("ASTROMEDIC_CACHE_PDF_DISCO_MB", "512"))
+
+# Métricas por rerun: vacío = desactivadas; "prom", "json" o "prom,json"
+# eligen los formatos de exportación (archivos en la carpeta de datos)
+METRICAS = {f.strip() for f in os.environ.get("ASTROMEDIC_METRICAS", "").split(",") if f.strip()}
+METRICAS_INTERVALO_S = float(os.environ.get("ASTROMEDIC_METRICAS_INTERVALO_S", "5"))
+
+# Cola de render de PDF: procesos que generan a la vez y trabajos sin
+# terminar admitidos antes de rechazar nuevos (contrapresión)
+TRABAJOS_PROCESOS = int(os.environ.get("ASTROMEDIC_TRABAJOS_PROCESOS", "2"))
+TRABAJOS_MAX_PENDIENTES = int(os.environ.get("ASTROMEDIC_TRABAJOS_MAX_PENDIENTES", "20"))
+# Con la cola compartida: segundos tras los cuales un trabajo "generando" se
+# da por abandonado (réplica caída) y otra réplica lo retoma
+TRABAJOS_PLAZO_S = float(os.environ.get("ASTROMEDIC_TRABAJOS_PLAZO_S", "300"))
+
+# Backend del estado compartido (astromedic.compartido): "proceso" = cola en
+# memoria, una sola réplica; "archivos" = todo en DIRECTORIO_DATOS, para
+# varias réplicas detrás de un balanceador sobre la misma carpeta
+ESTADO = os.environ.get("ASTROMEDIC_ESTADO", "proceso")
+
+# Fuente TTF del informe PDF (Unicode). Vacío = DejaVu Sans si está
+# instalada; "ninguna" = fuentes core latin-1 de FPDF
+FUENTE_TTF = os.environ.get("ASTROMEDIC_FUENTE_TTF", "")
+FUENTE_TTF_NEGRITA = os.environ.get("ASTROMEDIC_FUENTE_TTF_NEGRITA", "")
+FUENTE_TTF_CURSIVA = os.environ.get("ASTROMEDIC_FUENTE_TTF_CURSIVA", "")
+
+# Catálogo de valores referenciales (JSON). Vacío = astromedic/catalogo.json;
+# los cambios en el archivo se toman sin reiniciar, revisando cada tantos
+# segundos (0 = sin recarga en caliente)
+CATALOGO = os.environ.get("ASTROMEDIC_CATALOGO", "")
+CATALOGO_REVISAR_S = float(os.environ.get("ASTROMEDIC_CATALOGO_REVISAR_S", "2"))
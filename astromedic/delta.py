@@ -0,0 +1,64 @@
+# Delta check: resultado actual contra el anterior del mismo paciente.
+#
+# Un cambio demasiado grande entre dos informes seguidos suele ser un error
+# de muestra (paciente equivocado, dilución, coágulo) más que un cambio
+# real. Los umbrales por analito están en el catálogo ("delta"); el
+# cálculo se hace sobre arreglos de NumPy, igual que el marcado de rangos.
+
+from functools import lru_cache
+
+import numpy as np
+
+from astromedic.banderas import a_numeros
+from astromedic.referencias import catalogo
+
+_NAN = float("nan")
+
+
+def umbrales(analitos):
+    """(absolutos, porcentajes) por analito; NaN donde no hay umbral."""
+    return _umbrales(analitos, catalogo())
+
+
+@lru_cache(maxsize=64)
+def _umbrales(analitos, catalogo):
+    pares = [catalogo.umbrales_delta.get(a, (None, None)) for a in analitos]
+    absolutos = np.array([_NAN if p[0] is None else p[0] for p in pares], dtype=float)
+    porcentajes = np.array([_NAN if p[1] is None else p[1] for p in pares], dtype=float)
+    absolutos.setflags(write=False)
+    porcentajes.setflags(write=False)
+    return absolutos, porcentajes
+
+
+def sospechosos(actuales, anteriores, absolutos, porcentajes):
+    """(diferencias, porcentajes de cambio, máscara de deltas sospechosos).
+
+    Admite broadcasting como `banderas.marcar`; sin valor anterior o actual
+    la diferencia queda en NaN y no se marca.
+    """
+    actuales = np.asarray(actuales, dtype=float)
+    anteriores = np.asarray(anteriores, dtype=float)
+    diferencias = actuales - anteriores
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cambios = np.where(anteriores != 0, diferencias / np.abs(anteriores) * 100, _NAN)
+        marcados = (np.abs(diferencias) > absolutos) | (np.abs(cambios) > porcentajes)
+    return diferencias, cambios, marcados
+
+
+def delta_check(analitos, valores, anteriores):
+    """Compara `valores` con `anteriores` ({analito: (resultado, fecha, ...)}).
+
+    Devuelve, por analito, None si no hay con qué comparar o
+    (resultado anterior, fecha, diferencia, % de cambio, sospechoso).
+    """
+    analitos = tuple(analitos)
+    previos = [anteriores.get(a) for a in analitos]
+    diferencias, cambios, marcados = sospechosos(
+        a_numeros(valores),
+        a_numeros([p[0] if p else None for p in previos]),
+        *umbrales(analitos),
+    )
+    return [
+        None if previo is None or np.isnan(diferencia) else (previo[0], previo[1], float(diferencia), float(cambio), bool(marcado))
+        for previo, diferencia, cambio, marcado in zip(previos, diferencias, cambios, marcados)
+    ]
@@ -0,0 +1,162 @@
+# Parámetros calculados del hemograma.
+#
+# Los índices eritrocitarios (MCV, MCH, MCHC) salen de Eritrocitos,
+# Hemoglobina y Hematocrito, y los recuentos absolutos de la fórmula
+# leucocitaria del total de glóbulos blancos por cada porcentaje. Cada
+# fórmula se declara con `formula` sobre arreglos de NumPy, así que la misma
+# cuenta sirve para un paciente (forma (n_analitos,)) o para un lote entero
+# (forma (n_pacientes, n_analitos)), como `banderas.marcar`.
+#
+# Una Calculadora recuerda las entradas de su último cálculo y solo vuelve a
+# evaluar las fórmulas con alguna entrada distinta (la app guarda una por
+# panel en la sesión: al corregir la hemoglobina no se recalculan los
+# absolutos).
+
+from functools import lru_cache
+
+import numpy as np
+
+from astromedic.banderas import a_numeros
+
+_NAN = float("nan")
+
+# Salida -> Formula, en el orden en que se declararon (y se evalúan)
+FORMULAS = {}
+
+
+class Formula:
+    """`salida` = funcion(*entradas); NaN donde falta una entrada o no hay resultado."""
+
+    __slots__ = ("salida", "entradas", "funcion", "decimales")
+
+    def __init__(self, salida, entradas, funcion, decimales=1):
+        self.salida = salida
+        self.entradas = tuple(entradas)
+        self.funcion = funcion
+        self.decimales = decimales
+
+    def evaluar(self, *entradas):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            resultado = np.asarray(self.funcion(*entradas), dtype=float)
+        resultado[~np.isfinite(resultado)] = _NAN
+        return resultado.round(self.decimales)
+
+    def texto(self, valor):
+        return "" if valor != valor else f"{valor:.{self.decimales}f}"
+
+
+def formula(salida, *entradas, decimales=1):
+    """Registra una fórmula; puede usar salidas de fórmulas declaradas antes."""
+    def registrar(funcion):
+        if salida in FORMULAS:
+            raise ValueError(f"Fórmula ya registrada: {salida}")
+        FORMULAS[salida] = Formula(salida, entradas, funcion, decimales)
+        _formulas_de.cache_clear()
+        ampliar.cache_clear()
+        return funcion
+    return registrar
+
+
+@lru_cache(maxsize=64)
+def _formulas_de(analitos):
+    # (fórmula, posiciones de las entradas, posición de la salida) de las
+    # fórmulas que se pueden evaluar con estos analitos
+    posiciones = {a: i for i, a in enumerate(analitos)}
+    return tuple(
+        (f, tuple(posiciones[e] for e in f.entradas), posiciones[f.salida])
+        for f in FORMULAS.values()
+        if f.salida in posiciones and all(e in posiciones for e in f.entradas)
+    )
+
+
+def formulas_de(analitos):
+    return [f for f, _, _ in _formulas_de(tuple(analitos))]
+
+
+@lru_cache(maxsize=64)
+def ampliar(analitos):
+    """`analitos` más las salidas que se pueden calcular a partir de ellos."""
+    disponibles = list(analitos)
+    for f in FORMULAS.values():
+        if f.salida not in disponibles and all(e in disponibles for e in f.entradas):
+            disponibles.append(f.salida)
+    return tuple(disponibles)
+
+
+def _millones(eritrocitos):
+    # El catálogo guarda el recuento por mm³ (4 500 000); también se acepta
+    # ya expresado en millones (4.5)
+    return np.where(eritrocitos < 1000, eritrocitos, eritrocitos / 1e6)
+
+
+@formula("MCV", "Hematocrito", "Eritrocitos")
+def _mcv(hematocrito, eritrocitos):
+    return hematocrito * 10 / _millones(eritrocitos)
+
+
+@formula("MCH", "Hemoglobina", "Eritrocitos")
+def _mch(hemoglobina, eritrocitos):
+    return hemoglobina * 10 / _millones(eritrocitos)
+
+
+@formula("MCHC", "Hemoglobina", "Hematocrito")
+def _mchc(hemoglobina, hematocrito):
+    return hemoglobina * 100 / hematocrito
+
+
+def _absoluto(porcentaje, leucocitos):
+    return leucocitos * porcentaje / 100
+
+
+for _diferencial in ("Abastonados", "Segmentados", "Eosinófilos", "Basófilos", "Linfocitos", "Monocitos"):
+    formula(f"{_diferencial} abs", _diferencial, "Glóbulos blancos", decimales=0)(_absoluto)
+
+
+class Calculadora:
+    """Evalúa las fórmulas de un conjunto fijo de analitos, recordando el último cálculo."""
+
+    __slots__ = ("analitos", "_formulas", "_entradas", "_salidas")
+
+    def __init__(self, analitos):
+        self.analitos = tuple(analitos)
+        self._formulas = _formulas_de(self.analitos)
+        self._entradas = {}
+        self._salidas = {}
+
+    def calcular(self, valores, sobrescribir=True):
+        """(valores con los derivados, máscara de los calculados).
+
+        `valores` tiene forma (..., n_analitos). Con `sobrescribir`, lo
+        calculado reemplaza lo ingresado; sin él, solo completa lo que falta.
+        Si falta alguna entrada, se deja el valor ingresado.
+        """
+        valores = np.array(valores, dtype=float)
+        calculados = np.zeros(valores.shape, dtype=bool)
+        for f, posiciones, salida in self._formulas:
+            entradas = valores[..., posiciones]
+            previas = self._entradas.get(f.salida)
+            if previas is not None and previas.shape == entradas.shape and np.array_equal(previas, entradas, equal_nan=True):
+                resultado = self._salidas[f.salida]
+            else:
+                resultado = f.evaluar(*np.moveaxis(entradas, -1, 0))
+                self._entradas[f.salida] = entradas
+                self._salidas[f.salida] = resultado
+            usar = ~np.isnan(resultado)
+            if not sobrescribir:
+                usar &= np.isnan(valores[..., salida])
+            valores[..., salida] = np.where(usar, resultado, valores[..., salida])
+            calculados[..., salida] = usar
+        return valores, calculados
+
+    def textos(self, textos, sobrescribir=True):
+        """Los textos ingresados con los derivados reemplazados (y la máscara)."""
+        valores, calculados = self.calcular(a_numeros(textos), sobrescribir)
+        return [
+            FORMULAS[analito].texto(valor) if calculado else texto
+            for analito, texto, valor, calculado in zip(self.analitos, textos, valores, calculados)
+        ], calculados
+
+
+def calcular(analitos, valores, sobrescribir=True):
+    """Derivados de un paciente o de un lote de una sola vez (sin memoria)."""
+    return Calculadora(analitos).calcular(valores, sobrescribir)
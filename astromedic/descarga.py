@@ -0,0 +1,57 @@
+# Botón de PDF para las apps de Streamlit, sobre la cola de trabajos.
+#
+# "Generar PDF" encola el render y vuelve enseguida; un fragmento consulta el
+# estado cada segundo (sin recalcular el resto de la página) y, cuando el PDF
+# está listo, muestra el botón de descarga. Si cambian los datos del informe,
+# el PDF anterior deja de ofrecerse.
+
+import streamlit as st
+
+from astromedic.trabajos import EN_COLA, ERROR, GENERANDO, ColaLlena, cola, encolar_pdf, pdf_listo
+
+INTERVALO_S = 1
+
+
+def boton_pdf(clave, nombre, dni, edad, sexo, medico, fecha, resultados, nombre_archivo, pie=""):
+    estado_sesion = f"pdf:{clave}"
+    datos_informe = (nombre, dni, edad, sexo, medico, fecha, resultados, pie)
+
+    if st.button("📄 Generar PDF", key=f"{estado_sesion}:generar"):
+        try:
+            st.session_state[estado_sesion] = (encolar_pdf(*datos_informe), datos_informe)
+        except ColaLlena:
+            st.warning("Hay demasiados PDF en preparación; intente de nuevo en unos segundos")
+            return
+
+    trabajo = st.session_state.get(estado_sesion)
+    if trabajo is None:
+        return
+    id_trabajo, datos_encolados = trabajo
+    if datos_encolados != datos_informe:
+        del st.session_state[estado_sesion]
+        return
+
+    pendiente = cola.estado(id_trabajo)[0] in (EN_COLA, GENERANDO)
+    st.fragment(run_every=INTERVALO_S if pendiente else None)(_progreso)(id_trabajo, nombre_archivo, pendiente)
+
+
+def _progreso(id_trabajo, nombre_archivo, pendiente):
+    estado, posicion, error = cola.estado(id_trabajo)
+    if estado == EN_COLA:
+        st.progress(0.1, text=f"En cola (posición {posicion})")
+    elif estado == GENERANDO:
+        st.progress(0.5, text="Generando PDF…")
+    elif estado == ERROR:
+        st.error(f"No se pudo generar el PDF: {error}")
+    else:
+        datos = pdf_listo(id_trabajo)
+        if datos is None:
+            st.warning("El PDF ya no está disponible; vuelva a generarlo")
+        elif pendiente:
+            # Terminó mientras se consultaba: un rerun completo deja de sondear
+            st.rerun()
+        else:
+            st.download_button(
+                "📥 Descargar PDF", data=datos, file_name=nombre_archivo,
+                mime="application/pdf", on_click="ignore",
+            )
@@ -0,0 +1,33 @@
+# Evaluación de un conjunto de resultados sueltos (sin formulario): resuelve
+# unidad y límites de cada analito y los marca en una sola pasada. La usan el
+# generador en lote, el importador y la API HTTP. Los parámetros calculados
+# (MCV, absolutos...) que falten se completan con astromedic.derivados; lo
+# que viene medido del equipo se respeta.
+
+from astromedic.derivados import Calculadora, ampliar
+from astromedic.referencias import catalogo
+from astromedic.registros import registros
+
+
+def normalizar_paciente(datos):
+    edad = int(datos.get("edad") or 0)
+    sexo = datos.get("sexo") or "Masculino"
+    if sexo not in ("Masculino", "Femenino"):
+        raise ValueError(f"Sexo inválido: {sexo}")
+    return edad, sexo
+
+
+def evaluar(resultados, edad, sexo):
+    """[Resultado] para {analito: valor} o [(analito, valor)]."""
+    if isinstance(resultados, dict):
+        resultados = list(resultados.items())
+    if not resultados:
+        raise ValueError("sin resultados")
+
+    actual = catalogo()
+    analitos = ampliar(tuple(str(a) for a, _ in resultados))
+    textos = ["" if v is None else str(v) for _, v in resultados]
+    textos += [""] * (len(analitos) - len(textos))
+    textos, _ = Calculadora(analitos).textos(textos, sobrescribir=False)
+    unidades, minimos, maximos = zip(*(actual.limites(a, edad, sexo) for a in analitos))
+    return registros(analitos, textos, minimos, maximos, unidades)
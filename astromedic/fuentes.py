@@ -0,0 +1,320 @@
+# Fuente TrueType (Unicode) para el informe PDF.
+#
+# FPDF 1.7.2 solo trae fuentes core latin-1; con una TTF configurada
+# (ASTROMEDIC_FUENTE_TTF, o DejaVu Sans si está instalada) el informe se
+# escribe en Unicode y solo se reemplazan los caracteres que la fuente no
+# tiene. Si no hay TTF se sigue usando Arial con el saneado latin-1.
+#
+# Leer una TTF es caro, así que se hace una vez por despliegue y no por PDF.
+# InformePDF (una subclase de FPDF) registra la fuente y la incrusta por su
+# cuenta, sin tocar la configuración global de fpdf ni sus clases:
+#   - las métricas se guardan como JSON en datos/fuentes, por hash del
+#     contenido de la TTF;
+#   - el subconjunto de glifos que se incrusta en cada PDF (ya comprimido,
+#     con su mapa CID -> glifo) se guarda por (fuente, caracteres), en un
+#     archivo con el SHA-256 de su contenido que se verifica al leerlo. Como
+#     se incluye siempre latin-1 y el catálogo, casi todos los informes usan
+#     el mismo subconjunto.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+
+from fpdf import FPDF
+from fpdf.ttfonts import TTFontFile
+
+from astromedic import config
+from astromedic.texto import TABLA, textos_del_catalogo
+
+FAMILIA = "astromedic"
+CANDIDATAS = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/DejaVuSans.ttf",
+    "C:/Windows/Fonts/DejaVuSans.ttf",
+)
+DIRECTORIO = os.path.join(config.DIRECTORIO_DATOS, "fuentes")
+FORMATO = 1
+
+_lock = threading.Lock()
+_metricas = {}
+_subconjuntos = {}
+
+
+def _ruta_regular():
+    if config.FUENTE_TTF == "ninguna":
+        return None
+    if config.FUENTE_TTF:
+        return config.FUENTE_TTF if os.path.exists(config.FUENTE_TTF) else None
+    return next((r for r in CANDIDATAS if os.path.exists(r)), None)
+
+
+def _rutas():
+    """{estilo: ruta TTF}; negrita y cursiva caen en la regular si faltan."""
+    regular = _ruta_regular()
+    if regular is None:
+        return {}
+    base, extension = os.path.splitext(regular)
+    rutas = {"": regular}
+    for estilo, configurada, sufijos in (
+        ("B", config.FUENTE_TTF_NEGRITA, ("-Bold", "Bold", "bd")),
+        ("I", config.FUENTE_TTF_CURSIVA, ("-Oblique", "-Italic", "Italic", "i")),
+    ):
+        candidatas = [configurada] if configurada else [base + s + extension for s in sufijos]
+        rutas[estilo] = next((r for r in candidatas if os.path.exists(r)), regular)
+    return rutas
+
+
+RUTAS = _rutas()
+# Entra en la clave de la caché de PDF: cambiar de fuente regenera los informes
+VERSION = "+".join(os.path.basename(r) for r in dict.fromkeys(RUTAS.values()))
+
+
+def _escribir(ruta, datos):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+
+def _huella(ruta):
+    with open(ruta, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def metricas(ruta):
+    """Métricas de la TTF como las arma FPDF.add_font (uni=True), más su huella."""
+    with _lock:
+        datos = _metricas.get(ruta)
+    if datos is not None:
+        return datos
+    huella = _huella(ruta)
+    archivo = os.path.join(DIRECTORIO, f"metricas-{FORMATO}-{huella}.json")
+    try:
+        with open(archivo, encoding="utf-8") as f:
+            datos = json.load(f)
+    except (FileNotFoundError, ValueError):
+        ttf = TTFontFile()
+        ttf.getMetrics(ruta)
+        datos = {
+            "name": re.sub("[ ()]", "", ttf.fullName),
+            "desc": {
+                "Ascent": int(round(ttf.ascent, 0)),
+                "Descent": int(round(ttf.descent, 0)),
+                "CapHeight": int(round(ttf.capHeight, 0)),
+                "Flags": ttf.flags,
+                "FontBBox": "[%s %s %s %s]" % tuple(int(round(v, 0)) for v in ttf.bbox),
+                "ItalicAngle": int(ttf.italicAngle),
+                "StemV": int(round(ttf.stemV, 0)),
+                "MissingWidth": int(round(ttf.defaultWidth, 0)),
+            },
+            "up": round(ttf.underlinePosition),
+            "ut": round(ttf.underlineThickness),
+            "originalsize": os.path.getsize(ruta),
+            "cw": ttf.charWidths,
+        }
+        _escribir(archivo, json.dumps(datos, separators=(",", ":")).encode("utf-8"))
+    datos["huella"] = huella
+    with _lock:
+        _metricas[ruta] = datos
+    return datos
+
+
+def _leer_subconjunto(archivo):
+    # Cabecera JSON en la primera línea y luego los dos flujos comprimidos;
+    # si el SHA-256 no coincide se descarta (archivo truncado o ajeno)
+    try:
+        with open(archivo, "rb") as f:
+            cabecera, cuerpo = f.read().split(b"\n", 1)
+        cabecera = json.loads(cabecera)
+    except (FileNotFoundError, ValueError):
+        return None
+    if hashlib.sha256(cuerpo).hexdigest() != cabecera.get("sha256"):
+        return None
+    corte = cabecera["largo_fuente"]
+    return cuerpo[:corte], cabecera["largo_original"], cuerpo[corte:]
+
+
+def subconjunto(ruta, caracteres):
+    """(fuente comprimida, largo sin comprimir, CIDToGIDMap comprimido) de `caracteres`."""
+    caracteres = tuple(sorted(set(caracteres) - {0}))
+    huella = metricas(ruta)["huella"]
+    clave = hashlib.sha256(repr((FORMATO, huella, caracteres)).encode()).hexdigest()
+    with _lock:
+        datos = _subconjuntos.get(clave)
+    if datos is not None:
+        return datos
+    archivo = os.path.join(DIRECTORIO, "subconjuntos", clave + ".bin")
+    datos = _leer_subconjunto(archivo)
+    if datos is None:
+        ttf = TTFontFile()
+        flujo = ttf.makeSubset(ruta, list(caracteres))
+        mapa = bytearray(256 * 256 * 2)
+        for codigo, glifo in ttf.codeToGlyph.items():
+            mapa[codigo * 2] = glifo >> 8
+            mapa[codigo * 2 + 1] = glifo & 0xFF
+        datos = (zlib.compress(flujo), len(flujo), zlib.compress(bytes(mapa)))
+        cuerpo = datos[0] + datos[2]
+        cabecera = {"largo_fuente": len(datos[0]), "largo_original": datos[1], "sha256": hashlib.sha256(cuerpo).hexdigest()}
+        _escribir(archivo, json.dumps(cabecera).encode("utf-8") + b"\n" + cuerpo)
+    with _lock:
+        if len(_subconjuntos) >= 64:
+            _subconjuntos.clear()
+        _subconjuntos[clave] = datos
+    return datos
+
+
+class _Subconjunto(list):
+    # FPDF agrega cada carácter escrito (con repetidos) y luego pregunta
+    # `cid in subset` por cada código de la fuente; así es O(1) y sin repetidos
+    def __init__(self, codigos):
+        super().__init__()
+        self._codigos = set()
+        for codigo in codigos:
+            self.append(codigo)
+
+    def append(self, codigo):
+        if codigo not in self._codigos:
+            self._codigos.add(codigo)
+            super().append(codigo)
+
+    def __contains__(self, codigo):
+        return codigo in self._codigos
+
+
+SUBCONJUNTO_FIJO = sorted(set(range(32, 256)) | {ord(c) for c in "".join(textos_del_catalogo())})
+
+
+_A_UNICODE = (
+    "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+    "/CIDSystemInfo\n<</Registry (Adobe)\n/Ordering (UCS)\n/Supplement 0\n>> def\n"
+    "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+    "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+    "1 beginbfrange\n<0000> <FFFF> <0000>\nendbfrange\n"
+    "endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend"
+)
+
+
+class InformePDF(FPDF):
+    """FPDF que registra e incrusta las TTF con las cachés de este módulo."""
+
+    def add_font(self, family, style="", fname="", uni=False):
+        if not uni:
+            return super().add_font(family, style, fname, uni)
+        fontkey = family.lower() + style.upper()
+        if fontkey in self.fonts:
+            return
+        datos = metricas(fname)
+        base = range(57) if hasattr(self, "str_alias_nb_pages") else range(32)
+        self.fonts[fontkey] = {
+            "i": len(self.fonts) + 1, "type": "TTF", "name": datos["name"], "desc": datos["desc"],
+            "up": datos["up"], "ut": datos["ut"], "cw": datos["cw"], "ttffile": fname, "fontkey": fontkey,
+            "subset": _Subconjunto([*base, *SUBCONJUNTO_FIJO]), "unifilename": None,
+        }
+        self.font_files[fontkey] = {"length1": datos["originalsize"], "type": "TTF", "ttffile": fname}
+        self.font_files[fname] = {"type": "TTF"}
+
+    def _putfonts(self):
+        # FPDF escribe las demás fuentes; las TTF se escriben aquí con el
+        # subconjunto en caché (mismos objetos que arma FPDF 1.7.2)
+        fuentes = self.fonts
+        ttf = sorted(((f["i"], k) for k, f in fuentes.items() if f["type"] == "TTF"))
+        self.fonts = {k: f for k, f in fuentes.items() if f["type"] != "TTF"}
+        try:
+            super()._putfonts()
+        finally:
+            self.fonts = fuentes
+        for _, clave in ttf:
+            self._put_ttf(fuentes[clave])
+
+    def _put_ttf(self, font):
+        font["n"] = self.n + 1
+        fuente, largo, mapa = subconjunto(font["ttffile"], font["subset"])
+        nombre = "MPDFAA+" + font["name"]
+        self._newobj()
+        self._out("<</Type /Font /Subtype /Type0 /BaseFont /" + nombre + " /Encoding /Identity-H")
+        self._out("/DescendantFonts [" + str(self.n + 1) + " 0 R] /ToUnicode " + str(self.n + 2) + " 0 R>>")
+        self._out("endobj")
+        self._newobj()
+        self._out("<</Type /Font /Subtype /CIDFontType2 /BaseFont /" + nombre)
+        self._out("/CIDSystemInfo " + str(self.n + 2) + " 0 R /FontDescriptor " + str(self.n + 3) + " 0 R")
+        if font["desc"].get("MissingWidth"):
+            self._out("/DW %d" % font["desc"]["MissingWidth"])
+        # Los anchos solo se escriben hasta el mayor carácter usado: después
+        # de 255 FPDF omite todo lo que no está en el subconjunto
+        self._putTTfontwidths(font, min(max(255, *font["subset"]), len(font["cw"]) - 1))
+        self._out("/CIDToGIDMap " + str(self.n + 4) + " 0 R>>")
+        self._out("endobj")
+        self._newobj()
+        self._out("<</Length " + str(len(_A_UNICODE)) + ">>")
+        self._putstream(_A_UNICODE)
+        self._out("endobj")
+        self._newobj()
+        self._out("<</Registry (Adobe) /Ordering (UCS) /Supplement 0>>")
+        self._out("endobj")
+        self._newobj()
+        self._out("<</Type /FontDescriptor /FontName /" + nombre)
+        for clave in ("Ascent", "Descent", "CapHeight", "Flags", "FontBBox", "ItalicAngle", "StemV", "MissingWidth"):
+            valor = font["desc"][clave]
+            if clave == "Flags":
+                valor = (valor | 4) & ~32
+            self._out(" /%s %s" % (clave, valor))
+        self._out("/FontFile2 " + str(self.n + 2) + " 0 R>>")
+        self._out("endobj")
+        self._newobj()
+        self._out("<</Length " + str(len(mapa)) + " /Filter /FlateDecode>>")
+        self._putstream(mapa)
+        self._out("endobj")
+        self._newobj()
+        self._out("<</Length " + str(len(fuente)) + " /Filter /FlateDecode /Length1 " + str(largo) + ">>")
+        self._putstream(fuente)
+        self._out("endobj")
+
+
+class _TablaFuente(dict):
+    # Caracteres que la fuente no tiene -> transliteración latin-1
+    def __init__(self, anchos):
+        super().__init__()
+        self.anchos = anchos
+
+    def __missing__(self, codigo):
+        tiene = codigo < len(self.anchos) and self.anchos[codigo] not in (0, None)
+        reemplazo = chr(codigo) if tiene else TABLA[codigo]
+        self[codigo] = reemplazo
+        return reemplazo
+
+
+class Saneador:
+    __slots__ = ("tabla",)
+
+    def __init__(self, anchos):
+        self.tabla = _TablaFuente(anchos)
+
+    def texto(self, texto):
+        texto = str(texto)
+        return texto if texto.isascii() else texto.translate(self.tabla)
+
+    def tabla_resultados(self, filas):
+        return [tuple(self.texto(c) for c in fila) for fila in filas]
+
+
+_saneadores = {}
+
+
+def registrar(pdf):
+    """Registra la TTF en `pdf` (un InformePDF); (familia, limpiar_tabla) o None sin TTF."""
+    if not RUTAS:
+        return None
+    for estilo, ruta in RUTAS.items():
+        pdf.add_font(FAMILIA, estilo, ruta, uni=True)
+    anchos = pdf.fonts[FAMILIA]["cw"]
+    saneador = _saneadores.get(RUTAS[""])
+    if saneador is None:
+        saneador = _saneadores[RUTAS[""]] = Saneador(anchos)
+    return FAMILIA, saneador.tabla_resultados
+
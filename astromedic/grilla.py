@@ -0,0 +1,57 @@
+# Ingreso de un panel completo como una sola tabla editable.
+#
+# En vez de cuatro columnas, un text_input y varios markdown por analito,
+# el panel entero es un único st.data_editor: un solo elemento en el delta
+# del frontend sin importar cuántos analitos tenga. El marcado corre
+# directamente sobre la columna "Resultado" del DataFrame.
+
+import pandas as pd
+import streamlit as st
+
+from astromedic.banderas import SIMBOLOS, marcar_analitos
+from astromedic.referencias import formatear_rango
+
+COLUMNAS = ["Análisis", "Resultado", "Unidad", "Rango", "Estado"]
+
+
+def numeros(columna):
+    """Columna de texto -> arreglo float (NaN donde no hay un número)."""
+    texto = columna.astype("string").str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce").to_numpy(dtype=float, na_value=float("nan"))
+
+
+def marcar_tabla(tabla, minimos, maximos):
+    return marcar_analitos(tuple(tabla["Análisis"]), numeros(tabla["Resultado"]), minimos, maximos)
+
+
+def editor_panel(clave, analitos, unidades, minimos, maximos, rangos=None, valores=None):
+    """Dibuja el panel como tabla editable y devuelve (tabla, códigos de bandera)."""
+    if rangos is None:
+        rangos = [formatear_rango(a, b) for a, b in zip(minimos, maximos)]
+    tabla = pd.DataFrame({
+        "Análisis": list(analitos),
+        "Resultado": list(valores) if valores is not None else [""] * len(analitos),
+        "Unidad": list(unidades),
+        "Rango": list(rangos),
+    })
+
+    # La columna Estado refleja los valores ya confirmados: se aplican las
+    # ediciones guardadas por el propio editor antes de dibujarlo
+    ediciones = st.session_state.get(clave, {}).get("edited_rows", {})
+    actuales = tabla.copy()
+    for fila, cambios in ediciones.items():
+        if "Resultado" in cambios:
+            actuales.loc[int(fila), "Resultado"] = cambios["Resultado"] or ""
+    tabla["Estado"] = [SIMBOLOS[c] for c in marcar_tabla(actuales, minimos, maximos)]
+
+    editada = st.data_editor(
+        tabla,
+        key=clave,
+        hide_index=True,
+        num_rows="fixed",
+        disabled=["Análisis", "Unidad", "Rango", "Estado"],
+        column_config={"Resultado": st.column_config.TextColumn("Resultado")},
+        width="stretch",
+    )
+    editada["Resultado"] = editada["Resultado"].fillna("")
+    return editada, marcar_tabla(editada, minimos, maximos)
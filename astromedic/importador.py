@@ -0,0 +1,381 @@
+# Importación de resultados exportados por el analizador hematológico.
+#
+#   python -m astromedic.importador exportacion.csv --pacientes pacientes.csv
+#
+# Formatos aceptados, leídos línea por línea (la memoria no crece con el
+# tamaño del archivo, solo se retiene la muestra en curso):
+#   - CSV ancho: una fila por muestra, una columna por parámetro (WBC, HGB...)
+#   - CSV largo: una fila por resultado con columnas muestra, parámetro, valor
+#   - registros tipo ASTM E1394 (H|, P|, O|, R|, L|), con o sin marcos
+#
+# Los códigos del equipo se traducen a los analitos del hemograma y las
+# unidades del equipo (10^3/µL, 10^6/µL) a las del catálogo (mm³, mill/mm³).
+# Cualquier analito del catálogo (del hemograma o de sus paneles) se acepta
+# además por su nombre, sin importar mayúsculas, tildes ni puntuación.
+# Cada muestra sale como {"muestra", "dni", "resultados", "sin_mapear"}.
+
+import argparse
+import csv
+import io
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+# Código del equipo -> (analito, factor a la unidad del catálogo)
+CODIGOS = {
+    "WBC": ("Glóbulos blancos", 1000),
+    "BAND%": ("Abastonados", 1),
+    "STAB%": ("Abastonados", 1),
+    "NEUT%": ("Segmentados", 1),
+    "NEU%": ("Segmentados", 1),
+    "SEG%": ("Segmentados", 1),
+    "EO%": ("Eosinófilos", 1),
+    "EOS%": ("Eosinófilos", 1),
+    "BASO%": ("Basófilos", 1),
+    "BAS%": ("Basófilos", 1),
+    "LYMPH%": ("Linfocitos", 1),
+    "LYM%": ("Linfocitos", 1),
+    "MONO%": ("Monocitos", 1),
+    "MON%": ("Monocitos", 1),
+    "NEUT#": ("Segmentados abs", 1000),
+    "NEU#": ("Segmentados abs", 1000),
+    "EO#": ("Eosinófilos abs", 1000),
+    "BASO#": ("Basófilos abs", 1000),
+    "LYMPH#": ("Linfocitos abs", 1000),
+    "MONO#": ("Monocitos abs", 1000),
+    "RBC": ("Eritrocitos", 1000000),
+    "HGB": ("Hemoglobina", 1),
+    "HB": ("Hemoglobina", 1),
+    "HCT": ("Hematocrito", 1),
+    "MCV": ("MCV", 1),
+    "MCH": ("MCH", 1),
+    "MCHC": ("MCHC", 1),
+    "RDW-SD": ("RDW – SD", 1),
+    "RDW-CV": ("RDW – CV", 1),
+    "PLT": ("Plaquetas", 1000),
+}
+
+# Nombres de los paneles del catálogo (exportación del LIS o del formulario
+# multi análisis) que son un analito del hemograma con otro nombre
+ALIAS = {
+    "GLOB. BLANCOS": "Glóbulos blancos",
+    "ABASTONADOS": "Abastonados",
+    "SEGMENTADOS": "Segmentados",
+    "EOSINOFILOS": "Eosinófilos",
+    "BASOFILOS": "Basófilos",
+    "LINFOCITOS": "Linfocitos",
+    "MONOCITOS": "Monocitos",
+    "PLAQUETAS": "Plaquetas",
+}
+
+COLUMNAS_MUESTRA = ("SAMPLE ID", "SAMPLEID", "SAMPLE NO.", "SAMPLE NO", "SAMPLE", "MUESTRA", "ID")
+COLUMNAS_PARAMETRO = ("PARAMETER", "PARAMETRO", "PARÁMETRO", "TEST", "CODE", "CODIGO", "CÓDIGO")
+COLUMNAS_VALOR = ("VALUE", "VALOR", "RESULT", "RESULTADO")
+COLUMNAS_DNI = ("PATIENT ID", "PATIENTID", "DNI")
+
+_CONTROL = re.compile(r"[\x00-\x08\x0b-\x1f]")
+_UNIDAD = re.compile(r"\s*[\(\[].*?[\)\]]\s*$")
+
+
+def _normalizar_codigo(codigo):
+    # "WBC(10^3/uL)" -> "WBC", "rdw cv" -> "RDW-CV"
+    codigo = _UNIDAD.sub("", str(codigo)).strip().upper().replace(" %", "%")
+    return re.sub(r"[\s_]+", "-", codigo) if codigo not in ALIAS else codigo
+
+
+def _clave(nombre):
+    # "Eosinófilos abs" -> "EOSINOFILOS-ABS", "RDW – SD" -> "RDW-SD"
+    sin_tildes = unicodedata.normalize("NFKD", _UNIDAD.sub("", str(nombre))).encode("ascii", "ignore").decode()
+    return "-".join(re.findall(r"[A-Z0-9%#]+", sin_tildes.upper()))
+
+
+@lru_cache(maxsize=4)
+def _por_nombre(actual):
+    # _clave(nombre) -> analito, para cada analito del catálogo `actual`
+    nombres = {}
+    for analito in [*actual.ref_map, *(f[0] for filas in actual.analisis_db.values() for f in filas)]:
+        nombres.setdefault(_clave(analito), ALIAS.get(analito.upper(), analito))
+    return nombres
+
+
+def _analito(codigo):
+    """(analito, factor) o None si el código no se reconoce."""
+    normalizado = _normalizar_codigo(codigo)
+    if normalizado in CODIGOS:
+        return CODIGOS[normalizado]
+    if normalizado in ALIAS:
+        return ALIAS[normalizado], 1
+    from astromedic.referencias import catalogo
+
+    analito = _por_nombre(catalogo()).get(_clave(codigo))
+    return None if analito is None else (analito, 1)
+
+
+def _valor(texto, factor):
+    texto = str(texto).strip().replace(",", ".")
+    if factor == 1 or not texto:
+        return texto
+    try:
+        numero = float(texto) * factor
+    except ValueError:
+        return texto
+    return str(int(round(numero))) if abs(numero - round(numero)) < 1e-6 else f"{numero:g}"
+
+
+def _muestra(id_muestra, dni=""):
+    return {"muestra": id_muestra, "dni": dni, "resultados": {}, "sin_mapear": []}
+
+
+def _agregar(muestra, codigo, valor):
+    mapeo = _analito(codigo)
+    if mapeo is None:
+        muestra["sin_mapear"].append(str(codigo))
+    elif str(valor).strip():
+        analito, factor = mapeo
+        muestra["resultados"][analito] = _valor(valor, factor)
+
+
+def _columna(encabezados, candidatas):
+    normalizados = {str(e).strip().upper(): e for e in encabezados if e}
+    return next((normalizados[c] for c in candidatas if c in normalizados), None)
+
+
+def _leer_csv(lineas):
+    lector = csv.reader(lineas, delimiter=_delimitador(lineas))
+    encabezados = next(lector, None)
+    if not encabezados:
+        return
+    col_muestra = _columna(encabezados, COLUMNAS_MUESTRA)
+    col_parametro = _columna(encabezados, COLUMNAS_PARAMETRO)
+    col_valor = _columna(encabezados, COLUMNAS_VALOR)
+    col_dni = _columna(encabezados, COLUMNAS_DNI)
+    if col_muestra is None:
+        raise ValueError("El CSV no tiene columna de muestra (Sample ID / Muestra)")
+    indice = {e: i for i, e in enumerate(encabezados)}
+
+    def campo(fila, columna):
+        i = indice.get(columna)
+        return fila[i].strip() if i is not None and i < len(fila) else ""
+
+    if col_parametro is not None and col_valor is not None:
+        # Largo: las filas de una muestra vienen seguidas
+        actual = None
+        for fila in lector:
+            id_muestra = campo(fila, col_muestra)
+            if not id_muestra:
+                continue
+            if actual is None or actual["muestra"] != id_muestra:
+                if actual is not None:
+                    yield actual
+                actual = _muestra(id_muestra, campo(fila, col_dni))
+            _agregar(actual, campo(fila, col_parametro), campo(fila, col_valor))
+        if actual is not None:
+            yield actual
+        return
+
+    parametros = [e for e in encabezados if e not in (col_muestra, col_dni) and e]
+    for fila in lector:
+        id_muestra = campo(fila, col_muestra)
+        if not id_muestra:
+            continue
+        muestra = _muestra(id_muestra, campo(fila, col_dni))
+        for parametro in parametros:
+            _agregar(muestra, parametro, campo(fila, parametro))
+        yield muestra
+
+
+class _Lineas:
+    # Iterador de líneas que permite mirar la primera sin consumirla
+    def __init__(self, archivo):
+        self._archivo = archivo
+        self._pendiente = next(archivo, "")
+
+    def primera(self):
+        return self._pendiente
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pendiente is None:
+            return next(self._archivo)
+        linea, self._pendiente = self._pendiente, None
+        if not linea:
+            raise StopIteration
+        return linea
+
+
+def _delimitador(lineas):
+    primera = lineas.primera()
+    return max((";", ",", "\t", "|"), key=primera.count)
+
+
+def _es_astm(primera):
+    limpia = _CONTROL.sub("", primera).lstrip("0123456789")
+    return limpia[:2] == "H|"
+
+
+def _componente(campos, indice, separador):
+    if len(campos) <= indice:
+        return ""
+    return next((c.strip() for c in campos[indice].split(separador) if c.strip()), "")
+
+
+def _leer_astm(lineas):
+    actual = None
+    dni = ""
+    separador_componentes = "^"
+    for linea in lineas:
+        linea = _CONTROL.sub("", linea.split("\x03")[0].split("\x17")[0]).strip()
+        if not linea:
+            continue
+        # Los marcos llevan un número de secuencia delante del tipo de registro
+        if linea[0].isdigit() and len(linea) > 1 and linea[1].isalpha():
+            linea = linea[1:]
+        campos = linea.split("|")
+        tipo = campos[0][:1].upper()
+        if tipo == "H" and len(campos) > 1 and len(campos[1]) > 1:
+            separador_componentes = campos[1][1]
+        elif tipo == "P":
+            if actual is not None:
+                yield actual
+                actual = None
+            dni = _componente(campos, 2, separador_componentes) or _componente(campos, 3, separador_componentes)
+        elif tipo == "O":
+            if actual is not None:
+                yield actual
+            id_muestra = _componente(campos, 2, separador_componentes) or _componente(campos, 3, separador_componentes)
+            actual = _muestra(id_muestra, dni)
+        elif tipo == "R" and actual is not None and len(campos) > 3:
+            # Identificador universal: "^^^WBC" (código en el 4.º componente
+            # o el primero no vacío desde ahí)
+            componentes = campos[2].split(separador_componentes)
+            codigo = next((c for c in componentes[3:] if c), next((c for c in componentes if c), ""))
+            _agregar(actual, codigo, campos[3])
+        elif tipo == "L":
+            if actual is not None:
+                yield actual
+            actual = None
+            dni = ""
+    if actual is not None:
+        yield actual
+
+
+def leer_muestras(origen):
+    """Genera las muestras de un archivo (ruta, archivo binario o de texto)."""
+    if isinstance(origen, (str, bytes)) or hasattr(origen, "__fspath__"):
+        with open(origen, newline="", encoding="utf-8-sig", errors="replace") as f:
+            yield from leer_muestras(f)
+        return
+    if isinstance(origen, io.TextIOBase):
+        yield from _leer(origen)
+        return
+    archivo = io.TextIOWrapper(origen, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        yield from _leer(archivo)
+    finally:
+        # El archivo binario es de quien llama (p. ej. un st.file_uploader)
+        archivo.detach()
+
+
+def _leer(archivo):
+    lineas = _Lineas(archivo)
+    if _es_astm(lineas.primera()):
+        yield from _leer_astm(lineas)
+    else:
+        yield from _leer_csv(lineas)
+
+
+def buscar_muestra(origen, id_muestra):
+    """La muestra con ese ID (la primera), o None; deja de leer al encontrarla."""
+    return next((m for m in leer_muestras(origen) if m["muestra"] == str(id_muestra)), None)
+
+
+def leer_pacientes(ruta):
+    """{muestra: cabecera} desde un CSV con muestra (o dni), nombre, edad, sexo, medico, fecha."""
+    pacientes = {}
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        for fila in csv.DictReader(f):
+            fila = {str(k).strip().lower(): (v or "").strip() for k, v in fila.items() if k}
+            clave = fila.get("muestra") or fila.get("dni")
+            if clave:
+                pacientes[clave] = fila
+    return pacientes
+
+
+def _cabecera(muestra, pacientes, almacen):
+    if pacientes is not None:
+        return pacientes.get(muestra["muestra"]) or pacientes.get(muestra["dni"])
+    # Sin archivo de pacientes, el ID de muestra (o el del paciente) es el
+    # DNI y se reutilizan los datos de su último informe
+    for dni in (muestra["dni"], muestra["muestra"]):
+        if dni:
+            previos = almacen.por_dni(dni, limite=1, con_resultados=False)
+            if previos:
+                return previos[0]
+    return None
+
+
+def importar(origen, almacen=None, pacientes=None, fecha=None, tamano_lote=200):
+    """Guarda cada muestra como informe; devuelve (guardados, [(muestra, motivo)])."""
+    from datetime import date
+
+    from astromedic.almacen import almacen as almacen_por_defecto
+    from astromedic.evaluacion import evaluar, normalizar_paciente
+
+    almacen = almacen or almacen_por_defecto()
+    fecha = str(fecha or date.today())
+    guardados, omitidas, pendientes = 0, [], []
+    for muestra in leer_muestras(origen):
+        cabecera = _cabecera(muestra, pacientes, almacen)
+        if cabecera is None:
+            omitidas.append((muestra["muestra"], "paciente desconocido"))
+            continue
+        try:
+            edad, sexo = normalizar_paciente(cabecera)
+            filas = evaluar(muestra["resultados"], edad, sexo)
+        except (KeyError, ValueError) as e:
+            omitidas.append((muestra["muestra"], str(e).strip("'\"")))
+            continue
+        pendientes.append({
+            "dni": cabecera.get("dni") or muestra["dni"] or muestra["muestra"],
+            "nombre": cabecera.get("nombre", ""),
+            "edad": edad,
+            "sexo": sexo,
+            "medico": cabecera.get("medico", ""),
+            "fecha": (cabecera.get("fecha") if pacientes is not None else None) or fecha,
+            "resultados": filas,
+        })
+        if len(pendientes) >= tamano_lote:
+            guardados += len(almacen.guardar_lote(pendientes))
+            pendientes = []
+    if pendientes:
+        guardados += len(almacen.guardar_lote(pendientes))
+    return guardados, omitidas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa al historial los resultados exportados por el analizador")
+    parser.add_argument("entrada", help="exportación del equipo (CSV o registros ASTM)")
+    parser.add_argument("--pacientes", help="CSV con muestra/dni, nombre, edad, sexo, medico, fecha")
+    parser.add_argument("--fecha", help="fecha de los informes (por defecto, hoy)")
+    parser.add_argument("--solo-leer", action="store_true", help="muestra lo leído sin guardar nada")
+    args = parser.parse_args(argv)
+
+    if args.solo_leer:
+        for muestra in leer_muestras(args.entrada):
+            print(f"{muestra['muestra']}: {len(muestra['resultados'])} resultados"
+                  + (f", sin mapear: {', '.join(muestra['sin_mapear'])}" if muestra["sin_mapear"] else ""))
+        return 0
+
+    pacientes = leer_pacientes(args.pacientes) if args.pacientes else None
+    guardados, omitidas = importar(args.entrada, pacientes=pacientes, fecha=args.fecha)
+    for muestra, motivo in omitidas:
+        print(f"Muestra {muestra}: {motivo}", file=sys.stderr)
+    print(f"{guardados} informes guardados, {len(omitidas)} muestras omitidas")
+    return 1 if omitidas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# Vista previa para imprimir, armada desde una plantilla HTML.
+#
+# Antes cada clic en "Vista previa" creaba un DataFrame, llamaba a
+# df.to_html y dibujaba cabecera y pie con varios st.markdown. Aquí la
+# plantilla se compila una vez al importar (partes fijas y campos), el
+# informe se arma uniendo textos, sin pandas, y el fragmento queda en una
+# caché por hash del informe: volver a pedir la misma vista no rearma nada.
+#
+# La hoja de estilo de impresión deja solo el informe en una página A4 (el
+# resto de la app se oculta al imprimir).
+
+import html
+import string
+import threading
+from collections import OrderedDict
+
+from astromedic.banderas import SIMBOLOS
+from astromedic.cache_pdf import clave_informe
+
+VERSION_PLANTILLA = 1
+MAX_FRAGMENTOS = 256
+
+ESTILO = (
+    ".astro-impresion{font-family:'DejaVu Sans',Arial,sans-serif;color:#000;max-width:190mm;margin:0 auto}"
+    ".astro-impresion h2{color:#004080;font-size:16pt;text-align:center;margin:0 0 6px}"
+    ".astro-impresion .paciente{font-size:10pt;margin:0 0 6px}"
+    ".astro-impresion table{width:100%;border-collapse:collapse;font-size:10pt}"
+    ".astro-impresion th{background:#004080;color:#fff;text-align:left;padding:3px 6px}"
+    ".astro-impresion td{border-bottom:1px solid #ccc;padding:2px 6px}"
+    ".astro-impresion tr.fuera td{background:#ffcc33}"
+    ".astro-impresion tr.critico td{background:#ff9999;font-weight:bold}"
+    ".astro-impresion .pie{font-size:8pt;color:#444;text-align:center;margin-top:8px}"
+    "@media print{"
+    "@page{size:A4;margin:12mm}"
+    "body *{visibility:hidden}"
+    ".astro-impresion,.astro-impresion *{visibility:visible}"
+    ".astro-impresion{position:absolute;left:0;top:0;width:100%;page-break-inside:avoid}"
+    ".astro-impresion tr{page-break-inside:avoid}"
+    "}"
+)
+
+# Sin líneas en blanco ni sangría: st.markdown lo tomaría como markdown
+PLANTILLA = (
+    "<style>{estilo}</style>"
+    "<div class=\"astro-impresion\">"
+    "<h2>Resultado de Laboratorio Clínico - ASTROMEDIC</h2>"
+    "<p class=\"paciente\"><b>Paciente:</b> {nombre} | <b>DNI:</b> {dni} | <b>Edad:</b> {edad} | "
+    "<b>Sexo:</b> {sexo} | <b>Fecha:</b> {fecha} | <b>Médico:</b> {medico}</p>"
+    "<table><thead><tr><th>Análisis</th><th>Resultado</th><th>Unidad</th><th>Rango</th><th>✔</th></tr></thead>"
+    "<tbody>{filas}</tbody></table>"
+    "<p class=\"pie\">{pie}</p>"
+    "</div>"
+)
+FILA = "<tr class=\"{clase}\"><td>{analito}</td><td>{resultado}</td><td>{unidad}</td><td>{rango}</td><td>{simbolo}</td></tr>"
+
+# Clase de la fila según el símbolo de bandera (SIN_DATO, NORMAL, BAJO, ALTO, CRITICO)
+_CLASES = dict(zip(SIMBOLOS, ("", "", "fuera", "fuera", "critico")))
+
+
+def compilar(plantilla):
+    """Plantilla -> (partes fijas, campos): partes[i] va antes de campos[i]."""
+    partes, campos = [], []
+    for literal, campo, _, _ in string.Formatter().parse(plantilla):
+        partes.append(literal)
+        if campo is not None:
+            campos.append(campo)
+    if len(partes) == len(campos):
+        partes.append("")
+    return tuple(partes), tuple(campos)
+
+
+def rellenar(compilada, valores):
+    partes, campos = compilada
+    salida = [partes[0]]
+    for campo, parte in zip(campos, partes[1:]):
+        salida.append(valores[campo])
+        salida.append(parte)
+    return "".join(salida)
+
+
+_PLANTILLA = compilar(PLANTILLA)
+_FILA = compilar(FILA)
+
+_fragmentos = OrderedDict()
+_lock = threading.Lock()
+
+
+def _texto(valor):
+    return html.escape("" if valor is None else str(valor))
+
+
+def _fila(entrada):
+    analito, resultado, unidad, rango, simbolo = entrada[:5]
+    return rellenar(_FILA, {
+        "clase": _CLASES.get(simbolo, ""), "analito": _texto(analito), "resultado": _texto(resultado),
+        "unidad": _texto(unidad), "rango": _texto(rango), "simbolo": _texto(simbolo),
+    })
+
+
+def vista_impresion(nombre, dni, edad, sexo, medico, fecha, entradas, pie=""):
+    """HTML de la vista para imprimir; `entradas` son (analito, resultado, unidad, rango, símbolo)."""
+    cabecera = (nombre, dni, edad, sexo, medico, fecha, pie)
+    clave = clave_informe(cabecera, entradas, VERSION_PLANTILLA)
+    with _lock:
+        fragmento = _fragmentos.get(clave)
+        if fragmento is not None:
+            _fragmentos.move_to_end(clave)
+            return fragmento
+    valores = dict(zip(("nombre", "dni", "edad", "sexo", "medico", "fecha", "pie"), map(_texto, cabecera)))
+    fragmento = rellenar(_PLANTILLA, {**valores, "estilo": ESTILO, "filas": "".join(map(_fila, entradas))})
+    with _lock:
+        _fragmentos[clave] = fragmento
+        while len(_fragmentos) > MAX_FRAGMENTOS:
+            _fragmentos.popitem(last=False)
+    return fragmento
@@ -0,0 +1,65 @@
+# Generación del informe PDF de resultados (FPDF). Usa la fuente TTF de
+# astromedic.fuentes si hay una; si no, Arial core con saneado latin-1.
+
+from astromedic import fuentes
+from astromedic.recursos import ruta_logo_pdf
+from astromedic.texto import ENCABEZADOS, limpiar_tabla
+
+# Cambiarla invalida los PDF guardados en la caché (ver cache_pdf)
+VERSION_PLANTILLA = "4" + (f"+{fuentes.VERSION}" if fuentes.VERSION else "")
+
+TITULO = "ASTROMEDIC - Resultados de Laboratorio"
+LABORATORIO = (
+    "Ubicación: Av. Siempre Viva 123, Lima",
+    "Contacto: contacto@astromedic.pe | Tel: 987-654-321",
+    "Redes: Facebook / Instagram / TikTok",
+)
+# Ancho de cada columna de la tabla de resultados
+ANCHOS = (60, 30, 25, 50, 15)
+
+
+def generar_pdf(nombre, dni, edad, sexo, medico, fecha, resultados, pie=""):
+    # `pie`: líneas que van bajo la tabla, antes de los datos del laboratorio
+    # (p. ej. las de firma y sello)
+    pdf = fuentes.InformePDF()
+    familia, limpiar = fuentes.registrar(pdf) or ("Arial", limpiar_tabla)
+    # Todo el texto del informe se sanea en una sola pasada, como una tabla
+    cabecera = (
+        TITULO, f"Paciente: {nombre}", f"DNI: {dni}  Edad: {edad}  Sexo: {sexo}", f"Médico: {medico}", f"Fecha: {fecha}",
+    )
+    cabecera, pie, laboratorio, encabezados, *filas = limpiar(
+        [cabecera, pie.splitlines(), LABORATORIO, ENCABEZADOS, *resultados]
+    )
+    titulo, *paciente = cabecera
+
+    pdf.add_page()
+    pdf.image(ruta_logo_pdf(), x=178, y=8, w=22)
+    pdf.set_font(familia, "B", 16)
+    pdf.cell(0, 10, titulo, ln=True, align="C")
+    pdf.set_font(familia, "", 12)
+    for linea in paciente:
+        pdf.cell(0, 10, linea, ln=True)
+    pdf.ln(5)
+    pdf.set_font(familia, "B", 12)
+    for ancho, texto in zip(ANCHOS, encabezados):
+        pdf.cell(ancho, 10, texto, 1)
+    pdf.ln()
+
+    pdf.set_font(familia, "", 11)
+    for r in filas:
+        for ancho, texto in zip(ANCHOS, r):
+            pdf.cell(ancho, 10, texto, 1)
+        pdf.ln()
+
+    if pie:
+        pdf.ln(10)
+        pdf.set_font(familia, "", 10)
+        for linea in pie:
+            pdf.cell(0, 6, linea, ln=True)
+
+    pdf.ln(5)
+    pdf.set_font(familia, "I", 10)
+    for linea in laboratorio:
+        pdf.cell(0, 10, linea, ln=True)
+
+    return pdf.output(dest="S").encode("latin1")
@@ -0,0 +1,97 @@
+# Generación de informes PDF en lote, sin interfaz.
+#
+#   python -m astromedic.lote pacientes.csv --salida informes/
+#
+# El archivo puede ser CSV (una fila por paciente: columnas nombre, dni,
+# edad, sexo, medico, fecha y una columna por analito) o JSON (lista de
+# objetos con esos campos y "resultados": {analito: valor}). Cada PDF se
+# genera en un proceso del pool; una fila con error se informa y el lote
+# continúa con las demás.
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+CAMPOS_PACIENTE = ("nombre", "dni", "edad", "sexo", "medico", "fecha")
+
+
+def leer_pacientes(ruta):
+    if ruta.lower().endswith(".json"):
+        with open(ruta, encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        for fila in csv.DictReader(f):
+            paciente = {campo: fila.pop(campo, "") for campo in CAMPOS_PACIENTE}
+            paciente["resultados"] = {k: v for k, v in fila.items() if k and v not in ("", None)}
+            yield paciente
+
+
+def preparar_entradas(paciente):
+    from astromedic.evaluacion import evaluar, normalizar_paciente
+
+    edad, sexo = normalizar_paciente(paciente)
+    return [(*r, r.simbolo) for r in evaluar(paciente.get("resultados"), edad, sexo)]
+
+
+def nombre_archivo(paciente, indice):
+    base = f"resultado_{paciente.get('dni') or indice}_{paciente.get('fecha') or ''}".rstrip("_")
+    return re.sub(r"[^\w.-]", "_", base) + ".pdf"
+
+
+def renderizar(tarea):
+    # Se ejecuta en un proceso del pool: devuelve (índice, ruta, error)
+    indice, paciente, salida = tarea
+    try:
+        from astromedic.cache_pdf import pdf_en_cache
+
+        entradas = preparar_entradas(paciente)
+        pdf_bytes = pdf_en_cache(
+            paciente.get("nombre", ""), paciente.get("dni", ""), paciente.get("edad", ""),
+            paciente.get("sexo", ""), paciente.get("medico", ""), paciente.get("fecha", ""),
+            entradas,
+        )
+        ruta = os.path.join(salida, nombre_archivo(paciente, indice))
+        with open(ruta, "wb") as f:
+            f.write(pdf_bytes)
+        return indice, ruta, None
+    except Exception as e:
+        return indice, None, f"{type(e).__name__}: {e}"
+
+
+def generar_lote(ruta_entrada, salida, procesos=None, chunksize=8):
+    os.makedirs(salida, exist_ok=True)
+    tareas = [(i, p, salida) for i, p in enumerate(leer_pacientes(ruta_entrada), start=1)]
+    generados, errores = [], []
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for indice, ruta, error in pool.map(renderizar, tareas, chunksize=chunksize):
+            if error:
+                errores.append((indice, error))
+            else:
+                generados.append(ruta)
+    return generados, errores, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera en lote los informes PDF de ASTROMEDIC")
+    parser.add_argument("entrada", help="archivo CSV o JSON con pacientes y resultados")
+    parser.add_argument("--salida", default="informes", help="carpeta destino de los PDF")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos del pool (por defecto, uno por núcleo)")
+    args = parser.parse_args(argv)
+
+    generados, errores, segundos = generar_lote(args.entrada, args.salida, args.procesos)
+    for indice, error in errores:
+        print(f"Fila {indice}: {error}", file=sys.stderr)
+    ritmo = len(generados) / segundos if segundos else 0.0
+    print(f"{len(generados)} PDF generados en {segundos:.2f} s ({ritmo:.1f} PDF/s), {len(errores)} con error")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
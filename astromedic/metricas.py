@@ -0,0 +1,178 @@
+# Instrumentación de cada rerun: cronómetros por sección y reruns por sesión.
+#
+#   metricas.inicio_rerun()
+#   with metricas.seccion("encabezado"):
+#       ...
+#   metricas.fin_rerun()
+#
+# Con ASTROMEDIC_METRICAS vacío, `seccion` devuelve siempre el mismo
+# contexto nulo y las demás funciones vuelven de inmediato. Activadas, se
+# exporta en la carpeta de datos:
+#   - "prom": metricas.prom, texto de Prometheus (histogramas por sección y
+#     totales de reruns y de sesiones, sin etiqueta por sesión), reescrito
+#     como mucho cada METRICAS_INTERVALO_S; sirve para el textfile collector
+#     de node_exporter.
+#   - "json": metricas.jsonl, una línea por rerun con los ms de cada sección;
+#     al pasar de 5 MB se rota a metricas.jsonl.1.
+
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from astromedic import config
+
+ACTIVAS = bool(config.METRICAS)
+LIMITES_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MAX_JSONL = 5 * 1024 * 1024
+MAX_SESIONES = 1000
+
+_NULO = contextlib.nullcontext()
+_lock = threading.Lock()
+_local = threading.local()
+_histogramas = {}  # sección -> [conteos por límite..., +Inf, suma]
+# Sesión -> reruns, solo para numerar las líneas del JSONL: guarda las
+# MAX_SESIONES usadas más recientemente (una que vuelve después de salir
+# cuenta como sesión nueva)
+_reruns = OrderedDict()
+_total_reruns = 0
+_total_sesiones = 0
+_ultima_exportacion = 0.0
+
+
+class _Seccion:
+    __slots__ = ("nombre", "inicio")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registrar(self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+
+def seccion(nombre):
+    if not ACTIVAS:
+        return _NULO
+    return _Seccion(nombre)
+
+
+def registrar(nombre, segundos):
+    with _lock:
+        cubetas = _histogramas.get(nombre)
+        if cubetas is None:
+            cubetas = _histogramas[nombre] = [0] * (len(LIMITES_S) + 1) + [0.0]
+        for i, limite in enumerate(LIMITES_S):
+            if segundos <= limite:
+                cubetas[i] += 1
+                break
+        else:
+            cubetas[len(LIMITES_S)] += 1
+        cubetas[-1] += segundos
+    registro = getattr(_local, "registro", None)
+    if registro is not None:
+        registro["secciones"][nombre] = round(registro["secciones"].get(nombre, 0.0) + segundos * 1000, 3)
+
+
+def _sesion_actual():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+        return ctx.session_id if ctx else "-"
+    except Exception:
+        return "-"
+
+
+def inicio_rerun():
+    if not ACTIVAS:
+        return
+    global _total_reruns, _total_sesiones
+    sesion = _sesion_actual()
+    with _lock:
+        numero = _reruns.pop(sesion, 0) + 1
+        _reruns[sesion] = numero
+        if len(_reruns) > MAX_SESIONES:
+            _reruns.popitem(last=False)
+        _total_reruns += 1
+        _total_sesiones += numero == 1
+    _local.registro = {"ts": time.time(), "sesion": sesion, "rerun": numero, "secciones": {}}
+    _local.inicio = time.perf_counter()
+
+
+def fin_rerun():
+    if not ACTIVAS:
+        return
+    registro = getattr(_local, "registro", None)
+    if registro is None:
+        return
+    registrar("rerun", time.perf_counter() - _local.inicio)
+    _local.registro = None
+    if "json" in config.METRICAS:
+        _escribir_jsonl(registro)
+    if "prom" in config.METRICAS:
+        exportar_prometheus()
+
+
+def _ruta(nombre):
+    os.makedirs(config.DIRECTORIO_DATOS, exist_ok=True)
+    return os.path.join(config.DIRECTORIO_DATOS, nombre)
+
+
+def _escribir_jsonl(registro):
+    ruta = _ruta("metricas.jsonl")
+    linea = json.dumps(registro, ensure_ascii=False) + "\n"
+    with _lock:
+        try:
+            if os.path.getsize(ruta) > MAX_JSONL:
+                os.replace(ruta, ruta + ".1")
+        except FileNotFoundError:
+            pass
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(linea)
+
+
+def texto_prometheus():
+    lineas = [
+        "# HELP astromedic_seccion_segundos Duración de cada sección del rerun",
+        "# TYPE astromedic_seccion_segundos histogram",
+    ]
+    with _lock:
+        histogramas = {nombre: list(c) for nombre, c in _histogramas.items()}
+        reruns, sesiones = _total_reruns, _total_sesiones
+    for nombre, cubetas in sorted(histogramas.items()):
+        acumulado = 0
+        for limite, conteo in zip(LIMITES_S, cubetas):
+            acumulado += conteo
+            lineas.append(f'astromedic_seccion_segundos_bucket{{seccion="{nombre}",le="{limite}"}} {acumulado}')
+        acumulado += cubetas[len(LIMITES_S)]
+        lineas.append(f'astromedic_seccion_segundos_bucket{{seccion="{nombre}",le="+Inf"}} {acumulado}')
+        lineas.append(f'astromedic_seccion_segundos_sum{{seccion="{nombre}"}} {cubetas[-1]:.6f}')
+        lineas.append(f'astromedic_seccion_segundos_count{{seccion="{nombre}"}} {acumulado}')
+    # Reruns por sesión en promedio = reruns_total / sesiones_total
+    lineas.append("# HELP astromedic_reruns_total Reruns del script")
+    lineas.append("# TYPE astromedic_reruns_total counter")
+    lineas.append(f"astromedic_reruns_total {reruns}")
+    lineas.append("# HELP astromedic_sesiones_total Sesiones con al menos un rerun")
+    lineas.append("# TYPE astromedic_sesiones_total counter")
+    lineas.append(f"astromedic_sesiones_total {sesiones}")
+    return "\n".join(lineas) + "\n"
+
+
+def exportar_prometheus(forzar=False):
+    global _ultima_exportacion
+    ahora = time.monotonic()
+    if not forzar and ahora - _ultima_exportacion < config.METRICAS_INTERVALO_S:
+        return
+    _ultima_exportacion = ahora
+    ruta = _ruta("metricas.prom")
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(texto_prometheus())
+    os.replace(temporal, ruta)
@@ -0,0 +1,84 @@
+# Registro de paneles de análisis.
+#
+# Cada módulo de este paquete define uno o más paneles y los registra con
+# `registrar_panel` al importarse; `cargar_paneles` importa todos los
+# módulos del paquete una sola vez por proceso. Agregar un análisis nuevo
+# es agregar un módulo aquí, sin tocar la app.
+#
+# El registro se reemplaza entero en cada cambio (bajo `_lock`) y nunca se
+# modifica en el lugar: quien lo lee, p. ej. un rerun mientras el vigilante
+# del catálogo resincroniza los paneles, ve el de antes o el de después.
+
+import importlib
+import pkgutil
+import threading
+
+_PANELES = {}
+_cargados = False
+_lock = threading.RLock()
+
+
+class Panel:
+    """Un análisis: sus analitos y cómo resolver sus referencias.
+
+    `referencias(edad, sexo)` devuelve, por analito, una tupla
+    (unidad, mínimo, máximo, rango en texto); un límite ausente es NaN.
+    """
+
+    __slots__ = ("nombre", "analitos", "orden", "_referencias")
+
+    def __init__(self, nombre, analitos, referencias, orden=100):
+        self.nombre = nombre
+        self.analitos = tuple(analitos)
+        self.orden = orden
+        self._referencias = referencias
+
+    def referencias(self, edad, sexo):
+        return self._referencias(edad, sexo)
+
+
+def registrar_panel(panel):
+    global _PANELES
+    with _lock:
+        if panel.nombre in _PANELES:
+            raise ValueError(f"Panel ya registrado: {panel.nombre}")
+        _PANELES = {**_PANELES, panel.nombre: panel}
+    return panel
+
+
+def reemplazar_paneles(quitar, nuevos):
+    """Quita los paneles `quitar` y agrega `nuevos` en un solo cambio.
+
+    Si un panel nuevo usa el nombre de otro que sigue registrado (o de otro
+    nuevo), lanza ValueError y el registro queda como estaba. Devuelve los
+    nombres agregados.
+    """
+    global _PANELES
+    with _lock:
+        registro = {nombre: p for nombre, p in _PANELES.items() if nombre not in quitar}
+        agregados = []
+        for p in nuevos:
+            if p.nombre in registro:
+                raise ValueError(f"Panel ya registrado: {p.nombre}")
+            registro[p.nombre] = p
+            agregados.append(p.nombre)
+        _PANELES = registro
+    return agregados
+
+
+def cargar_paneles():
+    global _cargados
+    if not _cargados:
+        for modulo in pkgutil.iter_modules(__path__):
+            importlib.import_module(f"{__name__}.{modulo.name}")
+        _cargados = True
+    return paneles()
+
+
+def paneles():
+    return dict(sorted(_PANELES.items(), key=lambda item: item[1].orden))
+
+
+def panel(nombre):
+    cargar_paneles()
+    return _PANELES[nombre]
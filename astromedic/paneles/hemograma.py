@@ -0,0 +1,21 @@
+# Hemograma con valores referenciales según edad y sexo
+
+from astromedic.paneles import Panel, registrar_panel
+from astromedic.referencias import catalogo, formatear_rango
+
+ANALITOS = (
+    "Glóbulos blancos", "Abastonados", "Segmentados", "Eosinófilos", "Basófilos",
+    "Linfocitos", "Monocitos", "Abastonados abs", "Segmentados abs", "Eosinófilos abs",
+    "Basófilos abs", "Linfocitos abs", "Monocitos abs", "Eritrocitos", "Hemoglobina", "Hematocrito",
+    "MCV", "MCH", "MCHC", "RDW – SD", "RDW – CV", "Plaquetas",
+)
+
+
+def _referencias(edad, sexo):
+    return [
+        (unidad, ref_min, ref_max, formatear_rango(ref_min, ref_max))
+        for unidad, ref_min, ref_max in catalogo().indice.lookup_many(ANALITOS, edad, sexo)
+    ]
+
+
+registrar_panel(Panel("Hemograma", ANALITOS, _referencias, orden=10))
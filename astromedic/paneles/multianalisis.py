@@ -0,0 +1,48 @@
+# Paneles del formulario multi análisis (los "paneles" del catálogo), con
+# rangos fijos. Uno cuyo nombre ya usa un panel propio (el Hemograma por
+# edad y sexo) se registra como "<nombre> (rangos fijos)" y queda un aviso
+# en el log. Si el catálogo se recarga, estos paneles se vuelven a armar
+# con la versión nueva.
+
+import logging
+import threading
+
+from astromedic.banderas import limites
+from astromedic.paneles import Panel, paneles, reemplazar_paneles
+from astromedic.referencias import al_recargar, catalogo, formatear_rango
+
+from astromedic.paneles import hemograma  # noqa: F401  (se registra primero)
+
+log = logging.getLogger(__name__)
+
+_propios = set()
+_lock = threading.Lock()
+
+
+def _panel_fijo(nombre, filas):
+    referencias = [
+        (unidad, *limites(ref_min, ref_max), formatear_rango(ref_min, ref_max))
+        for _, unidad, ref_min, ref_max in filas
+    ]
+    return Panel(nombre, [f[0] for f in filas], lambda edad, sexo: referencias, orden=50)
+
+
+@al_recargar
+def _sincronizar(actual):
+    # Llamado también desde el hilo que vigila el catálogo: los paneles
+    # nuevos se arman aparte y reemplazan a los anteriores de una vez
+    with _lock:
+        ajenos = paneles().keys() - _propios
+        nuevos = []
+        for nombre, filas in actual.analisis_db.items():
+            if nombre in ajenos:
+                propio = f"{nombre} (rangos fijos)"
+                log.warning("El panel %r del catálogo choca con uno ya registrado; se registra como %r", nombre, propio)
+                nombre = propio
+            nuevos.append(_panel_fijo(nombre, filas))
+        agregados = reemplazar_paneles(_propios, nuevos)
+        _propios.clear()
+        _propios.update(agregados)
+
+
+_sincronizar(catalogo())
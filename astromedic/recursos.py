@@ -0,0 +1,74 @@
+# Logo y demás imágenes, decodificados y escalados una sola vez por proceso.
+#
+# El PNG original es de 3375x3375; decodificarlo en cada rerun y dejar que
+# st.image lo vuelva a codificar era la mayor parte del costo del encabezado.
+# Aquí se genera una sola vez una versión al tamaño de pantalla (para
+# st.image) y otra aplanada a RGB para FPDF, compartidas por todas las
+# sesiones del servidor y guardadas en disco para los siguientes arranques.
+
+import os
+import threading
+from functools import lru_cache
+
+from astromedic import config
+
+RUTA_LOGO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Mesa de trabajo - logo astromedic laboratorio 1.png",
+)
+
+_lock = threading.Lock()
+
+
+def _escalar(ruta, ancho):
+    from PIL import Image
+
+    with Image.open(ruta) as imagen:
+        imagen = imagen.convert("RGBA")
+        alto = round(imagen.height * ancho / imagen.width)
+        # Primero se reduce por un factor entero (promedio por bloques) hasta
+        # no menos del doble del tamaño final y LANCZOS termina desde ahí:
+        # a la vista queda igual y tarda la mitad que desde 3375 px
+        factor = imagen.width // (ancho * 2)
+        if factor > 1:
+            imagen = imagen.reduce(factor)
+        return imagen.resize((ancho, alto), Image.LANCZOS)
+
+
+def _en_disco(nombre, generar):
+    # Las versiones escaladas se guardan en la carpeta de datos: un proceso
+    # nuevo las lee ya listas en vez de decodificar el PNG original
+    directorio = os.path.join(config.DIRECTORIO_DATOS, "recursos")
+    ruta = os.path.join(directorio, nombre)
+    with _lock:
+        if not os.path.exists(ruta) or os.path.getmtime(ruta) < os.path.getmtime(RUTA_LOGO):
+            os.makedirs(directorio, exist_ok=True)
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            generar().save(temporal, format="PNG", optimize=True)
+            os.replace(temporal, ruta)
+    return ruta
+
+
+@lru_cache(maxsize=8)
+def logo_png(ancho=400):
+    """PNG del logo escalado a `ancho` px (el doble del ancho mostrado, para pantallas HiDPI)."""
+    with open(_en_disco(f"logo_{ancho}.png", lambda: _escalar(RUTA_LOGO, ancho)), "rb") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=8)
+def ruta_logo_pdf(ancho=300):
+    """Ruta de un PNG RGB del logo, ya escalado, listo para FPDF.image().
+
+    FPDF 1.7.2 solo acepta rutas y no soporta canal alfa, así que el logo se
+    aplana sobre blanco.
+    """
+    def generar():
+        from PIL import Image
+
+        imagen = _escalar(RUTA_LOGO, ancho)
+        fondo = Image.new("RGB", imagen.size, "white")
+        fondo.paste(imagen, mask=imagen.getchannel("A"))
+        return fondo
+
+    return _en_disco(f"logo_pdf_{ancho}.png", generar)
@@ -0,0 +1,238 @@
+# Catálogo de valores referenciales (hemograma por edad y sexo, paneles de
+# rangos fijos, valores críticos y umbrales de delta check).
+#
+# Los datos están en catalogo.json (o en ASTROMEDIC_CATALOGO), con un número
+# de versión. Al cargarlo se compila el índice: cada combinación (analito,
+# banda de edad, sexo) queda resuelta de antemano, así que una consulta es un
+# único acceso a diccionario y no reconstruye nada por rerun.
+#
+# Recarga en caliente: un hilo revisa la fecha del archivo cada
+# CATALOGO_REVISAR_S segundos y, si cambió, arma un Catalogo nuevo y lo
+# reemplaza de una vez; quien ya tenía el anterior termina con ese. Un archivo
+# inválido (o a medio escribir) no reemplaza al que está en uso.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from astromedic import config
+
+SEXOS = ("Masculino", "Femenino")
+BANDAS = ("RN", "2-11m", "Niño", "Adulto")
+
+log = logging.getLogger(__name__)
+
+
+def banda_edad(edad):
+    if edad < 1:
+        return "RN"
+    elif edad < 2:
+        return "2-11m"
+    elif edad <= 12:
+        return "Niño"
+    return "Adulto"
+
+
+def _resolver(rangos, banda, sexo):
+    # Los adultos usan el rango de su sexo; si una banda pediátrica no está
+    # definida (p. ej. "2-11m" en Eritrocitos) se usa la de "Niño".
+    if banda == "Adulto":
+        return rangos[sexo]
+    if banda in rangos:
+        return rangos[banda]
+    return rangos["Niño"]
+
+
+class IndiceReferencias:
+    """Índice inmutable (analito, banda, sexo) -> (unidad, mínimo, máximo)."""
+
+    __slots__ = ("_tabla", "analitos", "_nombres")
+
+    def __init__(self, ref_map):
+        tabla = {}
+        for analito, rangos in ref_map.items():
+            for banda in BANDAS:
+                for sexo in SEXOS:
+                    if isinstance(rangos, dict):
+                        tabla[(analito, banda, sexo)] = _resolver(rangos, banda, sexo)
+                    else:
+                        tabla[(analito, banda, sexo)] = rangos
+        self._tabla = MappingProxyType(tabla)
+        self.analitos = tuple(ref_map)
+        self._nombres = frozenset(self.analitos)
+
+    def get(self, nombre, edad, sexo):
+        return self._tabla[(nombre, banda_edad(edad), sexo)]
+
+    def lookup_many(self, analitos, edad, sexo):
+        banda = banda_edad(edad)
+        tabla = self._tabla
+        return [tabla[(analito, banda, sexo)] for analito in analitos]
+
+    def __contains__(self, analito):
+        return analito in self._nombres
+
+    def __len__(self):
+        return len(self._tabla)
+
+
+def formatear_rango(ref_min, ref_max):
+    if ref_max == "":
+        return f"< {str(ref_min).lstrip('<').strip()}"
+    return f"{ref_min} - {ref_max}"
+
+
+def _limites_fila(ref_min, ref_max):
+    # ("70", "110") -> (70.0, 110.0); ("<140", "") -> (NaN, 140.0)
+    texto = str(ref_min).strip()
+    if ref_max == "" and texto.startswith("<"):
+        return float("nan"), float(texto[1:])
+    if ref_max == "" and texto.startswith(">"):
+        return float(texto[1:]), float("nan")
+    return float(texto), float(ref_max)
+
+
+class Catalogo:
+    """Una versión del catálogo, ya compilada; no se modifica."""
+
+    __slots__ = ("version", "huella", "ref_map", "analisis_db", "criticos", "umbrales_delta", "indice", "_filas", "_limites")
+
+    def __init__(self, datos, huella=""):
+        self.version = str(datos["version"])
+        self.huella = huella
+        self.ref_map = MappingProxyType({
+            analito: {g: tuple(r) for g, r in rangos.items()} if isinstance(rangos, dict) else tuple(rangos)
+            for analito, rangos in datos["referencias"].items()
+        })
+        self.analisis_db = MappingProxyType({
+            nombre: tuple(tuple(fila) for fila in filas) for nombre, filas in datos["paneles"].items()
+        })
+        self.criticos = MappingProxyType({a: tuple(v) for a, v in datos.get("criticos", {}).items()})
+        self.umbrales_delta = MappingProxyType({a: tuple(v) for a, v in datos.get("delta", {}).items()})
+        self.indice = IndiceReferencias(self.ref_map)
+        self._filas = {fila[0]: fila for filas in self.analisis_db.values() for fila in filas}
+        self._limites = {analito: (unidad, *_limites_fila(ref_min, ref_max)) for analito, unidad, ref_min, ref_max in self._filas.values()}
+
+    @property
+    def etiqueta(self):
+        """Lo que se guarda con cada informe: versión declarada y huella del contenido."""
+        return f"{self.version}#{self.huella}" if self.huella else self.version
+
+    def referencia_texto(self, analito, edad, sexo):
+        if analito in self.indice:
+            unidad, ref_min, ref_max = self.indice.get(analito, edad, sexo)
+            return unidad, formatear_rango(ref_min, ref_max)
+        if analito in self._filas:
+            _, unidad, ref_min, ref_max = self._filas[analito]
+            return unidad, formatear_rango(ref_min, ref_max)
+        raise KeyError(f"Analito desconocido: {analito}")
+
+    def limites(self, analito, edad, sexo):
+        """(unidad, mínimo, máximo) numéricos de cualquier analito; NaN si falta un límite."""
+        if analito in self.indice:
+            unidad, ref_min, ref_max = self.indice.get(analito, edad, sexo)
+            return unidad, float(ref_min), float(ref_max)
+        if analito in self._limites:
+            return self._limites[analito]
+        raise KeyError(f"Analito desconocido: {analito}")
+
+
+RUTA_CATALOGO = config.CATALOGO or os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogo.json")
+
+_lock = threading.Lock()
+_actual = None
+_firma = None
+_al_recargar = []
+
+
+def leer_catalogo(ruta):
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    try:
+        return Catalogo(json.loads(contenido), hashlib.sha256(contenido).hexdigest()[:12])
+    except (ValueError, KeyError, TypeError, AttributeError) as error:
+        raise ValueError(f"Catálogo inválido ({ruta}): {error!r}") from error
+
+
+def recargar():
+    """Vuelve a leer el archivo si cambió; devuelve el catálogo vigente."""
+    global _actual, _firma
+    with _lock:
+        try:
+            estado = os.stat(RUTA_CATALOGO)
+        except OSError:
+            if _actual is None:
+                raise
+            return _actual
+        firma = (estado.st_mtime_ns, estado.st_size)
+        if firma == _firma:
+            return _actual
+        try:
+            nuevo = leer_catalogo(RUTA_CATALOGO)
+        except (OSError, ValueError):
+            if _actual is None:
+                raise
+            log.exception("No se recargó el catálogo; se sigue usando %s", _actual.etiqueta)
+            return _actual
+        anterior, _actual, _firma = _actual, nuevo, firma
+    if anterior is not None:
+        log.info("Catálogo recargado: %s -> %s", anterior.etiqueta, nuevo.etiqueta)
+        for funcion in _al_recargar:
+            funcion(nuevo)
+    return nuevo
+
+
+def _vigilar():
+    while True:
+        time.sleep(config.CATALOGO_REVISAR_S)
+        try:
+            recargar()
+        except Exception:
+            log.exception("Error al revisar el catálogo")
+
+
+def catalogo():
+    """Catálogo vigente."""
+    return _actual
+
+
+def al_recargar(funcion):
+    """Registra `funcion(catalogo)` para cuando se recarga el catálogo."""
+    _al_recargar.append(funcion)
+    return funcion
+
+
+def get_referencia(nombre, edad, sexo):
+    return _actual.indice.get(nombre, edad, sexo)
+
+
+def lookup_many(analitos, edad, sexo):
+    return _actual.indice.lookup_many(analitos, edad, sexo)
+
+
+def referencia_texto(analito, edad, sexo):
+    """(unidad, rango) de cualquier analito conocido, del hemograma o de los paneles."""
+    return catalogo().referencia_texto(analito, edad, sexo)
+
+
+_NOMBRES = {
+    "REF_MAP": "ref_map", "ANALISIS_DB": "analisis_db", "INDICE": "indice",
+    "VALORES_CRITICOS": "criticos", "UMBRALES_DELTA": "umbrales_delta",
+}
+
+
+def __getattr__(nombre):
+    # Nombres de antes del catálogo externo; siempre los de la versión vigente
+    if nombre in _NOMBRES:
+        return getattr(catalogo(), _NOMBRES[nombre])
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+recargar()
+# La revisión corre en su propio hilo: consultar el catálogo no cuesta nada
+if config.CATALOGO_REVISAR_S > 0:
+    threading.Thread(target=_vigilar, name="astromedic-catalogo", daemon=True).start()
@@ -0,0 +1,149 @@
+# Registro compacto de un resultado.
+#
+# Antes cada resultado viajaba como una tupla de textos
+# (analito, resultado, unidad, "4000 - 10000") y el rango se volvía a parsear
+# cada vez que había que marcarlo. Un Resultado guarda el valor y los límites
+# como números y la bandera ya calculada; el texto del rango se arma solo al
+# mostrarlo en la tabla o el PDF. Analitos, unidades y límites del catálogo
+# vigente son un único objeto compartido por todos los registros.
+#
+# Iterar un Resultado da la fila de texto de siempre, así que
+# pd.DataFrame(resultados, columns=[...]) y (*r, simbolo) siguen funcionando.
+
+import math
+
+from astromedic.banderas import SIMBOLOS, a_numeros, limites, marcar_analitos
+from astromedic.referencias import al_recargar, catalogo
+
+_NAN = float("nan")
+
+# Textos (analitos, unidades) y límites del catálogo vigente -> el objeto que
+# comparten los registros. Solo se arman con el catálogo: lo que llega del
+# importador, la API o informes viejos no se agrega, así no crecen con el uso
+# de un servidor que corre semanas.
+_TEXTOS = {}
+_LIMITES = {}
+
+
+def texto_numero(numero):
+    # 4000.0 -> "4000", 11.5 -> "11.5", 5500000.0 -> "5500000" (sin notación e)
+    texto = repr(float(numero))
+    return texto[:-2] if texto.endswith(".0") else texto
+
+
+def formatear_limites(minimo, maximo):
+    if math.isnan(minimo):
+        return "" if math.isnan(maximo) else f"< {texto_numero(maximo)}"
+    if math.isnan(maximo):
+        return f"> {texto_numero(minimo)}"
+    return f"{texto_numero(minimo)} - {texto_numero(maximo)}"
+
+
+def limites_compartidos(minimo, maximo):
+    """Tupla (mínimo, máximo); NaN (o None) = sin ese límite. La del catálogo si es uno de sus rangos."""
+    # NaN se normaliza a un único objeto para que sirva como clave
+    minimo = _NAN if minimo is None or minimo != minimo else float(minimo)
+    maximo = _NAN if maximo is None or maximo != maximo else float(maximo)
+    par = (minimo, maximo)
+    return _LIMITES.get(par, par)
+
+
+def texto_compartido(texto):
+    return _TEXTOS.get(texto, texto)
+
+
+@al_recargar
+def _internar(actual):
+    # Tablas nuevas enteras: un registro que se arma mientras tanto usa las
+    # de antes o las de después
+    global _TEXTOS, _LIMITES
+    textos = {"": ""}
+    pares = {}
+    analitos = list(actual.ref_map) + [fila[0] for filas in actual.analisis_db.values() for fila in filas]
+    for analito in analitos:
+        textos.setdefault(analito, analito)
+        for edad in (0, 1, 5, 30):
+            for sexo in ("Masculino", "Femenino"):
+                unidad, minimo, maximo = actual.limites(analito, edad, sexo)
+                textos.setdefault(unidad, unidad)
+                par = limites_compartidos(minimo, maximo)
+                pares.setdefault(par, par)
+    _TEXTOS, _LIMITES = textos, pares
+
+
+class Resultado:
+    """Un resultado: valor, límites, unidad y bandera, sin textos derivados."""
+
+    __slots__ = ("analito", "texto", "valor", "limites", "unidad", "codigo", "_rango")
+
+    def __init__(self, analito, texto, valor, limites, unidad, codigo, rango=None):
+        # `limites` viene de limites_compartidos
+        self.analito = texto_compartido(analito)
+        self.texto = texto
+        self.valor = valor
+        self.limites = limites
+        self.unidad = texto_compartido(unidad or "")
+        self.codigo = codigo
+        # Solo si el rango no sale de los límites (texto libre de un informe viejo)
+        self._rango = rango
+
+    @property
+    def minimo(self):
+        return self.limites[0]
+
+    @property
+    def maximo(self):
+        return self.limites[1]
+
+    @property
+    def rango(self):
+        return self._rango if self._rango is not None else formatear_limites(*self.limites)
+
+    @property
+    def simbolo(self):
+        return SIMBOLOS[self.codigo]
+
+    def __iter__(self):
+        # La fila de texto: (analito, resultado, unidad, rango)
+        return iter((self.analito, self.texto, self.unidad, self.rango))
+
+    def __repr__(self):
+        return f"Resultado({self.analito!r}, {self.texto!r}, {self.unidad!r}, {self.rango!r}, codigo={self.codigo})"
+
+
+def registros(analitos, textos, minimos, maximos, unidades, codigos=None, rangos=None):
+    """Resultados de un panel; sin `codigos`, se marcan aquí (con valores críticos).
+
+    `rangos` (opcional) son los textos que ya se mostraron; solo se guardan
+    los que no coinciden con lo que se arma a partir de los límites.
+    """
+    valores = a_numeros(textos)
+    if codigos is None:
+        codigos = marcar_analitos(analitos, valores, minimos, maximos)
+    resultados = [
+        Resultado(
+            analito, texto, None if math.isnan(valor) else float(valor),
+            limites_compartidos(minimo, maximo), unidad, int(codigo),
+        )
+        for analito, texto, valor, minimo, maximo, unidad, codigo
+        in zip(analitos, textos, valores, minimos, maximos, unidades, codigos)
+    ]
+    for resultado, rango in zip(resultados, rangos or ()):
+        if rango != resultado.rango:
+            resultado._rango = rango
+    return resultados
+
+
+def desde_filas(filas):
+    """Resultados a partir de filas de texto (analito, resultado, unidad, rango, ...)."""
+    if filas and isinstance(filas[0], Resultado):
+        return list(filas)
+    pares = [limites(f[3]) for f in filas]
+    return registros(
+        [f[0] for f in filas], ["" if f[1] is None else str(f[1]) for f in filas],
+        [p[0] for p in pares], [p[1] for p in pares], [f[2] for f in filas],
+        rangos=["" if f[3] is None else str(f[3]) for f in filas],
+    )
+
+
+_internar(catalogo())
@@ -0,0 +1,75 @@
+# Tablero del laboratorio: volumen, resultados fuera de rango y informes
+# por médico de hoy, esta semana y este mes.
+#
+# Todo sale de AlmacenResultados.resumen, que lee los totales acumulados al
+# guardar cada informe (no recorre el historial).
+
+from datetime import date
+
+import streamlit as st
+
+PERIODOS = ("Hoy", "Esta semana", "Este mes")
+
+
+def _tasa(parte, total):
+    return parte / total * 100 if total else 0.0
+
+
+def tabla_analitos(analitos):
+    """Filas del tablero por analito, de mayor a menor % fuera de rango."""
+    filas = []
+    for analito, c in analitos.items():
+        evaluados = c["resultados"] - c["sin_dato"]
+        fuera = c["bajos"] + c["altos"] + c["criticos"]
+        filas.append({
+            "Análisis": analito,
+            "Resultados": c["resultados"],
+            "Promedio": round(c["suma"] / c["valores"], 2) if c["valores"] else None,
+            "Bajos": c["bajos"],
+            "Altos": c["altos"],
+            "Críticos": c["criticos"],
+            "% fuera de rango": round(_tasa(fuera, evaluados), 1),
+        })
+    return sorted(filas, key=lambda f: (-f["% fuera de rango"], f["Análisis"]))
+
+
+def mostrar_resumen(resumen):
+    import pandas as pd
+
+    analitos = resumen["analitos"].values()
+    resultados = sum(c["resultados"] for c in analitos)
+    evaluados = resultados - sum(c["sin_dato"] for c in analitos)
+    fuera = sum(c["bajos"] + c["altos"] + c["criticos"] for c in analitos)
+    criticos = sum(c["criticos"] for c in analitos)
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Informes", resumen["informes"])
+    c2.metric("Resultados", resultados)
+    c3.metric("Fuera de rango", f"{_tasa(fuera, evaluados):.1f} %")
+    c4.metric("Críticos", criticos)
+    if not resumen["informes"]:
+        st.caption("Sin informes en este período")
+        return
+
+    st.markdown("**Por análisis**")
+    st.dataframe(pd.DataFrame(tabla_analitos(resumen["analitos"])), hide_index=True, width="stretch")
+    st.markdown("**Por médico**")
+    st.dataframe(
+        pd.DataFrame(
+            [(medico or "(sin médico)", informes) for medico, informes in resumen["medicos"].items()],
+            columns=["Médico", "Informes"],
+        ),
+        hide_index=True, width="stretch",
+    )
+
+
+def tablero(hoy=None):
+    from astromedic.almacen import almacen, periodos
+
+    st.subheader("Tablero del laboratorio")
+    hoy = hoy or date.today()
+    claves = periodos(hoy)
+    for pestana, nombre, clave in zip(st.tabs(list(PERIODOS)), PERIODOS, claves):
+        with pestana:
+            st.caption(f"{nombre}: {clave}")
+            mostrar_resumen(almacen().resumen(clave))
@@ -0,0 +1,64 @@
+# Tipos de trabajo que corre la cola (astromedic.trabajos).
+#
+# Lo que se encola es el tipo y sus argumentos (en la cola compartida, como
+# JSON), nunca código: una réplica solo corre las funciones registradas
+# aquí. Cada tipo dice además dónde queda su resultado, para que otra
+# réplica lo lea sin que la cola lo guarde (los PDF, en la caché de PDF).
+#
+# Este módulo lo importan los procesos del pool: no crea componentes al
+# importarse.
+
+
+class Tarea:
+    __slots__ = ("correr", "leer")
+
+    def __init__(self, correr, leer):
+        self.correr = correr
+        self.leer = leer
+
+
+TAREAS = {}
+
+
+def _tarea(tipo, leer):
+    def registrar(funcion):
+        TAREAS[tipo] = Tarea(funcion, leer)
+        return funcion
+    return registrar
+
+
+def buscar(tipo):
+    try:
+        return TAREAS[tipo]
+    except KeyError:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo!r}") from None
+
+
+def correr(tipo, args):
+    """Corre el trabajo (en el proceso del pool) y devuelve su resultado."""
+    return buscar(tipo).correr(*args)
+
+
+def leer(tipo, id_trabajo):
+    """Resultado de un trabajo terminado, o None si ya no está disponible."""
+    return buscar(tipo).leer(id_trabajo)
+
+
+def _pdf_guardado(clave):
+    from astromedic.cache_pdf import cache
+
+    return cache.obtener(clave)
+
+
+@_tarea("pdf", leer=_pdf_guardado)
+def _pdf(clave, cabecera, resultados, pie=""):
+    # El id del trabajo es la clave del informe: el PDF queda en la caché
+    # con esa clave, así lo encuentra cualquier réplica. Se encola solo si
+    # faltaba, y la memoria de este proceso puede tener una copia que ya no
+    # está en disco: se genera y se guarda siempre.
+    from astromedic.cache_pdf import cache
+    from astromedic.informe import generar_pdf
+
+    datos = generar_pdf(*cabecera, resultados, pie)
+    cache.guardar(clave, datos)
+    return datos
@@ -0,0 +1,96 @@
+# Saneado de texto para el PDF (fuentes core de FPDF: solo latin-1).
+#
+# La tabla de transliteración se arma una vez al importar: los caracteres
+# latin-1 quedan como están (tildes, ñ, ³, µ...), los que no lo son se
+# reemplazan por su equivalente más cercano ("–" -> "-", "≤" -> "<=") y los
+# íconos de bandera por una marca de texto. Un carácter que no está en la
+# tabla se resuelve la primera vez que aparece (NFKD sin marcas combinantes)
+# y queda guardado, así que nunca se normaliza dos veces lo mismo.
+#
+# El texto ASCII vuelve tal cual y el resto pasa por str.translate. Las
+# tablas de resultados van por limpiar_tabla: casi todas sus celdas
+# (analitos, unidades, rangos, banderas, encabezados) salen del catálogo y
+# ya están saneadas en CELDAS, así que cuestan una consulta a un dict.
+
+import unicodedata
+
+from astromedic.banderas import SIMBOLOS
+from astromedic.referencias import catalogo, formatear_rango
+
+REEMPLAZOS = {
+    "–": "-", "—": "-", "‐": "-", "‑": "-", "‒": "-", "−": "-",
+    "‘": "'", "’": "'", "‚": "'", "“": '"', "”": '"', "„": '"',
+    "…": "...", "•": "-", "≤": "<=", "≥": ">=", "≠": "!=", "≈": "~",
+    "Ł": "L", "ł": "l", "Đ": "D", "đ": "d", "ı": "i", "Œ": "OE", "œ": "oe",
+    "\u202f": " ", "\u200b": "", "\ufeff": "",
+    "✅": "OK", "🔶": "*", "⛔": "!!", "✔": "OK",
+}
+
+
+class _Tabla(dict):
+    def __missing__(self, codigo):
+        caracter = chr(codigo)
+        if codigo < 256:
+            reemplazo = caracter
+        else:
+            descompuesto = unicodedata.normalize("NFKD", caracter)
+            reemplazo = "".join(c for c in descompuesto if ord(c) < 256 and not unicodedata.combining(c))
+        self[codigo] = reemplazo
+        return reemplazo
+
+
+def textos_del_catalogo():
+    actual = catalogo()
+    textos = list(actual.ref_map)
+    for valor in actual.ref_map.values():
+        for fila in valor.values() if isinstance(valor, dict) else [valor]:
+            textos.extend(str(v) for v in fila)
+    for nombre, filas in actual.analisis_db.items():
+        textos.append(nombre)
+        textos.extend(str(c) for fila in filas for c in fila)
+    return set(textos)
+
+
+def _armar_tabla():
+    tabla = _Tabla({ord(c): r for c, r in REEMPLAZOS.items()})
+    # Catálogo, latin-1 completo y los bloques latinos extendidos (nombres)
+    for caracter in set("".join(textos_del_catalogo())):
+        tabla[ord(caracter)]
+    for codigo in range(0x250):
+        tabla[codigo]
+    return tabla
+
+
+TABLA = _armar_tabla()
+
+
+def limpiar_texto(texto):
+    texto = str(texto)
+    return texto if texto.isascii() else texto.translate(TABLA)
+
+
+# Encabezados de la tabla del informe (astromedic.informe)
+ENCABEZADOS = ("Análisis", "Resultado", "Unidad", "Rango", "")
+
+
+def _armar_celdas():
+    actual = catalogo()
+    textos = textos_del_catalogo() | set(SIMBOLOS) | set(ENCABEZADOS)
+    for valor in actual.ref_map.values():
+        for _, ref_min, ref_max in (valor.values() if isinstance(valor, dict) else [valor]):
+            textos.add(f"{ref_min} - {ref_max}")
+    for filas in actual.analisis_db.values():
+        textos.update(formatear_rango(f[2], f[3]) for f in filas)
+    return {texto: limpiar_texto(texto) for texto in textos}
+
+
+# Celdas que salen del catálogo (analitos, unidades, rangos, banderas) y
+# encabezados, ya saneados: en una tabla de resultados casi todo es uno de
+# estos
+CELDAS = _armar_celdas()
+
+
+def limpiar_tabla(filas):
+    """Sanea todas las celdas de una tabla de resultados; devuelve [tuple]."""
+    precalculada = CELDAS.get
+    return [tuple([precalculada(c) or limpiar_texto(c) for c in fila]) for fila in filas]
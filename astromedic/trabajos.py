@@ -0,0 +1,508 @@
+# Cola de trabajos en segundo plano (render de PDF).
+#
+# Los trabajos corren en un pool de procesos, así el hilo del script de
+# Streamlit (o el bucle de la API) no se bloquea mientras FPDF trabaja. El
+# identificador de un trabajo es la clave de contenido del informe: volver a
+# pedir el mismo PDF mientras está en cola o ya terminado no encola otro.
+#
+# Límites (config): TRABAJOS_PROCESOS renders simultáneos como máximo y
+# TRABAJOS_MAX_PENDIENTES trabajos sin terminar; por encima de eso encolar()
+# lanza ColaLlena y quien llama decide (avisar al usuario, responder 503...).
+#
+# Se encola un tipo de trabajo de astromedic.tareas y sus argumentos, no una
+# función. ColaTrabajos guarda la cola en memoria (una réplica);
+# ColaCompartida la guarda en SQLite para que varias réplicas compartan cola
+# y estado. Cuál se usa lo decide el backend de astromedic.compartido.
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from astromedic import compartido, tareas
+
+log = logging.getLogger(__name__)
+
+EN_COLA = "en_cola"
+GENERANDO = "generando"
+LISTO = "listo"
+ERROR = "error"
+DESCONOCIDO = "desconocido"
+
+
+class ColaLlena(Exception):
+    pass
+
+
+class _Trabajo:
+    __slots__ = ("tipo", "args", "futuro", "iniciado")
+
+    def __init__(self, tipo, args):
+        self.tipo = tipo
+        self.args = args
+        self.futuro = Future()
+        self.iniciado = False
+
+
+class ColaTrabajos:
+    # Los trabajos esperan aquí y se pasan al pool de a `procesos` por vez,
+    # así la posición en la cola y el estado "generando" son reales (el pool
+    # por sí solo toma trabajos por adelantado).
+    def __init__(self, procesos=2, max_pendientes=20, max_terminados=200):
+        self.procesos = procesos
+        self.max_pendientes = max_pendientes
+        self.max_terminados = max_terminados
+        self._pool = None
+        self._trabajos = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _ejecutor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.procesos)
+        return self._pool
+
+    def _pendientes(self):
+        return sum(1 for t in self._trabajos.values() if not t.futuro.done())
+
+    def _purgar(self):
+        # Se olvidan los resultados terminados más viejos
+        terminados = [i for i, t in self._trabajos.items() if t.futuro.done()]
+        for id_trabajo in terminados[:max(0, len(terminados) - self.max_terminados)]:
+            del self._trabajos[id_trabajo]
+
+    def _despachar(self):
+        activos = sum(1 for t in self._trabajos.values() if t.iniciado and not t.futuro.done())
+        for trabajo in self._trabajos.values():
+            if activos >= self.procesos:
+                break
+            if not trabajo.iniciado:
+                trabajo.iniciado = True
+                activos += 1
+                futuro = self._ejecutor().submit(tareas.correr, trabajo.tipo, trabajo.args)
+                futuro.add_done_callback(lambda f, t=trabajo: self._terminar(t, f))
+
+    def _terminar(self, trabajo, futuro):
+        if futuro.cancelled():
+            trabajo.futuro.cancel()
+            return
+        error = futuro.exception()
+        if error is None:
+            trabajo.futuro.set_result(futuro.result())
+        else:
+            trabajo.futuro.set_exception(error)
+        with self._lock:
+            if self._pool is not None:
+                self._despachar()
+
+    def encolar(self, id_trabajo, tipo, *args):
+        """Future con el resultado; el mismo si ese trabajo ya estaba en cola o listo."""
+        tareas.buscar(tipo)
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is not None and not (trabajo.futuro.done() and trabajo.futuro.exception() is not None):
+                return trabajo.futuro
+            if self._pendientes() >= self.max_pendientes:
+                raise ColaLlena(f"{self.max_pendientes} trabajos pendientes")
+            trabajo = _Trabajo(tipo, args)
+            self._trabajos.pop(id_trabajo, None)
+            self._trabajos[id_trabajo] = trabajo
+            self._purgar()
+            self._despachar()
+            return trabajo.futuro
+
+    def estado(self, id_trabajo):
+        """(estado, posición en la cola o None, mensaje de error o None)."""
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None:
+                return DESCONOCIDO, None, None
+            if trabajo.futuro.done():
+                error = trabajo.futuro.exception()
+                return (ERROR, None, str(error) or type(error).__name__) if error else (LISTO, None, None)
+            if trabajo.iniciado:
+                return GENERANDO, None, None
+            posicion = 1
+            for otro_id, otro in self._trabajos.items():
+                if otro_id == id_trabajo:
+                    break
+                if not otro.iniciado:
+                    posicion += 1
+            return EN_COLA, posicion, None
+
+    def resultado(self, id_trabajo):
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is None or not trabajo.futuro.done() or trabajo.futuro.exception() is not None:
+            return None
+        return trabajo.futuro.result()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "en_cola": sum(1 for t in self._trabajos.values() if not t.iniciado),
+                "generando": sum(1 for t in self._trabajos.values() if t.iniciado and not t.futuro.done()),
+                "terminados": sum(1 for t in self._trabajos.values() if t.futuro.done()),
+                "procesos": self.procesos,
+                "max_pendientes": self.max_pendientes,
+            }
+
+    def cerrar(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    argumentos TEXT,
+    error TEXT,
+    creado REAL NOT NULL,
+    iniciado REAL,
+    terminado REAL,
+    replica TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_trabajos_estado ON trabajos (estado, creado);
+"""
+
+
+class ColaCompartida:
+    """La interfaz de ColaTrabajos, con los trabajos en una base SQLite compartida.
+
+    Cada réplica toma trabajos de la tabla (de a `procesos` por vez, en una
+    transacción inmediata para que dos réplicas no tomen el mismo) y los
+    corre en su pool. En la tabla van el tipo de trabajo y sus argumentos en
+    JSON; el resultado no: quien lo pidió desde otra réplica lo lee de donde
+    lo deja el tipo (astromedic.tareas; los PDF, en la caché compartida).
+    Mientras genera, la réplica renueva la hora de sus trabajos; uno que
+    pasa `plazo_s` sin renovarse (réplica caída) vuelve a tomarse. Sin nada
+    que hacer, la consulta a la tabla se espacia hasta `intervalo_max_s`.
+    """
+
+    def __init__(
+        self, ruta, procesos=2, max_pendientes=20, max_terminados=200, plazo_s=300,
+        intervalo_s=0.2, intervalo_max_s=2.0,
+    ):
+        self.ruta = ruta
+        self.procesos = procesos
+        self.max_pendientes = max_pendientes
+        self.max_terminados = max_terminados
+        self.plazo_s = plazo_s
+        self.intervalo_s = intervalo_s
+        self.intervalo_max_s = intervalo_max_s
+        self.replica = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._esperas = {}  # id -> Future de quien encoló en esta réplica
+        self._activos = {}  # id -> Future del pool
+        self._pool = None
+        self._hilo = None
+        self._latido = 0.0
+        self._despertar = threading.Event()
+        self._cerrada = False
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._conexion().executescript(ESQUEMA)
+
+    def _conexion(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            # Sin transacciones implícitas: cada una se abre a mano
+            con = sqlite3.connect(self.ruta, timeout=10, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _transaccion(self, funcion, *args):
+        con = self._conexion()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            resultado = funcion(con, *args)
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        con.execute("COMMIT")
+        return resultado
+
+    def _arrancar(self):
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None and not self._cerrada:
+                    self._hilo = threading.Thread(target=self._ciclo, name="cola-compartida", daemon=True)
+                    self._hilo.start()
+
+    def _ciclo(self):
+        espera = self.intervalo_s
+        while not self._cerrada:
+            try:
+                self._renovar()
+                tomados = self._tomar()
+                self._revisar_esperas()
+            except Exception:
+                # Base ocupada más allá del timeout, pool roto...: se reintenta
+                # en la vuelta siguiente
+                log.exception("Error en la cola compartida")
+                tomados = 0
+            with self._lock:
+                ocupada = tomados or self._activos or self._esperas
+            # Ociosa, cada vuelta espera el doble; encolar() la despierta
+            espera = self.intervalo_s if ocupada else min(espera * 2, self.intervalo_max_s)
+            if self._despertar.wait(espera):
+                espera = self.intervalo_s
+            self._despertar.clear()
+
+    def _renovar(self):
+        ahora = time.time()
+        if ahora - self._latido < self.plazo_s / 3:
+            return
+        with self._lock:
+            ids = list(self._activos)
+        if ids:
+            marcas = ", ".join("?" * len(ids))
+            self._transaccion(lambda con: con.execute(
+                f"UPDATE trabajos SET iniciado = ? WHERE estado = ? AND replica = ? AND id IN ({marcas})",
+                (ahora, GENERANDO, self.replica, *ids),
+            ))
+        self._latido = ahora
+
+    def _tomar(self):
+        with self._lock:
+            libres = self.procesos - len(self._activos)
+        if libres <= 0:
+            return 0
+        vencido = time.time() - self.plazo_s
+        consulta = (
+            "SELECT id, tipo, argumentos FROM trabajos WHERE estado = ? OR (estado = ? AND iniciado < ?) "
+            "ORDER BY creado LIMIT ?"
+        )
+        parametros = (EN_COLA, GENERANDO, vencido, libres)
+        # Sin nada que tomar no se abre una transacción de escritura
+        if not self._conexion().execute(consulta, parametros).fetchone():
+            return 0
+
+        def tomar(con):
+            filas = con.execute(consulta, parametros).fetchall()
+            ahora = time.time()
+            con.executemany(
+                "UPDATE trabajos SET estado = ?, iniciado = ?, replica = ? WHERE id = ?",
+                [(GENERANDO, ahora, self.replica, id_trabajo) for id_trabajo, _, _ in filas],
+            )
+            return filas
+
+        filas = self._transaccion(tomar)
+        for id_trabajo, tipo, argumentos in filas:
+            try:
+                # Solo tipos registrados: otra versión de la app pudo encolar
+                # uno que esta no conoce
+                tareas.buscar(tipo)
+                args = json.loads(argumentos)
+            except ValueError as error:
+                self._guardar_fin(id_trabajo, error)
+                self._resolver(id_trabajo, ERROR, None, str(error))
+                continue
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.procesos)
+                futuro = self._pool.submit(tareas.correr, tipo, args)
+                self._activos[id_trabajo] = futuro
+            futuro.add_done_callback(lambda f, i=id_trabajo: self._terminar(i, f))
+        return len(filas)
+
+    def _terminar(self, id_trabajo, futuro):
+        with self._lock:
+            self._activos.pop(id_trabajo, None)
+        if futuro.cancelled():
+            # Cierre de la réplica: cerrar() lo devolvió a la cola
+            return
+        error = futuro.exception()
+        resultado = futuro.result() if error is None else None
+        try:
+            self._guardar_fin(id_trabajo, error)
+        except sqlite3.Error:
+            log.exception("No se registró el fin del trabajo %s; se repetirá al vencer el plazo", id_trabajo)
+        if error is None:
+            self._resolver(id_trabajo, LISTO, resultado, None)
+        else:
+            self._resolver(id_trabajo, ERROR, None, str(error) or type(error).__name__)
+        self._despertar.set()
+
+    def _guardar_fin(self, id_trabajo, error):
+        def guardar(con):
+            if error is None:
+                con.execute(
+                    "UPDATE trabajos SET estado = ?, argumentos = NULL, terminado = ? WHERE id = ?",
+                    (LISTO, time.time(), id_trabajo),
+                )
+            else:
+                con.execute(
+                    "UPDATE trabajos SET estado = ?, error = ?, argumentos = NULL, terminado = ? WHERE id = ?",
+                    (ERROR, str(error) or type(error).__name__, time.time(), id_trabajo),
+                )
+            # Se olvidan los terminados más viejos
+            con.execute(
+                "DELETE FROM trabajos WHERE estado IN (?, ?) AND id NOT IN "
+                "(SELECT id FROM trabajos WHERE estado IN (?, ?) ORDER BY terminado DESC LIMIT ?)",
+                (LISTO, ERROR, LISTO, ERROR, self.max_terminados),
+            )
+        self._transaccion(guardar)
+
+    def _resolver(self, id_trabajo, estado, resultado, error):
+        with self._lock:
+            futuro = self._esperas.pop(id_trabajo, None)
+        if futuro is None or futuro.done():
+            return
+        if estado == LISTO:
+            futuro.set_result(resultado)
+        else:
+            futuro.set_exception(RuntimeError(error))
+
+    def _revisar_esperas(self):
+        # Trabajos encolados aquí que está generando otra réplica
+        with self._lock:
+            ids = [i for i in self._esperas if i not in self._activos]
+        if not ids:
+            return
+        marcas = ", ".join("?" * len(ids))
+        filas = {
+            fila[0]: fila[1:] for fila in self._conexion().execute(
+                f"SELECT id, estado, tipo, error FROM trabajos WHERE id IN ({marcas})", ids,
+            )
+        }
+        for id_trabajo in ids:
+            estado, tipo, error = filas.get(id_trabajo, (DESCONOCIDO, None, "trabajo descartado"))
+            if estado == LISTO:
+                resultado = tareas.leer(tipo, id_trabajo)
+                if resultado is None:
+                    self._resolver(id_trabajo, ERROR, None, "el resultado ya no está disponible")
+                else:
+                    self._resolver(id_trabajo, LISTO, resultado, None)
+            elif estado in (ERROR, DESCONOCIDO):
+                self._resolver(id_trabajo, ERROR, None, error)
+
+    def encolar(self, id_trabajo, tipo, *args):
+        """Future con el resultado; el mismo trabajo si ya estaba en cola o listo (en cualquier réplica)."""
+        tareas.buscar(tipo)
+        argumentos = json.dumps(args, ensure_ascii=False, default=str)
+        self._arrancar()
+        with self._lock:
+            futuro = self._esperas.get(id_trabajo)
+        if futuro is not None:
+            return futuro
+
+        def encolar(con, rehacer):
+            fila = con.execute("SELECT estado FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+            if fila is not None and fila[0] != ERROR and not (rehacer and fila[0] == LISTO):
+                return fila[0]
+            pendientes = con.execute(
+                "SELECT COUNT(*) FROM trabajos WHERE estado IN (?, ?)", (EN_COLA, GENERANDO)
+            ).fetchone()[0]
+            if pendientes >= self.max_pendientes:
+                raise ColaLlena(f"{self.max_pendientes} trabajos pendientes")
+            con.execute(
+                "INSERT OR REPLACE INTO trabajos (id, estado, tipo, argumentos, creado) VALUES (?, ?, ?, ?, ?)",
+                (id_trabajo, EN_COLA, tipo, argumentos, time.time()),
+            )
+            return EN_COLA
+
+        estado = self._transaccion(encolar, False)
+        if estado == LISTO:
+            resultado = tareas.leer(tipo, id_trabajo)
+            if resultado is not None:
+                futuro = Future()
+                futuro.set_result(resultado)
+                return futuro
+            # Terminado, pero el resultado ya salió de donde lo dejó: se rehace
+            estado = self._transaccion(encolar, True)
+        with self._lock:
+            futuro = self._esperas.setdefault(id_trabajo, Future())
+        self._despertar.set()
+        return futuro
+
+    def estado(self, id_trabajo):
+        """(estado, posición en la cola o None, mensaje de error o None)."""
+        self._arrancar()
+        con = self._conexion()
+        fila = con.execute("SELECT estado, creado, error FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+        if fila is None:
+            return DESCONOCIDO, None, None
+        estado, creado, error = fila
+        if estado == EN_COLA:
+            antes = con.execute(
+                "SELECT COUNT(*) FROM trabajos WHERE estado = ? AND (creado, id) < (?, ?)", (EN_COLA, creado, id_trabajo)
+            ).fetchone()[0]
+            return EN_COLA, antes + 1, None
+        return estado, None, error if estado == ERROR else None
+
+    def resultado(self, id_trabajo):
+        fila = self._conexion().execute(
+            "SELECT tipo FROM trabajos WHERE id = ? AND estado = ?", (id_trabajo, LISTO)
+        ).fetchone()
+        return None if fila is None else tareas.leer(fila[0], id_trabajo)
+
+    def estadisticas(self):
+        cuentas = dict(self._conexion().execute("SELECT estado, COUNT(*) FROM trabajos GROUP BY estado"))
+        with self._lock:
+            locales = len(self._activos)
+        return {
+            "en_cola": cuentas.get(EN_COLA, 0),
+            "generando": cuentas.get(GENERANDO, 0),
+            "terminados": cuentas.get(LISTO, 0) + cuentas.get(ERROR, 0),
+            "procesos": self.procesos,
+            "max_pendientes": self.max_pendientes,
+            "replica": self.replica,
+            "generando_aqui": locales,
+        }
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrada = True
+            pool, self._pool = self._pool, None
+        self._despertar.set()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        # Lo que esta réplica no llegó a terminar vuelve a la cola
+        try:
+            self._transaccion(lambda con: con.execute(
+                "UPDATE trabajos SET estado = ?, iniciado = NULL, replica = NULL WHERE estado = ? AND replica = ?",
+                (EN_COLA, GENERANDO, self.replica),
+            ))
+        except sqlite3.Error:
+            pass
+
+
+# La del backend de estado configurado (astromedic.compartido)
+cola = compartido.componente("cola")
+
+
+def encolar_pdf(nombre, dni, edad, sexo, medico, fecha, resultados, pie=""):
+    """Clave del informe; si no está en la caché de PDF, queda encolado su render."""
+    from astromedic.cache_pdf import cabecera_pdf, cache, clave_informe
+    from astromedic.informe import VERSION_PLANTILLA
+
+    cabecera = [nombre, dni, edad, sexo, medico, fecha]
+    clave = clave_informe(cabecera_pdf(*cabecera, pie), resultados, VERSION_PLANTILLA)
+    if cola.estado(clave)[0] == DESCONOCIDO and cache.obtener(clave) is not None:
+        return clave
+    cola.encolar(clave, "pdf", clave, cabecera, list(resultados), pie)
+    return clave
+
+
+def pdf_listo(clave):
+    """Bytes del PDF si ya se generó, None si todavía no."""
+    from astromedic.cache_pdf import cache
+
+    datos = cola.resultado(clave)
+    if datos is None:
+        datos = cache.obtener(clave)
+    return datos
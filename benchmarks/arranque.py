@@ -0,0 +1,78 @@
+# Mide el arranque en frío: importación de la app y primer render completo.
+#
+#   python benchmarks/arranque.py [--repeticiones 5]
+#
+# Cada medición corre en un proceso nuevo, para que nada quede en caché
+# entre una y otra. Compara la app unificada (app.py) con un script antiguo.
+# Cada caso usa una carpeta de datos vacía: "primera_s" es la primera vez
+# (incluye escalar el logo y crear las bases), "mediana_s" y "min_s" son
+# los arranques siguientes, con esos archivos ya en disco.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORTACION = """
+import sys, time
+t = time.perf_counter()
+import astromedic.app
+print(time.perf_counter() - t, "pandas" in sys.modules, "fpdf" in sys.modules)
+"""
+
+_PRIMER_RENDER = """
+import logging, sys, time, warnings
+warnings.filterwarnings("ignore")
+logging.disable(logging.WARNING)
+from streamlit.testing.v1 import AppTest
+t = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60).run()
+assert not at.exception, at.exception
+print(time.perf_counter() - t, "pandas" in sys.modules, "fpdf" in sys.modules)
+"""
+
+
+def _medir(datos, codigo, *argumentos):
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo, *argumentos],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+        env={**os.environ, "ASTROMEDIC_DATOS": datos},
+    ).stdout.split()
+    return float(salida[0]), salida[1] == "True", salida[2] == "True"
+
+
+def medir(repeticiones):
+    casos = {
+        "importar astromedic.app": (_IMPORTACION,),
+        "primer render app.py": (_PRIMER_RENDER, os.path.join(RAIZ, "app.py")),
+        "primer render script (15)": (_PRIMER_RENDER, os.path.join(RAIZ, "app_entrega_resultados_astromedic (15).py")),
+    }
+    informe = {}
+    for nombre, (codigo, *argumentos) in casos.items():
+        with tempfile.TemporaryDirectory(prefix="astromedic-arranque-") as datos:
+            primera, pandas, fpdf = _medir(datos, codigo, *argumentos)
+            tiempos = [_medir(datos, codigo, *argumentos)[0] for _ in range(repeticiones)]
+        informe[nombre] = {
+            "primera_s": primera,
+            "mediana_s": statistics.median(tiempos),
+            "min_s": min(tiempos),
+            "pandas_importado": pandas,
+            "fpdf_importado": fpdf,
+        }
+    return informe
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arranque en frío de la app unificada y de un script antiguo")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+    print(json.dumps(medir(args.repeticiones), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Compara el formato anterior de resultados (tuplas de texto con el rango
+# "4000 - 10000") con los registros compactos (registros.Resultado), sobre
+# un historial de 100 000 resultados guardados.
+#
+#   python benchmarks/resultados.py [--resultados 100000]
+#
+# Mide, para cada formato: bytes en disco y en memoria por resultado,
+# tiempo de leer todo el historial y tiempo de obtener sus banderas (las
+# tuplas hay que volver a parsearlas y marcarlas; los registros ya las traen).
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ.setdefault("ASTROMEDIC_DATOS", tempfile.mkdtemp(prefix="astromedic_bench_"))
+
+SEMILLA = 20240601
+
+_ESQUEMA_TEXTO = """
+CREATE TABLE resultados (
+    informe_id INTEGER NOT NULL,
+    orden INTEGER NOT NULL,
+    analito TEXT NOT NULL,
+    resultado TEXT,
+    unidad TEXT,
+    rango TEXT,
+    PRIMARY KEY (informe_id, orden)
+) WITHOUT ROWID;
+"""
+
+
+def _informes(cantidad):
+    from astromedic.paneles.hemograma import ANALITOS
+    from astromedic.referencias import lookup_many
+
+    rng = random.Random(SEMILLA)
+    por_informe = len(ANALITOS)
+    for i in range(-(-cantidad // por_informe)):
+        edad = rng.randint(0, 90)
+        sexo = rng.choice(["Masculino", "Femenino"])
+        yield {
+            "dni": str(10000000 + i % 5000), "nombre": "Paciente", "edad": edad, "sexo": sexo,
+            "medico": "Dra. Martínez", "fecha": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "resultados": [
+                (analito, str(round(rng.uniform(ref_min * 0.7, ref_max * 1.3 + 1), 1)), unidad, f"{ref_min} - {ref_max}")
+                for analito, (unidad, ref_min, ref_max) in zip(ANALITOS, lookup_many(ANALITOS, edad, sexo))
+            ],
+        }
+
+
+def _bytes_en_disco(ruta, tabla):
+    con = sqlite3.connect(ruta)
+    try:
+        return con.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (tabla,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        # SQLite sin dbstat: tamaño de todo el archivo
+        return os.path.getsize(ruta)
+    finally:
+        con.close()
+
+
+def _medir(leer, banderas):
+    inicio = time.perf_counter()
+    leer()
+    segundos_lectura = time.perf_counter() - inicio
+    tracemalloc.start()
+    filas = leer()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    inicio = time.perf_counter()
+    banderas(filas)
+    segundos_banderas = time.perf_counter() - inicio
+    return filas, memoria, segundos_lectura, segundos_banderas
+
+
+def medir(cantidad):
+    from astromedic.almacen import _COLUMNAS_RESULTADO, AlmacenResultados
+    from astromedic.banderas import marcar_filas
+
+    directorio = tempfile.mkdtemp(prefix="astromedic_resultados_")
+    informes = list(_informes(cantidad))
+
+    ruta_texto = os.path.join(directorio, "texto.db")
+    con = sqlite3.connect(ruta_texto)
+    con.executescript(_ESQUEMA_TEXTO)
+    con.executemany(
+        "INSERT INTO resultados VALUES (?, ?, ?, ?, ?, ?)",
+        [(i, orden, *fila) for i, e in enumerate(informes) for orden, fila in enumerate(e["resultados"])],
+    )
+    con.commit()
+
+    ruta_registros = os.path.join(directorio, "registros.db")
+    almacen = AlmacenResultados(ruta_registros)
+    almacen.guardar_lote(informes)
+
+    def leer_texto():
+        return con.execute("SELECT analito, resultado, unidad, rango FROM resultados ORDER BY informe_id, orden").fetchall()
+
+    def leer_registros():
+        # Lo mismo que hacen resultados_de y por_dni, para todo el historial
+        cursor = almacen._conexion().execute(f"SELECT {_COLUMNAS_RESULTADO} FROM resultados ORDER BY informe_id, orden")
+        return almacen._resultados(cursor)
+
+    filas, memoria_texto, lectura_texto, banderas_texto = _medir(leer_texto, marcar_filas)
+    registros, memoria_registros, lectura_registros, banderas_registros = _medir(
+        leer_registros, lambda registros: [r.codigo for r in registros],
+    )
+    assert [tuple(r) for r in registros] == filas
+    n = len(filas)
+    con.close()
+    return {
+        "resultados": n,
+        "tuplas de texto": {
+            "bytes_disco_por_resultado": _bytes_en_disco(ruta_texto, "resultados") / n,
+            "bytes_memoria_por_resultado": memoria_texto / n,
+            "lectura_s": lectura_texto,
+            "banderas_s": banderas_texto,
+        },
+        "registros": {
+            "bytes_disco_por_resultado": _bytes_en_disco(ruta_registros, "resultados") / n,
+            "bytes_memoria_por_resultado": memoria_registros / n,
+            "lectura_s": lectura_registros,
+            "banderas_s": banderas_registros,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tuplas de texto contra registros compactos")
+    parser.add_argument("--resultados", type=int, default=100000)
+    args = parser.parse_args(argv)
+    print(json.dumps(medir(args.resultados), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+# Micro-benchmarks de las rutas críticas de la app.
+#
+#   python benchmarks/suite.py                         # informe JSON en stdout
+#   python benchmarks/suite.py --salida informe.json
+#   python benchmarks/suite.py --comparar benchmarks/linea_base.json
+#
+# Las entradas se generan con una semilla fija, así que dos corridas miden
+# exactamente lo mismo. Cada benchmark se ejecuta `muestras` veces (cada
+# muestra repite la operación `numero` veces) y se informa p50/p95 por
+# llamada en milisegundos. Con --comparar, el proceso termina con código 1
+# si algún p50 supera la línea base por más de la tolerancia. También
+# termina con 1 si una optimización no le saca a su referencia, medida en
+# la misma corrida, el margen de MARGENES.
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# Datos (caché de PDF, historial) en una carpeta temporal, nunca los reales
+os.environ.setdefault("ASTROMEDIC_DATOS", tempfile.mkdtemp(prefix="astromedic_bench_"))
+
+SEMILLA = 20240601
+BENCHMARKS = {}
+# (benchmark, referencia, factor): el p50 del primero, por `factor`, no
+# puede pasar el de la referencia
+MARGENES = [
+    ("limpiar_tabla (tabla de 16 filas)", "limpiar NFKD por celda (referencia, tabla de 16 filas)", 2.0),
+]
+
+
+def benchmark(nombre, numero=100, muestras=30):
+    """Registra una función que prepara los datos y devuelve la operación a medir."""
+    def registrar(preparar):
+        BENCHMARKS[nombre] = (preparar, numero, muestras)
+        return preparar
+    return registrar
+
+
+def _hemograma():
+    # Los 16 analitos con que se registró la línea base (sin los recuentos
+    # absolutos calculados que el panel agregó después)
+    from astromedic.paneles.hemograma import ANALITOS
+
+    return tuple(a for a in ANALITOS if not a.endswith(" abs"))
+
+
+def _paciente(rng):
+    from astromedic.referencias import lookup_many
+
+    ANALITOS = _hemograma()
+    edad = rng.randint(0, 90)
+    sexo = rng.choice(["Masculino", "Femenino"])
+    referencias = lookup_many(ANALITOS, edad, sexo)
+    valores = [str(round(rng.uniform(r[1] * 0.7, r[2] * 1.3 + 1), 1)) for r in referencias]
+    filas = [
+        (analito, valor, unidad, f"{ref_min} - {ref_max}", "")
+        for analito, valor, (unidad, ref_min, ref_max) in zip(ANALITOS, valores, referencias)
+    ]
+    cabecera = ("José Ñúñez Pérez", "45678912", edad, sexo, "Dra. Martínez", "2024-06-01")
+    return edad, sexo, referencias, valores, filas, cabecera
+
+
+@benchmark("get_referencia (16 analitos)", numero=1000)
+def _get_referencia(rng):
+    from astromedic.referencias import get_referencia
+
+    ANALITOS = _hemograma()
+    edad, sexo, *_ = _paciente(rng)
+    return lambda: [get_referencia(a, edad, sexo) for a in ANALITOS]
+
+
+@benchmark("lookup_many (16 analitos)", numero=1000)
+def _lookup_many(rng):
+    from astromedic.referencias import lookup_many
+
+    ANALITOS = _hemograma()
+    edad, sexo, *_ = _paciente(rng)
+    return lambda: lookup_many(ANALITOS, edad, sexo)
+
+
+@benchmark("marcar (1 paciente)", numero=1000)
+def _marcar_uno(rng):
+    from astromedic.banderas import a_numeros, marcar_analitos
+
+    ANALITOS = _hemograma()
+    _, _, referencias, valores, _, _ = _paciente(rng)
+    minimos = [r[1] for r in referencias]
+    maximos = [r[2] for r in referencias]
+    return lambda: marcar_analitos(ANALITOS, a_numeros(valores), minimos, maximos)
+
+
+@benchmark("marcar (10000 pacientes)", numero=5, muestras=20)
+def _marcar_lote(rng):
+    import numpy as np
+
+    from astromedic.banderas import marcar_analitos
+
+    ANALITOS = _hemograma()
+    _, _, referencias, _, _, _ = _paciente(rng)
+    minimos = np.array([r[1] for r in referencias], dtype=float)
+    maximos = np.array([r[2] for r in referencias], dtype=float)
+    valores = np.random.default_rng(SEMILLA).uniform(minimos * 0.7, maximos * 1.3 + 1, size=(10000, len(ANALITOS)))
+    return lambda: marcar_analitos(ANALITOS, valores, minimos, maximos)
+
+
+@benchmark("derivados (10000 pacientes)", numero=5, muestras=20)
+def _derivados_lote(rng):
+    import numpy as np
+
+    from astromedic.derivados import calcular
+    from astromedic.paneles.hemograma import ANALITOS
+    from astromedic.referencias import lookup_many
+
+    referencias = lookup_many(ANALITOS, 40, "Femenino")
+    minimos = np.array([r[1] for r in referencias], dtype=float)
+    maximos = np.array([r[2] for r in referencias], dtype=float)
+    valores = np.random.default_rng(SEMILLA).uniform(minimos * 0.7, maximos * 1.3 + 1, size=(10000, len(ANALITOS)))
+    return lambda: calcular(ANALITOS, valores)
+
+
+def _filas_con_banderas(rng):
+    *_, filas, _ = _paciente(rng)
+    return [(*fila[:4], rng.choice(["✅", "🔶", "⛔", ""])) for fila in filas]
+
+
+@benchmark("limpiar NFKD por celda (referencia, tabla de 16 filas)", numero=200)
+def _limpiar_nfkd(rng):
+    import unicodedata
+
+    filas = _filas_con_banderas(rng)
+
+    def limpiar(texto):
+        return unicodedata.normalize("NFKD", str(texto)).encode("latin1", "ignore").decode("latin1")
+    return lambda: [[limpiar(c) for c in fila] for fila in filas]
+
+
+@benchmark("limpiar_texto (tabla de 16 filas)", numero=200)
+def _limpiar_texto(rng):
+    from astromedic.texto import limpiar_texto
+
+    filas = _filas_con_banderas(rng)
+    return lambda: [[limpiar_texto(c) for c in fila] for fila in filas]
+
+
+@benchmark("limpiar_tabla (tabla de 16 filas)", numero=200)
+def _limpiar_tabla(rng):
+    from astromedic.texto import limpiar_tabla
+
+    filas = _filas_con_banderas(rng)
+    return lambda: limpiar_tabla(filas)
+
+
+@benchmark("generar_pdf", numero=5, muestras=20)
+def _generar_pdf(rng):
+    from astromedic.informe import generar_pdf
+
+    *_, filas, cabecera = _paciente(rng)
+    return lambda: generar_pdf(*cabecera, filas)
+
+
+@benchmark("vista previa df.to_html", numero=20, muestras=20)
+def _to_html(rng):
+    import pandas as pd
+
+    *_, filas, _ = _paciente(rng)
+
+    def render():
+        df = pd.DataFrame(filas, columns=["Análisis", "Resultado", "Unidad", "Rango", "✔"])
+        return df.to_html(index=False, escape=False)
+    return render
+
+
+@benchmark("vista previa plantilla (sin caché)", numero=200)
+def _plantilla(rng):
+    from astromedic import impresion
+
+    *_, filas, cabecera = _paciente(rng)
+
+    def render():
+        impresion._fragmentos.clear()
+        return impresion.vista_impresion(*cabecera, filas)
+    return render
+
+
+@benchmark("vista previa plantilla (en caché)", numero=1000)
+def _plantilla_cache(rng):
+    from astromedic.impresion import vista_impresion
+
+    *_, filas, cabecera = _paciente(rng)
+    return lambda: vista_impresion(*cabecera, filas)
+
+
+@benchmark("rerun completo app.py (AppTest)", numero=1, muestras=15)
+def _rerun(rng):
+    import logging
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+    from streamlit.testing.v1 import AppTest
+
+    from astromedic.paneles.hemograma import ANALITOS
+    from astromedic.referencias import lookup_many
+
+    at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=60).run()
+    edad, sexo, *_ = _paciente(rng)
+    next(w for w in at.number_input if w.label == "Edad").set_value(edad)
+    next(w for w in at.selectbox if w.label == "Sexo").set_value(sexo)
+    # Un valor por campo del panel (incluidos los calculados), buscado por
+    # su clave; cada medición envía el formulario como al registrar
+    for analito, (_, ref_min, ref_max) in zip(ANALITOS, lookup_many(ANALITOS, edad, sexo)):
+        at.text_input(key=f"Hemograma:{analito}").set_value(str(round(rng.uniform(ref_min * 0.7, ref_max * 1.3 + 1), 1)))
+
+    def registrar():
+        next(b for b in at.button if b.label == "✅ Registrar resultados").click().run()
+    return registrar
+
+
+def _medir(operacion, numero, muestras):
+    for _ in range(max(1, numero // 10)):
+        operacion()
+    tiempos = []
+    for _ in range(muestras):
+        inicio = time.perf_counter()
+        for _ in range(numero):
+            operacion()
+        tiempos.append((time.perf_counter() - inicio) / numero * 1000)
+    return tiempos
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    bajo = int(posicion)
+    alto = min(bajo + 1, len(ordenados) - 1)
+    return ordenados[bajo] + (ordenados[alto] - ordenados[bajo]) * (posicion - bajo)
+
+
+def ejecutar(filtro=None):
+    resultados = {}
+    for nombre, (preparar, numero, muestras) in BENCHMARKS.items():
+        if filtro and filtro not in nombre:
+            continue
+        operacion = preparar(random.Random(SEMILLA))
+        tiempos = _medir(operacion, numero, muestras)
+        resultados[nombre] = {
+            "p50_ms": _percentil(tiempos, 50),
+            "p95_ms": _percentil(tiempos, 95),
+            "media_ms": statistics.fmean(tiempos),
+            "muestras": muestras,
+            "numero": numero,
+        }
+    return {
+        "entorno": {"python": platform.python_version(), "plataforma": platform.platform()},
+        "benchmarks": resultados,
+    }
+
+
+def comparar(informe, linea_base, tolerancia):
+    """Lista de (benchmark, p50 actual, p50 base) que empeoraron más que la tolerancia."""
+    regresiones = []
+    for nombre, actual in informe["benchmarks"].items():
+        base = linea_base["benchmarks"].get(nombre)
+        if base and actual["p50_ms"] > base["p50_ms"] * tolerancia:
+            regresiones.append((nombre, actual["p50_ms"], base["p50_ms"]))
+    return regresiones
+
+
+def verificar_margenes(informe):
+    """Lista de (benchmark, referencia, veces más rápido, factor pedido) que no llegan al margen."""
+    faltas = []
+    medidos = informe["benchmarks"]
+    for nombre, referencia, factor in MARGENES:
+        if nombre in medidos and referencia in medidos:
+            veces = medidos[referencia]["p50_ms"] / medidos[nombre]["p50_ms"]
+            if veces < factor:
+                faltas.append((nombre, referencia, veces, factor))
+    return faltas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de ASTROMEDIC")
+    parser.add_argument("--salida", help="archivo JSON donde escribir el informe")
+    parser.add_argument("--comparar", help="línea base JSON contra la cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=1.5, help="factor de p50 permitido sobre la línea base")
+    parser.add_argument("--filtro", help="solo los benchmarks cuyo nombre contenga este texto")
+    args = parser.parse_args(argv)
+
+    informe = ejecutar(args.filtro)
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    faltas = verificar_margenes(informe)
+    for nombre, referencia, veces, factor in faltas:
+        print(f"SIN MARGEN {nombre}: {veces:.2f}x sobre {referencia} (se pide {factor:.1f}x)", file=sys.stderr)
+    regresiones = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(informe, json.load(f), args.tolerancia)
+        for nombre, actual, base in regresiones:
+            print(f"REGRESIÓN {nombre}: p50 {actual:.3f} ms (base {base:.3f} ms)", file=sys.stderr)
+    return 1 if regresiones or faltas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
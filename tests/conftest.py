@@ -0,0 +1,11 @@
+# Las pruebas usan una carpeta de datos propia: el historial, la caché de
+# PDF y la cola no tocan ./datos.
+
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, RAIZ)
+os.environ.setdefault("ASTROMEDIC_DATOS", tempfile.mkdtemp(prefix="astromedic-pruebas-"))
@@ -0,0 +1,40 @@
+import multiprocessing
+import sqlite3
+
+from astromedic.almacen import AlmacenResultados
+
+
+def _guardar(ruta, replica, barrera, cantidad):
+    almacen = AlmacenResultados(ruta)
+    barrera.wait()
+    for i in range(cantidad):
+        # Las dos réplicas traen las mismas referencias nuevas a la vez
+        almacen.guardar({
+            "dni": f"{replica}-{i}", "nombre": "Ana", "fecha": "2026-10-18",
+            "resultados": [("Analito raro", "5", f"u{i}/L", f"{i} - {i + 10}"), ("Sin rango", "x", f"u{i}/L", "")],
+        })
+
+
+def test_dos_procesos_comparten_las_referencias(tmp_path):
+    ruta = str(tmp_path / "resultados.db")
+    AlmacenResultados(ruta)
+    contexto = multiprocessing.get_context("spawn")
+    barrera = contexto.Barrier(2)
+    procesos = [contexto.Process(target=_guardar, args=(ruta, replica, barrera, 30)) for replica in range(2)]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join(60)
+        assert proceso.exitcode == 0
+
+    con = sqlite3.connect(ruta)
+    assert con.execute("SELECT COUNT(*) FROM informes").fetchone()[0] == 60
+    # Una fila por combinación: 30 unidades con rango y 30 sin él
+    assert con.execute("SELECT COUNT(*) FROM referencias").fetchone()[0] == 60
+
+    almacen = AlmacenResultados(ruta)
+    for replica in range(2):
+        informe = almacen.por_dni(f"{replica}-7")[0]
+        raro, sin_rango = informe["resultados"]
+        assert (raro.unidad, raro.rango) == ("u7/L", "7 - 17")
+        assert (sin_rango.unidad, sin_rango.rango) == ("u7/L", "")
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from concurrent.futures import Future
+
+import pytest
+
+from astromedic import api
+
+PACIENTE = {"nombre": "Ana", "dni": "123", "edad": 34, "sexo": "Femenino", "fecha": "2026-10-18"}
+
+
+def _pedir(ruta, cuerpo):
+    # Petición ASGI directa a la app, sin servidor ni cliente HTTP
+    mensajes = []
+    datos = cuerpo if isinstance(cuerpo, bytes) else json.dumps(cuerpo).encode()
+
+    async def recibir():
+        return {"type": "http.request", "body": datos, "more_body": False}
+
+    async def enviar(mensaje):
+        mensajes.append(mensaje)
+
+    alcance = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": ruta, "raw_path": ruta.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json")], "client": ("127.0.0.1", 1), "server": ("prueba", 80),
+    }
+    asyncio.run(api.app(alcance, recibir, enviar))
+    inicio = next(m for m in mensajes if m["type"] == "http.response.start")
+    cuerpo = b"".join(m.get("body", b"") for m in mensajes if m["type"] == "http.response.body")
+    return inicio["status"], dict(inicio["headers"]), cuerpo
+
+
+def test_evaluar():
+    estado, _, cuerpo = _pedir("/evaluar", {**PACIENTE, "resultados": {"Hemoglobina": "9.0", "Plaquetas": 250000}})
+    assert estado == 200
+    resultados = {r["analito"]: r for r in json.loads(cuerpo)["resultados"]}
+    assert resultados["Hemoglobina"]["bandera"] == "bajo"
+    assert resultados["Plaquetas"]["resultado"] == "250000"
+
+
+@pytest.mark.parametrize("resultados", [
+    [["Hemoglobina", "13"]], "Hemoglobina=13", {"Hemoglobina": {"valor": 13}}, {"Hemoglobina": [13]},
+    {"Hemoglobina": True}, None,
+])
+def test_resultados_invalidos_dan_400(resultados):
+    for ruta in ("/evaluar", "/informe"):
+        estado, _, cuerpo = _pedir(ruta, {**PACIENTE, "resultados": resultados})
+        assert estado == 400
+        assert "resultados" in json.loads(cuerpo)["error"]
+
+
+def test_cuerpo_invalido_da_400():
+    assert _pedir("/evaluar", b"{no es json")[0] == 400
+    assert _pedir("/evaluar", [1, 2])[0] == 400
+    assert _pedir("/evaluar", {**PACIENTE, "sexo": "Otro", "resultados": {"Hemoglobina": "13"}})[0] == 400
+
+
+def test_informe():
+    estado, cabeceras, cuerpo = _pedir("/informe", {**PACIENTE, "resultados": {"Hemoglobina": "13.5"}})
+    assert estado == 200
+    assert cabeceras[b"content-type"] == b"application/pdf"
+    assert cuerpo.startswith(b"%PDF")
+    # La segunda vez sale de la caché
+    assert _pedir("/informe", {**PACIENTE, "resultados": {"Hemoglobina": "13.5"}})[2] == cuerpo
+
+
+def test_informe_con_fallo_del_render_da_500(monkeypatch):
+    from astromedic.trabajos import cola
+
+    def encolar(id_trabajo, tipo, *args):
+        futuro = Future()
+        futuro.set_exception(RuntimeError("fuente ilegible"))
+        return futuro
+    monkeypatch.setattr(cola, "encolar", encolar)
+    estado, cabeceras, cuerpo = _pedir("/informe", {**PACIENTE, "resultados": {"Hemoglobina": "14.1"}})
+    assert estado == 500
+    assert cabeceras[b"content-type"] == b"application/json"
+    assert "fuente ilegible" in json.loads(cuerpo)["error"]
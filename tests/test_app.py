@@ -0,0 +1,26 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from conftest import RAIZ
+
+
+def _app():
+    return AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=60).run()
+
+
+def _boton(at, etiqueta):
+    return next(b for b in at.button if b.label == etiqueta)
+
+
+def test_mcv_ingresado_se_conserva_al_recalcular():
+    at = _app()
+    for analito, valor in (("Eritrocitos", "4500000"), ("Hemoglobina", "14"), ("Hematocrito", "42"), ("MCV", "95")):
+        at.text_input(key=f"Hemograma:{analito}").set_value(valor)
+    _boton(at, "✅ Registrar resultados").click().run()
+    _boton(at, "🖨️ Vista previa para imprimir").click().run()
+
+    vista = next(m.value for m in at.markdown if "astro-impresion" in m.value)
+    assert "<td>MCV</td><td>95</td>" in vista
+    assert "<td>MCH</td><td>31.1</td>" in vista
+    assert at.text_input(key="Hemograma:MCV").value == "95"
@@ -0,0 +1,42 @@
+import os
+
+from astromedic.cache_pdf import CachePDF
+
+
+def _bytes_en_disco(directorio):
+    return sum(
+        os.path.getsize(os.path.join(carpeta, nombre))
+        for carpeta, _, archivos in os.walk(directorio) for nombre in archivos if nombre.endswith(".pdf")
+    )
+
+
+def test_dos_replicas_respetan_el_limite_de_disco(tmp_path):
+    # Dos instancias sobre la misma carpeta, como dos réplicas con el
+    # backend "archivos": ninguna ve las escrituras de la otra en su contador
+    replicas = [CachePDF(str(tmp_path), max_memoria=0, max_disco=10_000, entre_procesos=True) for _ in range(2)]
+    for i in range(40):
+        replicas[i % 2].guardar(f"{i:064x}", b"%" * 1_000)
+        assert _bytes_en_disco(tmp_path) <= 10_000
+    assert _bytes_en_disco(tmp_path) >= 9_000
+    # Lo más reciente sigue en disco; lo primero se expulsó
+    assert replicas[0].obtener(f"{39:064x}") is not None
+    assert replicas[1].obtener(f"{0:064x}") is None
+
+
+def test_entre_procesos_solo_recorre_la_carpeta_al_pasar_el_limite(tmp_path, monkeypatch):
+    recorridos = []
+    original = CachePDF._archivos_disco
+
+    def contar(self):
+        recorridos.append(1)
+        return original(self)
+    monkeypatch.setattr(CachePDF, "_archivos_disco", contar)
+
+    replicas = [CachePDF(str(tmp_path), max_memoria=0, max_disco=10_000, entre_procesos=True) for _ in range(2)]
+    for i in range(10):
+        replicas[i % 2].guardar(f"{i:064x}", b"%" * 1_000)
+    # Una medición al crear el contador compartido y ninguna más
+    assert len(recorridos) == 1
+    replicas[0].guardar(f"{10:064x}", b"%" * 1_000)
+    assert len(recorridos) == 2
+    assert _bytes_en_disco(tmp_path) <= 10_000
@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pytest
+
+from astromedic.almacen import AlmacenResultados
+from astromedic.delta import delta_check, sospechosos
+
+
+def test_sospechosos_umbral_absoluto_y_porcentual():
+    # Columnas: solo absoluto (2), solo porcentaje (50 %), sin umbral
+    absolutos = np.array([2.0, math.nan, math.nan])
+    porcentajes = np.array([math.nan, 50.0, math.nan])
+    anteriores = np.array([13.0, 200000.0, 5.0])
+    actuales = np.array([
+        [15.5, 290000.0, 50.0],
+        [14.9, 310000.0, 50.0],
+        [10.9, 90000.0, 50.0],
+    ])
+    diferencias, cambios, marcados = sospechosos(actuales, anteriores, absolutos, porcentajes)
+    assert diferencias[0].tolist() == [2.5, 90000.0, 45.0]
+    assert cambios[1, 1] == pytest.approx(55.0)
+    assert marcados.tolist() == [
+        [True, False, False],
+        [False, True, False],
+        [True, True, False],
+    ]
+
+
+def test_sospechosos_sin_anterior_o_con_anterior_cero():
+    diferencias, cambios, marcados = sospechosos([5.0, 3.0], [math.nan, 0.0], np.array([1.0, 1.0]), np.array([10.0, 10.0]))
+    assert math.isnan(diferencias[0]) and not marcados[0]
+    # Sin porcentaje posible, pero el umbral absoluto sigue valiendo
+    assert math.isnan(cambios[1]) and marcados[1]
+
+
+def test_delta_check():
+    analitos = ("Hemoglobina", "Plaquetas", "MCV", "Glucosa en ayunas")
+    anteriores = {
+        "Hemoglobina": ("13.0", "2026-10-01", 1),
+        "Plaquetas": ("200000", "2026-10-01", 1),
+        "MCV": ("no dosable", "2026-10-01", 1),
+    }
+    hemoglobina, plaquetas, mcv, glucosa = delta_check(analitos, ["15.5", "250000", "90", "100"], anteriores)
+    assert hemoglobina[:2] == ("13.0", "2026-10-01")
+    assert hemoglobina[2] == 2.5 and hemoglobina[4] is True
+    assert plaquetas[2:] == (50000.0, pytest.approx(25.0), False)
+    # Anterior no numérico y sin anterior: nada con qué comparar
+    assert mcv is None and glucosa is None
+    # Valor actual vacío
+    assert delta_check(("Hemoglobina",), [""], anteriores) == [None]
+
+
+def _informe(almacen, fecha, hemoglobina, glucosa=None):
+    resultados = [("Hemoglobina", hemoglobina, "g/dL", "12 - 16")]
+    if glucosa is not None:
+        resultados.append(("Glucosa en ayunas", glucosa, "mg/dL", "70 - 100"))
+    return almacen.guardar({"dni": "42", "nombre": "Ana", "fecha": fecha, "resultados": resultados})
+
+
+def test_ultimos_resultados_antes_de(tmp_path):
+    almacen = AlmacenResultados(str(tmp_path / "resultados.db"))
+    primero = _informe(almacen, "2026-09-01", "12.0", glucosa="90")
+    segundo = _informe(almacen, "2026-10-01", "13.0", glucosa="")
+    hoy = _informe(almacen, "2026-10-18", "15.0", glucosa="95")
+    analitos = ("Hemoglobina", "Glucosa en ayunas", "Plaquetas")
+
+    assert almacen.ultimos_resultados("42", analitos) == {
+        "Hemoglobina": ("15.0", "2026-10-18", hoy),
+        "Glucosa en ayunas": ("95", "2026-10-18", hoy),
+    }
+    # El informe del día ya guardado no es "el anterior": ultimos_resultados
+    # tiene el de hoy y se busca hacia atrás en el historial, saltando el
+    # resultado vacío del segundo informe
+    assert almacen.ultimos_resultados("42", analitos, antes_de="2026-10-18") == {
+        "Hemoglobina": ("13.0", "2026-10-01", segundo),
+        "Glucosa en ayunas": ("90", "2026-09-01", primero),
+    }
+    assert almacen.ultimos_resultados("42", analitos, antes_de="2026-09-01") == {}
+    # Cargar tarde un informe viejo no pisa el último
+    _informe(almacen, "2026-08-01", "11.0")
+    assert almacen.ultimos_resultados("42", ("Hemoglobina",))["Hemoglobina"][0] == "15.0"
+    assert almacen.ultimos_resultados("", analitos) == {}
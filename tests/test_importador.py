@@ -0,0 +1,87 @@
+from astromedic.almacen import AlmacenResultados
+from astromedic.importador import _analito, importar, leer_muestras
+from astromedic.referencias import catalogo
+
+ANCHO = """Sample ID;Patient ID;WBC(10^3/uL);PLAQUETAS;Glucosa en ayunas;RDW – SD;eosinofilos abs;HGB;FOO
+M-001;111;6,2;260000;95;41;150;13.1;x
+"""
+
+LARGO = """muestra,parametro,valor
+M-002,PLT,300
+M-002,Glucosa postprandial,120
+M-002,GLOB. BLANCOS,5000
+M-002,XYZ,1
+"""
+
+ASTM = "\r\n".join([
+    "1H|\\^&|||XN-550^00-22",
+    "2P|1||222",
+    "3O|1||M-003^1",
+    "4R|1|^^^WBC^1|7.5|10*3/uL",
+    "5R|2|^^^PLT^1|250|10*3/uL",
+    "6R|3|^^^HGB^1|9.1|g/dL",
+    "7L|1|N",
+]) + "\r\n"
+
+PACIENTES = {
+    "M-001": {"dni": "111", "nombre": "Ana", "edad": "30", "sexo": "Femenino", "medico": "Dr. Soto", "fecha": "2026-10-18"},
+    "M-002": {"dni": "112", "nombre": "Luis", "edad": "45", "sexo": "Masculino", "medico": "", "fecha": "2026-10-18"},
+    "222": {"dni": "222", "nombre": "Eva", "edad": "8", "sexo": "Femenino", "medico": "", "fecha": "2026-10-17"},
+}
+
+
+def test_todos_los_analitos_del_catalogo_tienen_mapeo():
+    actual = catalogo()
+    for analito in [*actual.ref_map, *(f[0] for filas in actual.analisis_db.values() for f in filas)]:
+        for encabezado in (analito, analito.upper(), analito.lower()):
+            assert _analito(encabezado) is not None, encabezado
+
+
+def _guardar(tmp_path, nombre, contenido):
+    ruta = tmp_path / nombre
+    ruta.write_text(contenido, encoding="utf-8")
+    return str(ruta)
+
+
+def test_importar_csv_ancho_largo_y_astm(tmp_path):
+    almacen = AlmacenResultados(str(tmp_path / "resultados.db"))
+    archivos = {
+        "ancho.csv": ANCHO,
+        "largo.csv": LARGO,
+        "equipo.astm": ASTM,
+    }
+    leidas = {}
+    for nombre, contenido in archivos.items():
+        ruta = _guardar(tmp_path, nombre, contenido)
+        (muestra,) = leer_muestras(ruta)
+        leidas[muestra["muestra"]] = muestra
+        assert importar(ruta, almacen=almacen, pacientes=PACIENTES) == (1, [])
+
+    assert leidas["M-001"]["resultados"] == {
+        "Glóbulos blancos": "6200", "Plaquetas": "260000", "Glucosa en ayunas": "95",
+        "RDW – SD": "41", "Eosinófilos abs": "150", "Hemoglobina": "13.1",
+    }
+    assert leidas["M-001"]["sin_mapear"] == ["FOO"]
+    assert leidas["M-002"]["resultados"] == {
+        "Plaquetas": "300000", "Glucosa postprandial": "120", "Glóbulos blancos": "5000",
+    }
+    assert leidas["M-002"]["sin_mapear"] == ["XYZ"]
+    assert leidas["M-003"]["dni"] == "222"
+    assert leidas["M-003"]["resultados"] == {"Glóbulos blancos": "7500", "Plaquetas": "250000", "Hemoglobina": "9.1"}
+
+    # Lo guardado, ya evaluado con las referencias de cada paciente
+    def guardado(dni):
+        (informe,) = almacen.por_dni(dni)
+        return informe, {r.analito: r for r in informe["resultados"]}
+
+    informe, ana = guardado("111")
+    assert (informe["nombre"], informe["medico"], informe["fecha"]) == ("Ana", "Dr. Soto", "2026-10-18")
+    assert (ana["Glucosa en ayunas"].valor, ana["Glucosa en ayunas"].unidad, ana["Glucosa en ayunas"].codigo) == (95.0, "mg/dL", 1)
+    assert ana["Plaquetas"].valor == 260000.0
+    _, luis = guardado("112")
+    assert luis["Glucosa postprandial"].rango == "< 140"
+    informe, eva = guardado("222")
+    assert informe["fecha"] == "2026-10-17"
+    # Rango de niño (11.2 - 16), no el de adulta
+    assert (eva["Hemoglobina"].rango, eva["Hemoglobina"].codigo) == ("11.2 - 16", 2)
+    assert eva["Plaquetas"].texto == "250000"
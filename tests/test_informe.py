@@ -0,0 +1,61 @@
+import re
+import zlib
+
+import fpdf.fpdf
+import pytest
+
+from astromedic import fuentes
+from astromedic.informe import generar_pdf
+
+
+def _textos(pdf, codificacion="utf-16-be"):
+    # Texto de los operadores Tj de cada flujo; con la TTF va en UTF-16BE
+    textos = []
+    for flujo in re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S):
+        try:
+            flujo = zlib.decompress(flujo)
+        except zlib.error:
+            continue
+        for crudo in re.findall(rb"\(((?:\\.|[^\\)])*)\) Tj", flujo, re.S):
+            textos.append(re.sub(rb"\\(.)", rb"\1", crudo).decode(codificacion))
+    return textos
+
+
+@pytest.mark.skipif(not fuentes.RUTAS, reason="sin fuente TTF instalada")
+def test_informe_ttf_conserva_el_texto_unicode():
+    filas = [("Glóbulos blancos", "5000", "mm³", "4000 - 10000", "✅"), ("RDW – SD", "41", "fL", "≤ 46", "🔶")]
+    pdf = generar_pdf("Łukasz Ñúñez", "12345678", 30, "Masculino", "Dra. Pérez", "2026-10-18", filas, "Sello")
+
+    textos = _textos(pdf)
+    assert "Paciente: Łukasz Ñúñez" in textos
+    assert {"Glóbulos blancos", "mm³", "RDW – SD", "≤ 46", "Sello"} <= set(textos)
+    # La fuente no tiene los íconos de bandera: se transliteran
+    assert "OK" in textos and "*" in textos
+    # Otra vez desde la caché de subconjuntos: mismo PDF salvo la fecha
+    assert _textos(generar_pdf("Łukasz Ñúñez", "12345678", 30, "Masculino", "Dra. Pérez", "2026-10-18", filas, "Sello")) == textos
+
+
+def test_no_cambia_la_configuracion_global_de_fpdf():
+    generar_pdf("Ana", "1", 30, "Femenino", "", "2026-10-18", [("Hemoglobina", "13", "g/dL", "12 - 16", "✅")])
+    assert fpdf.fpdf.TTFontFile is fpdf.ttfonts.TTFontFile
+    assert fpdf.fpdf.FPDF_CACHE_DIR is None and fpdf.fpdf.FPDF_CACHE_MODE == 0
+
+
+@pytest.mark.skipif(not fuentes.RUTAS, reason="sin fuente TTF instalada")
+def test_subconjunto_alterado_se_regenera(tmp_path, monkeypatch):
+    monkeypatch.setattr(fuentes, "DIRECTORIO", str(tmp_path))
+    monkeypatch.setattr(fuentes, "_subconjuntos", {})
+    caracteres = fuentes.SUBCONJUNTO_FIJO
+    original = fuentes.subconjunto(fuentes.RUTAS[""], caracteres)
+    (archivo,) = (tmp_path / "subconjuntos").iterdir()
+    archivo.write_bytes(archivo.read_bytes()[:-10] + b"0123456789")
+    fuentes._subconjuntos.clear()
+    assert fuentes.subconjunto(fuentes.RUTAS[""], caracteres) == original
+
+
+def test_sin_ttf_todo_el_texto_queda_en_latin1(monkeypatch):
+    monkeypatch.setattr(fuentes, "RUTAS", {})
+    filas = [("RDW – SD", "41", "fL", "≤ 46", "🔶"), ("Łukasz", 5, "µL", "", "")]
+    pdf = generar_pdf("Łukasz Ñúñez", "1", 30, "Masculino", "", "2026-10-18", filas, "Sello ≥ 1")
+    textos = _textos(pdf, "latin-1")
+    assert {"Paciente: Lukasz Ñúñez", "Análisis", "RDW - SD", "<= 46", "*", "Lukasz", "µL", "Sello >= 1"} <= set(textos)
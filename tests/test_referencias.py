@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from astromedic import config, referencias
+from astromedic.evaluacion import evaluar
+from astromedic.paneles import Panel, cargar_paneles, paneles, reemplazar_paneles
+from astromedic.paneles import multianalisis
+
+with open(referencias.RUTA_CATALOGO, encoding="utf-8") as f:
+    ORIGINAL = json.load(f)
+
+
+def _escribir(ruta, datos):
+    # Como un editor que guarda: archivo nuevo y reemplazo atómico. La hora
+    # avanza al menos un segundo, así la firma cambia aunque el sistema de
+    # archivos tenga poca resolución
+    contenido = json.dumps(datos, ensure_ascii=False).encode()
+    try:
+        previa = os.stat(ruta).st_mtime_ns
+    except FileNotFoundError:
+        previa = 0
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(contenido)
+    instante = max(time.time_ns(), previa + 10**9)
+    os.utime(temporal, ns=(instante, instante))
+    os.replace(temporal, ruta)
+    return hashlib.sha256(contenido).hexdigest()[:12]
+
+
+@pytest.fixture
+def catalogo_temporal(tmp_path):
+    ruta = str(tmp_path / "catalogo.json")
+    _escribir(ruta, ORIGINAL)
+    anterior = referencias.RUTA_CATALOGO
+    referencias.RUTA_CATALOGO = ruta
+    referencias.recargar()
+    yield ruta
+    referencias.RUTA_CATALOGO = anterior
+    referencias.recargar()
+
+
+def _hemoglobina(valor):
+    (resultado,) = evaluar({"Hemoglobina": valor}, 30, "Femenino")
+    return resultado
+
+
+def test_etiqueta_version_y_huella(catalogo_temporal):
+    with open(catalogo_temporal, "rb") as f:
+        huella = hashlib.sha256(f.read()).hexdigest()[:12]
+    assert referencias.catalogo().etiqueta == f"{ORIGINAL['version']}#{huella}"
+    assert referencias.Catalogo(ORIGINAL).etiqueta == ORIGINAL["version"]
+
+
+def test_recargar_toma_el_catalogo_reescrito(catalogo_temporal):
+    anterior = referencias.catalogo()
+    assert _hemoglobina("13").codigo == 1
+    assert "Glucosa" in cargar_paneles()
+
+    datos = json.loads(json.dumps(ORIGINAL))
+    datos["version"] = "2099.1"
+    datos["referencias"]["Hemoglobina"]["Femenino"] = ["g/dL", 14, 18]
+    datos["paneles"]["Glucosa basal"] = datos["paneles"].pop("Glucosa")
+    huella = _escribir(catalogo_temporal, datos)
+
+    nuevo = referencias.recargar()
+    assert nuevo is referencias.catalogo() is not anterior
+    assert nuevo.etiqueta == f"2099.1#{huella}"
+    resultado = _hemoglobina("13")
+    assert (resultado.rango, resultado.codigo) == ("14 - 18", 2)
+    # Los paneles del catálogo se rearman con la versión nueva
+    assert "Glucosa basal" in paneles() and "Glucosa" not in paneles()
+    # Quien ya tenía el catálogo anterior sigue con ese
+    assert anterior.limites("Hemoglobina", 30, "Femenino")[1:] == (12.0, 16.0)
+
+    # Sin cambios en el archivo no se vuelve a leer
+    assert referencias.recargar() is nuevo
+
+
+def test_catalogo_invalido_no_reemplaza_al_vigente(catalogo_temporal):
+    vigente = referencias.catalogo()
+    with open(catalogo_temporal, "w", encoding="utf-8") as f:
+        f.write('{"version": "2099.2", "referencias": ')
+    assert referencias.recargar() is vigente
+    datos = dict(ORIGINAL)
+    del datos["paneles"]
+    _escribir(catalogo_temporal, datos)
+    assert referencias.recargar() is vigente
+
+
+def test_el_hilo_vigilante_recarga_solo(catalogo_temporal, monkeypatch):
+    assert any(hilo.name == "astromedic-catalogo" for hilo in threading.enumerate())
+    monkeypatch.setattr(config, "CATALOGO_REVISAR_S", 0.05)
+    datos = dict(ORIGINAL, version="2099.3")
+    huella = _escribir(catalogo_temporal, datos)
+    # El hilo puede seguir en la espera anterior (la de la configuración)
+    limite = time.time() + 10
+    while referencias.catalogo().etiqueta != f"2099.3#{huella}":
+        assert time.time() < limite, "el vigilante no recargó el catálogo"
+        time.sleep(0.05)
+
+
+def test_cambio_de_paneles_es_atomico(catalogo_temporal):
+    cargar_paneles()
+    con_glucosa = referencias.Catalogo(ORIGINAL)
+    datos = json.loads(json.dumps(ORIGINAL))
+    datos["paneles"] = {"Química": datos["paneles"]["Glucosa"], "Lípidos": datos["paneles"]["Glucosa"]}
+    con_quimica = referencias.Catalogo(datos)
+    esperados = set()
+    for catalogo in (con_glucosa, con_quimica):
+        multianalisis._sincronizar(catalogo)
+        esperados.add(frozenset(paneles()))
+    assert len(esperados) == 2
+
+    vistos = set()
+    terminar = threading.Event()
+
+    def leer():
+        while not terminar.is_set():
+            vistos.add(frozenset(paneles()))
+    lector = threading.Thread(target=leer)
+    lector.start()
+    try:
+        for i in range(300):
+            multianalisis._sincronizar((con_glucosa, con_quimica)[i % 2])
+    finally:
+        terminar.set()
+        lector.join()
+        multianalisis._sincronizar(referencias.catalogo())
+    # Siempre el registro de antes o el de después, nunca uno a medio armar
+    assert vistos <= esperados
+
+
+def test_panel_del_catalogo_que_choca_no_se_pierde(caplog):
+    registro = cargar_paneles()
+    # El Hemograma por edad y sexo y el del catálogo (rangos fijos) conviven
+    assert registro["Hemograma"].analitos != registro["Hemograma (rangos fijos)"].analitos
+    assert "PLAQUETAS" in registro["Hemograma (rangos fijos)"].analitos
+    with caplog.at_level("WARNING", logger=multianalisis.__name__):
+        multianalisis._sincronizar(referencias.catalogo())
+    assert "Hemograma (rangos fijos)" in caplog.text
+
+    # Registrar a mano un nombre ocupado es un error y no cambia nada
+    registro = paneles()
+    with pytest.raises(ValueError, match="Panel ya registrado: Glucosa"):
+        reemplazar_paneles((), [Panel("Química", ["Glucosa en ayunas"], None), Panel("Glucosa", [], None)])
+    assert paneles() == registro
@@ -0,0 +1,15 @@
+from astromedic import registros
+from astromedic.evaluacion import evaluar
+
+
+def test_solo_se_comparte_lo_del_catalogo():
+    antes = (dict(registros._TEXTOS), dict(registros._LIMITES))
+    # Analitos, unidades y rangos que no están en el catálogo (importador, API)
+    for i in range(500):
+        (r,) = registros.desde_filas([(f"Analito {i}", "5", f"u{i}/L", f"{i} - {i + 1}")])
+        assert (r.analito, r.unidad, r.rango, r.valor) == (f"Analito {i}", f"u{i}/L", f"{i} - {i + 1}", 5.0)
+    assert (registros._TEXTOS, registros._LIMITES) == antes
+
+    # Los del catálogo sí son un único objeto
+    a, b = evaluar({"Hemoglobina": "13"}, 30, "Femenino"), evaluar({"Hemoglobina": "9"}, 31, "Femenino")
+    assert a[0].limites is b[0].limites and a[0].unidad is b[0].unidad
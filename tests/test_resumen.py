@@ -0,0 +1,69 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from astromedic.almacen import AlmacenResultados, periodos
+
+ANALITOS = [("Hemoglobina", "g/dL", "12 - 16"), ("Glucosa en ayunas", "mg/dL", "70 - 100")]
+
+
+def _recuento(almacen, periodo):
+    # Lo mismo que `resumen`, recorriendo todo el historial
+    medicos, analitos = {}, {}
+    for informe in almacen.buscar(limite=None):
+        if periodo not in periodos(informe["fecha"]):
+            continue
+        medico = informe["medico"] or ""
+        medicos[medico] = medicos.get(medico, 0) + 1
+        for r in almacen.resultados_de(informe["id"]):
+            if not r.texto.strip():
+                continue
+            cuentas = analitos.setdefault(r.analito, dict.fromkeys(
+                ("resultados", "valores", "suma", "sin_dato", "normales", "bajos", "altos", "criticos"), 0
+            ))
+            cuentas["resultados"] += 1
+            cuentas["valores"] += r.valor is not None
+            cuentas["suma"] += r.valor or 0.0
+            cuentas[("sin_dato", "normales", "bajos", "altos", "criticos")[r.codigo]] += 1
+    return {"periodo": periodo, "informes": sum(medicos.values()), "medicos": medicos, "analitos": analitos}
+
+
+def test_resumen_coincide_con_un_recuento(tmp_path):
+    almacen = AlmacenResultados(str(tmp_path / "resultados.db"))
+    rng = random.Random(7)
+    # Del domingo 27/09 (semana 39) al martes 06/10: cruza el cambio de
+    # semana del lunes 28/09 y el de mes del 01/10
+    dias = [date(2026, 9, 27) + timedelta(days=i) for i in range(10)]
+    lote = []
+    for i in range(120):
+        lote.append({
+            "dni": str(i % 15), "nombre": "P", "fecha": rng.choice(dias).isoformat(),
+            "medico": rng.choice(["Dra. Pérez", "Dr. Soto", ""]),
+            "resultados": [
+                (analito, rng.choice(["", "no dosable", str(round(rng.uniform(5, 200), 1))]), unidad, rango)
+                for analito, unidad, rango in ANALITOS
+            ],
+        })
+        if len(lote) == 25:
+            almacen.guardar_lote(lote)
+            lote = []
+    for entrada in lote:
+        almacen.guardar(entrada)
+
+    for periodo in ("2026-W39", "2026-W40", "2026-W41", "2026-09", "2026-10", "2026-09-28", "2026-10-01"):
+        resumen = almacen.resumen(periodo)
+        recuento = _recuento(almacen, periodo)
+        assert resumen["informes"] == recuento["informes"] > 0
+        assert resumen["medicos"] == recuento["medicos"]
+        assert resumen["analitos"].keys() == recuento["analitos"].keys()
+        for analito, cuentas in recuento["analitos"].items():
+            assert resumen["analitos"][analito] == {**cuentas, "suma": pytest.approx(cuentas["suma"])}
+    # Semana y mes se reparten los mismos informes de distinta forma
+    assert almacen.resumen("2026-W39")["informes"] == almacen.resumen("2026-09-27")["informes"]
+    assert (
+        almacen.resumen("2026-09")["informes"] + almacen.resumen("2026-10")["informes"]
+        == almacen.resumen("2026-W39")["informes"] + almacen.resumen("2026-W40")["informes"]
+        + almacen.resumen("2026-W41")["informes"] == 120
+    )
+    assert almacen.resumen("2026-W42")["informes"] == 0
@@ -0,0 +1,86 @@
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+from astromedic.cache_pdf import cache
+from astromedic.trabajos import ERROR, LISTO, ColaCompartida
+
+FILAS = [["Hemoglobina", "13", "g/dL", "12 - 16", "✅"]]
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    ruta = str(tmp_path / "trabajos.db")
+    colas = [ColaCompartida(ruta, procesos=1, intervalo_s=0.05) for _ in range(2)]
+    yield ruta, colas
+    for cola in colas:
+        cola.cerrar()
+
+
+def _esperar(cola, id_trabajo, estado, plazo=30):
+    limite = time.time() + plazo
+    while cola.estado(id_trabajo)[0] != estado:
+        assert time.time() < limite
+        time.sleep(0.05)
+
+
+def test_dos_replicas_comparten_el_pdf_por_la_cache(replicas):
+    ruta, (a, b) = replicas
+    clave = "a1" * 32
+    cabecera = ["Ana", "1", 30, "Femenino", "", "2026-10-18"]
+    futuro_a = a.encolar(clave, "pdf", clave, cabecera, FILAS, "")
+    futuro_b = b.encolar(clave, "pdf", clave, cabecera, FILAS, "")
+    pdf = futuro_a.result(timeout=60)
+    assert pdf.startswith(b"%PDF")
+    assert futuro_b.result(timeout=60) == pdf
+    assert cache.obtener(clave) == pdf
+    assert a.resultado(clave) == b.resultado(clave) == pdf
+
+    # En la tabla quedan el tipo y el estado, no el PDF ni código serializado
+    con = sqlite3.connect(ruta)
+    columnas = [fila[1] for fila in con.execute("PRAGMA table_info(trabajos)")]
+    assert "resultado" not in columnas
+    assert con.execute("SELECT tipo, estado, argumentos FROM trabajos").fetchall() == [("pdf", LISTO, None)]
+
+
+def test_argumentos_en_json(replicas, monkeypatch):
+    ruta, (a, _) = replicas
+    # Sin el hilo de la réplica nadie lo toma: se ve lo que quedó en la tabla
+    monkeypatch.setattr(a, "_arrancar", lambda: None)
+    a.encolar("b2" * 32, "pdf", "b2" * 32, ["Ana", "1", 30, "Femenino", "", "2026-10-18"], FILAS, "")
+    tipo, argumentos = sqlite3.connect(ruta).execute("SELECT tipo, argumentos FROM trabajos").fetchone()
+    assert tipo == "pdf"
+    assert json.loads(argumentos) == ["b2" * 32, ["Ana", "1", 30, "Femenino", "", "2026-10-18"], FILAS, ""]
+
+
+def test_solo_corre_tipos_registrados(replicas):
+    ruta, (a, b) = replicas
+    with pytest.raises(ValueError):
+        a.encolar("c3" * 32, "os.system", "echo")
+    # Una fila con un tipo desconocido (otra versión, o escrita a mano) no se corre
+    with sqlite3.connect(ruta) as con:
+        con.execute(
+            "INSERT INTO trabajos (id, estado, tipo, argumentos, creado) VALUES (?, 'en_cola', ?, ?, ?)",
+            ("d4" * 32, "os.system", json.dumps(["echo"]), time.time()),
+        )
+    b._arrancar()
+    _esperar(b, "d4" * 32, ERROR)
+    assert "desconocido" in b.estado("d4" * 32)[2]
+    assert b.resultado("d4" * 32) is None
+
+
+def test_pdf_que_salio_de_la_cache_se_rehace(replicas):
+    _, (a, _) = replicas
+    clave = "e5" * 32
+    cabecera = ["Ana", "1", 30, "Femenino", "", "2026-10-18"]
+    pdf = a.encolar(clave, "pdf", clave, cabecera, FILAS, "").result(timeout=60)
+    with cache._lock:
+        cache._memoria.clear()
+        cache._bytes_memoria = 0
+    os.remove(cache._ruta(clave))
+    assert a.resultado(clave) is None
+    assert a.encolar(clave, "pdf", clave, cabecera, FILAS, "").result(timeout=60).startswith(b"%PDF")
+    assert cache.obtener(clave) is not None